@@ -9,6 +9,7 @@ from database.pg_database import PGConnection
 from enricher import Enricher
 from extractor import Extractor
 from loader import Loader
+from rankings import Rankings
 from transform import Transform
 from config import settings
 
@@ -22,11 +23,24 @@ if __name__ == '__main__':
 
     logger.info('Initializing')
 
+    rankings_enabled = settings.film_rankings_enabled
+    if rankings_enabled and settings.es.index != settings.api_films_index:
+        # Рейтинги из другого индекса давали бы первые страницы не из тех данных,
+        # что остальные страницы и поиск API
+        logger.warning(
+            'Рейтинги фильмов выключены: ETL загружает индекс %s, а API читает списки из %s',
+            settings.es.index,
+            settings.api_films_index
+        )
+        rankings_enabled = False
+
     loader = Loader(
         redis_settings=settings.cache.loader,
         transport_options=settings.es.connection.model_dump(),
         index=settings.es.index,
-        index_schema=settings.es.index_schema
+        index_schema=settings.es.index_schema,
+        invalidation_channel=settings.cache_invalidation_channel,
+        rankings=Rankings(settings.cache.rankings) if rankings_enabled else None,
     )
 
     transform = Transform(
@@ -48,6 +48,8 @@ class Cashe(BaseSettings):
     enricher: dict = {**RedisSettings().dict(), 'db': 2}
     transformer: dict = {**RedisSettings().dict(), 'db': 3}
     loader: dict = {**RedisSettings().dict(), 'db': 4}
+    # База API: в ней хранятся рейтинги фильмов для списков
+    rankings: dict = {**RedisSettings().dict(), 'db': 0}
 
 
 class Settings(BaseSettings):
@@ -60,6 +62,11 @@ class Settings(BaseSettings):
     page_size: int = 1000
     entities: set[str] = {'film_work', 'person', 'genre'}
     debug: str = Field('INFO', env='DEBUG')
+    cache_invalidation_channel: str = Field('cache_invalidation', env='CACHE_INVALIDATION_CHANNEL')
+    film_rankings_enabled: bool = Field(True, env='FILM_RANKINGS_ENABLED')
+    # Индекс, из которого API отдает списки фильмов (ELASTIC_FILMS_INDEX API).
+    # Рейтинги ведутся, только если ETL загружает именно его
+    api_films_index: str = Field('movies_test', env='ELASTIC_FILMS_INDEX')
 
 
 settings = Settings()
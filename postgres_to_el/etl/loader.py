@@ -1,10 +1,13 @@
+import json
 import logging
 from logging.config import dictConfig
 from typing import Any
 
+import redis
 from database.backoff_connection import backoff
 from elasticsearch import Elasticsearch, helpers
 from lib.loggers import LOGGING
+from rankings import Rankings
 from states import RedisStorage, State
 
 dictConfig(LOGGING)
@@ -18,7 +21,10 @@ class Loader:
         redis_settings: dict[str, Any],
         transport_options: dict[str, Any],
         index: str,
-        index_schema: dict[str, Any] | None = None
+        index_schema: dict[str, Any] | None = None,
+        invalidation_channel: str | None = None,
+        cache_entity: str = 'film',
+        rankings: Rankings | None = None
 
     ) -> None:
         """Конструктор класса ESLoader.
@@ -28,16 +34,29 @@ class Loader:
             transport_options: Параметры подключения к Elasticsearch
             index: Название индекса Elasticsearch
             index_schema: Схема индекса. Если не None - индекс будет создан
+            invalidation_channel: Канал Redis для сообщений об измененных документах
+            cache_entity: Тип сущности в сообщениях об изменениях
+            rankings: Рейтинги фильмов в Redis API. Если не None - обновляются при загрузке
         """
 
         self.client = Elasticsearch(**transport_options)
         self.storage = RedisStorage(redis_settings)
         self.state = State(self.storage)
         self.index = index
+        self.invalidation_channel = invalidation_channel
+        self.cache_entity = cache_entity
+        self.publisher = redis.Redis(**redis_settings) if invalidation_channel else None
+        self.rankings = rankings
 
         if index_schema:
             self.create_index(index=index, index_schema=index_schema)
 
+        if rankings:
+            try:
+                rankings.rebuild_if_missing(self.client, index)
+            except Exception:
+                logger.exception('Ошибка перестройки рейтингов фильмов')
+
         self.proceed()
 
     def proceed(self) -> None:
@@ -125,9 +144,42 @@ class Loader:
             data: Данные для загрузки
         """
         self.state.get_state(key='data', default=data)
-        self.bulk(list(map(self.convert_to_bulk_format, data)))
+        bulk_data = list(map(self.convert_to_bulk_format, data))
+        self.bulk(bulk_data)
+        self.update_rankings([doc['_source'] for doc in bulk_data if doc])
+        self.publish_invalidation([doc['_id'] for doc in bulk_data if doc])
         self.state.set_state(key='data', value=None)
 
+    def update_rankings(self, films: list[dict[str, Any]]) -> None:
+        """Обновить рейтинги фильмов, из которых API отдает списки без Elasticsearch.
+
+        Args:
+            films: Загруженные документы
+        """
+        if not self.rankings:
+            return
+
+        try:
+            self.rankings.update(films)
+        except Exception:
+            logger.exception('Ошибка обновления рейтингов фильмов')
+
+    def publish_invalidation(self, ids: list[str]) -> None:
+        """Сообщить API об измененных документах, чтобы оно сбросило их кэш.
+
+        Args:
+            ids: Идентификаторы загруженных документов
+        """
+        if not self.publisher or not ids:
+            return
+
+        try:
+            message = json.dumps({'entity': self.cache_entity, 'ids': [str(doc_id) for doc_id in ids]})
+            receivers = self.publisher.publish(self.invalidation_channel, message)
+            logger.debug('Инвалидация кэша: %s документов, получателей %s', len(ids), receivers)
+        except Exception:
+            logger.exception('Ошибка публикации инвалидации кэша')
+
     @backoff()
     def create_index(self, index: str, index_schema: dict):
         """Создайте индекс, если индекс не существует.
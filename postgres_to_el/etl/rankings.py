@@ -0,0 +1,129 @@
+"""Рейтинги фильмов в Redis для API.
+
+Ключи (их же читает API, src/services/rankings.py):
+    films:rank:rating                  ZSET id фильма -> imdb_rating
+    films:rank:rating:genre:<жанр>     ZSET того же вида по каждому жанру
+    films:rank:unrated                 SET id фильмов без рейтинга
+    films:rank:unrated:genre:<жанр>    SET того же вида по каждому жанру
+    films:summary:<id>                 JSON {id, title, imdb_rating, genres}
+    films:rank:ready:v2                время последней полной перестройки
+
+API берет страницы из рейтингов только после того, как появился
+films:rank:ready:v2, то есть когда рейтинги заполнены по всему индексу.
+Версия в ключе меняется вместе с форматом рейтингов, чтобы ETL перестроил их.
+Фильмы без рейтинга Elasticsearch ставит в конец выдачи; в ZSET их нет,
+поэтому страницы, до которых они доходят, API берет из Elasticsearch.
+"""
+import json
+import logging
+import time
+from logging.config import dictConfig
+from typing import Any, Iterable
+
+import redis
+from elasticsearch import Elasticsearch, helpers
+from lib.loggers import LOGGING
+
+dictConfig(LOGGING)
+logger = logging.getLogger(__name__)
+
+RATING_KEY = 'films:rank:rating'
+GENRE_RATING_KEY = 'films:rank:rating:genre:{genre}'
+SUMMARY_KEY = 'films:summary:{film_id}'
+UNRATED_KEY = 'films:rank:unrated'
+GENRE_UNRATED_KEY = 'films:rank:unrated:genre:{genre}'
+READY_KEY = 'films:rank:ready:v2'
+
+SUMMARY_FIELDS = ['id', 'title', 'imdb_rating', 'genres']
+
+
+class Rankings:
+
+    def __init__(self, redis_settings: dict[str, Any], batch_size: int = 1000) -> None:
+        """Конструктор класса Rankings.
+
+        Args:
+            redis_settings: Настройки подключения к Redis, которым пользуется API
+            batch_size: Число фильмов в одной транзакции при перестройке
+        """
+        self.redis = redis.Redis(**redis_settings)
+        self.batch_size = batch_size
+
+    def update(self, films: list[dict[str, Any]]) -> None:
+        """Обновить рейтинги и краткие описания загруженных фильмов.
+
+        Фильм без рейтинга переносится из рейтингов в множества фильмов без
+        рейтинга, из жанров, которых у фильма больше нет, он удаляется.
+
+        Args:
+            films: Документы фильмов в формате индекса
+        """
+        if not films:
+            return
+
+        summary_keys = [SUMMARY_KEY.format(film_id=film['id']) for film in films]
+        previous = self.redis.mget(summary_keys)
+
+        pipe = self.redis.pipeline()
+        for film, summary_key, old_summary in zip(films, summary_keys, previous):
+            film_id = str(film['id'])
+            old_genres = set(json.loads(old_summary).get('genres') or []) if old_summary else set()
+            genres = set(film.get('genres') or [])
+            rating = film.get('imdb_rating')
+
+            # Краткое описание хранится и без рейтинга: по нему видны прежние жанры
+            summary = {field: film.get(field) for field in SUMMARY_FIELDS}
+            pipe.set(summary_key, json.dumps(summary, ensure_ascii=False))
+            for genre in old_genres - genres:
+                pipe.zrem(GENRE_RATING_KEY.format(genre=genre), film_id)
+                pipe.srem(GENRE_UNRATED_KEY.format(genre=genre), film_id)
+
+            if rating is None:
+                pipe.zrem(RATING_KEY, film_id)
+                pipe.sadd(UNRATED_KEY, film_id)
+                for genre in genres:
+                    pipe.zrem(GENRE_RATING_KEY.format(genre=genre), film_id)
+                    pipe.sadd(GENRE_UNRATED_KEY.format(genre=genre), film_id)
+            else:
+                pipe.zadd(RATING_KEY, {film_id: rating})
+                pipe.srem(UNRATED_KEY, film_id)
+                for genre in genres:
+                    pipe.zadd(GENRE_RATING_KEY.format(genre=genre), {film_id: rating})
+                    pipe.srem(GENRE_UNRATED_KEY.format(genre=genre), film_id)
+        pipe.execute()
+        logger.debug('Рейтинги обновлены: %s фильмов', len(films))
+
+    def rebuild_if_missing(self, client: Elasticsearch, index: str) -> None:
+        """Заполнить рейтинги по всему индексу, если их еще нет.
+
+        Args:
+            client: Клиент Elasticsearch
+            index: Индекс фильмов
+        """
+        if self.redis.exists(READY_KEY):
+            return
+
+        if not client.indices.exists(index=index):
+            # Готовность отмечается только после полной перестройки, иначе API
+            # читал бы пустые рейтинги вместо индекса, пока его заполняет ETL
+            logger.info('Индекса %s еще нет, рейтинги будут перестроены позже', index)
+            return
+
+        logger.info('Перестройка рейтингов фильмов по индексу %s', index)
+        hits = helpers.scan(client, index=index, _source=SUMMARY_FIELDS, query={'query': {'match_all': {}}})
+        total = 0
+        for batch in self._batches(hit['_source'] for hit in hits):
+            self.update(batch)
+            total += len(batch)
+        logger.info('Рейтинги перестроены: %s фильмов', total)
+        self.redis.set(READY_KEY, time.time())
+
+    def _batches(self, films: Iterable[dict[str, Any]]) -> Iterable[list[dict[str, Any]]]:
+        batch = []
+        for film in films:
+            batch.append(film)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -26,7 +26,8 @@ if __name__ == '__main__':
         redis_settings=settings.cache.loader,
         transport_options=settings.es.connection.model_dump(),
         index=settings.es.index,
-        index_schema=settings.es.index_schema
+        index_schema=settings.es.index_schema,
+        invalidation_channel=settings.cache_invalidation_channel,
     )
 
     transform = Transform(
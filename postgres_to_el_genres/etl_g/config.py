@@ -60,6 +60,7 @@ class Settings(BaseSettings):
     page_size: int = 1000
     entities: set[str] = ('film_work',  'genre') #'genre_film_work',
     debug: str = Field('INFO', env='DEBUG')
+    cache_invalidation_channel: str = Field('cache_invalidation', env='CACHE_INVALIDATION_CHANNEL')
 
 
 settings = Settings()
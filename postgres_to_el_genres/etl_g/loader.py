@@ -1,7 +1,9 @@
+import json
 import logging
 from logging.config import dictConfig
 from typing import Any
 
+import redis
 from database.backoff_connection import backoff
 from elasticsearch import Elasticsearch, helpers
 from lib.loggers import LOGGING
@@ -18,7 +20,9 @@ class Loader:
             redis_settings: dict[str, Any],
             transport_options: dict[str, Any],
             index: str,
-            index_schema: dict[str, Any] | None = None
+            index_schema: dict[str, Any] | None = None,
+            invalidation_channel: str | None = None,
+            cache_entity: str = 'genres'
     ) -> None:
         """Конструктор класса Loader для жанров.
 
@@ -27,12 +31,17 @@ class Loader:
             transport_options: Параметры подключения к Elasticsearch
             index: Название индекса Elasticsearch
             index_schema: Схема индекса. Если не None - индекс будет создан
+            invalidation_channel: Канал Redis для сообщений об измененных документах
+            cache_entity: Тип сущности в сообщениях об изменениях
         """
 
         self.client = Elasticsearch(**transport_options)
         self.storage = RedisStorage(redis_settings)
         self.state = State(self.storage)
         self.index = index
+        self.invalidation_channel = invalidation_channel
+        self.cache_entity = cache_entity
+        self.publisher = redis.Redis(**redis_settings) if invalidation_channel else None
 
         if index_schema:
             self.create_index(index=index, index_schema=index_schema)
@@ -120,12 +129,29 @@ class Loader:
             success_count, errors = self.bulk(bulk_data)
             logger.info("✅ Успешно загружено %s жанров, ❌ Ошибок: %s",
                         success_count, len(errors) if errors else 0)
+            self.publish_invalidation([doc['_id'] for doc in bulk_data])
         else:
             logger.warning("⚠️ Нет валидных данных для загрузки")
 
         # Очищаем состояние
         self.state.set_state(key='data', value=None)
 
+    def publish_invalidation(self, ids: list[str]) -> None:
+        """Сообщить API об измененных жанрах, чтобы оно сбросило их кэш.
+
+        Args:
+            ids: Идентификаторы загруженных жанров
+        """
+        if not self.publisher or not ids:
+            return
+
+        try:
+            message = json.dumps({'entity': self.cache_entity, 'ids': [str(doc_id) for doc_id in ids]})
+            receivers = self.publisher.publish(self.invalidation_channel, message)
+            logger.debug("Инвалидация кэша: %s жанров, получателей %s", len(ids), receivers)
+        except Exception:
+            logger.exception("❌ Ошибка публикации инвалидации кэша")
+
     @backoff()
     def create_index(self, index: str, index_schema: dict[str, Any]) -> None:
         """Создать индекс, если он не существует.
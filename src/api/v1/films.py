@@ -1,9 +1,19 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel, Field, TypeAdapter
 
-from src.services.film import FilmService, get_film_service
+from src.cache.response import ResponseCache, get_response_cache, normalize_query
+from src.cache.schema import schema_version
+from src.core import config
+from src.models.film import FacetBucketModel, FilmFiltersModel, FilmsPageModel
+from src.services.film import (
+    FACET_AGGREGATIONS,
+    FILM_CACHE_SCHEMA_VERSION,
+    FilmService,
+    InvalidCursorError,
+    get_film_service,
+)
 
 router = APIRouter()
 
@@ -20,16 +30,51 @@ class FilmsDetailsResponse(FilmsResponse):
     actors: list | None = None
     writers: list | None = None
 
+class FilmsBatchRequest(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=config.settings.films_batch_max_size)
+
+class FilmsBatchResponse(BaseModel):
+    films: list[FilmsDetailsResponse]
+    not_found: list[str]
+
+class FacetBucket(BaseModel):
+    key: str | float
+    count: int
+
 class FilmsListResponse(BaseModel):
     films: list[FilmsResponse]
     total: int
     page: int
     page_size: int
     total_pages: int
+    next_cursor: str | None = None
+    # Только в ответе поиска с параметром facets
+    facets: dict[str, list[FacetBucket]] | None = None
+
+FacetsAdapter = TypeAdapter(dict[str, list[FacetBucketModel]])
+
+
+def film_filters(
+        genre: str | None = Query(default=None, description="Только фильмы этого жанра"),
+        min_rating: float | None = Query(default=None, ge=0, le=10, description="Минимальный рейтинг"),
+        max_rating: float | None = Query(default=None, ge=0, le=10, description="Максимальный рейтинг"),
+        person: str | None = Query(default=None, description="id режиссера, актера или сценариста")
+) -> FilmFiltersModel:
+    return FilmFiltersModel(genre=genre, min_rating=min_rating, max_rating=max_rating, person=person)
+
+
+# Кэш можно отдавать как есть, только если он записан в той же схеме, что и ответ ручки
+FILM_DETAILS_FROM_CACHE_BYTES = schema_version(FilmsDetailsResponse) == FILM_CACHE_SCHEMA_VERSION
 
 
 @router.get('/{film_id}', response_model=FilmsDetailsResponse)
 async def film_details(film_id: str, film_service: FilmService = Depends(get_film_service)) -> FilmsDetailsResponse:
+    if FILM_DETAILS_FROM_CACHE_BYTES:
+        body = await film_service.get_json_by_id(film_id)
+        if not body:
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='film not found')
+        return Response(content=body, media_type='application/json')
+
     film = await film_service.get_by_id(film_id)
     if not film:
 
@@ -47,28 +92,28 @@ async def film_details(film_id: str, film_service: FilmService = Depends(get_fil
         directors=film.directors,
     )
 
-@router.get('/', response_model=FilmsListResponse)
-async def films_list(
-        sort: str = Query(default="-imdb_rating", description="Сортировка: -imdb_rating (по убыванию) или imdb_rating (по возрастанию)"),
-        page_size: int = Query(default=50, ge=1, le=100, description="Размер страницы"),
-        page_number: int = Query(default=1, ge=1, description="Номер страницы"),
+@router.post('/batch', response_model=FilmsBatchResponse)
+async def films_batch(
+        batch: FilmsBatchRequest,
         film_service: FilmService = Depends(get_film_service)
-) -> FilmsListResponse:
+) -> FilmsBatchResponse:
     """
-    Получить список фильмов с пагинацией и сортировкой по рейтингу
+    Получить несколько фильмов по списку id за один запрос
     """
-    films = await film_service.get_films_list(
-        sort=sort,
-        page_size=page_size,
-        page_number=page_number
+    films = await film_service.get_by_ids(batch.ids)
+    film_ids = list(dict.fromkeys(batch.ids))
+
+    return FilmsBatchResponse(
+        films=[
+            FilmsDetailsResponse(**films[film_id].model_dump())
+            for film_id in film_ids if film_id in films
+        ],
+        not_found=[film_id for film_id in film_ids if film_id not in films]
     )
 
-    if not films:
-        raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND,
-            detail='films not found'
-        )
 
+def _build_films_list_response(page: FilmsPageModel, page_number: int, page_size: int) -> FilmsListResponse:
+    films = page.films
     return FilmsListResponse(
         films=[
             FilmsResponse(
@@ -80,41 +125,148 @@ async def films_list(
         total=len(films),
         page=page_number,
         page_size=page_size,
-        total_pages=(len(films) + page_size - 1) // page_size
+        total_pages=(len(films) + page_size - 1) // page_size,
+        next_cursor=page.next_cursor
+    )
+
+
+@router.get('/', response_model=FilmsListResponse)
+async def films_list(
+        sort: str = Query(default="-imdb_rating", description="Сортировка: -imdb_rating (по убыванию) или imdb_rating (по возрастанию)"),
+        page_size: int = Query(default=50, ge=1, le=100, description="Размер страницы"),
+        page_number: int = Query(default=1, ge=1, description="Номер страницы"),
+        cursor: str | None = Query(default=None, description="Курсор следующей страницы, '*' - начать обход по курсору"),
+        consistent: bool = Query(default=False, description="Зафиксировать срез данных (point-in-time) на время обхода по курсору"),
+        filters: FilmFiltersModel = Depends(film_filters),
+        film_service: FilmService = Depends(get_film_service),
+        response_cache: ResponseCache = Depends(get_response_cache)
+) -> Response:
+    """
+    Получить список фильмов с пагинацией и сортировкой по рейтингу
+    """
+    # Обход с point-in-time привязан к срезу конкретного клиента и не кэшируется
+    use_cache = not consistent
+    cache_key = response_cache.build_key(
+        'films_list',
+        {'sort': sort, 'page_size': page_size, 'page_number': page_number, 'cursor': cursor,
+         **filters.model_dump(exclude_none=True)}
     )
+    cached_body = await response_cache.get(cache_key) if use_cache else None
+    if cached_body:
+        return Response(content=cached_body, media_type='application/json')
+
+    try:
+        page = await film_service.get_films_list(
+            sort=sort,
+            page_size=page_size,
+            page_number=page_number,
+            cursor=cursor,
+            consistent=consistent,
+            filters=filters
+        )
+    except InvalidCursorError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='invalid cursor'
+        )
+
+    if not page.films:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='films not found'
+        )
+
+    body = _build_films_list_response(page, page_number, page_size).model_dump_json(exclude={'facets'}).encode()
+    if use_cache:
+        await response_cache.set(cache_key, body, config.settings.films_list_cache_ttl)
+    return Response(content=body, media_type='application/json')
 
 @router.get('/search/', response_model=FilmsListResponse)
 async def films_search(
         query: str = Query(description="Поиск по фильму"),
         page_size: int = Query(default=50, ge=1, le=100, description="Размер страницы"),
         page_number: int = Query(default=1, ge=1, description="Номер страницы"),
-        film_service: FilmService = Depends(get_film_service)
-) -> FilmsListResponse:
+        cursor: str | None = Query(default=None, description="Курсор следующей страницы, '*' - начать обход по курсору"),
+        consistent: bool = Query(default=False, description="Зафиксировать срез данных (point-in-time) на время обхода по курсору"),
+        filters: FilmFiltersModel = Depends(film_filters),
+        facets: str | None = Query(default=None, description="Фасеты через запятую: genres, rating"),
+        film_service: FilmService = Depends(get_film_service),
+        response_cache: ResponseCache = Depends(get_response_cache)
+) -> Response:
     """
     Получить список фильмов с пагинацией и сортировкой по рейтингу
     """
-    films = await film_service.get_search_films(
-        query=query,
-        page_size=page_size,
-        page_number=page_number
+    facet_names = _parse_facets(facets)
+    use_cache = not consistent
+    search_params = {'query': normalize_query(query), **filters.model_dump(exclude_none=True)}
+    cache_key = response_cache.build_key(
+        'films_search',
+        {**search_params, 'page_size': page_size, 'page_number': page_number, 'cursor': cursor}
     )
+    # Фасеты не зависят от страницы и кэшируются отдельно и дольше
+    facets_key = response_cache.build_key('films_facets', {**search_params, 'facets': facet_names})
+
+    body = await response_cache.get(cache_key) if use_cache else None
+    facets_body = await response_cache.get(facets_key) if use_cache and facet_names else None
+
+    if not body:
+        # Недостающие фасеты считаются тем же запросом, что и страница
+        missing_facets = facet_names if facet_names and not facets_body else None
+        try:
+            page = await film_service.get_search_films(
+                query=query,
+                page_size=page_size,
+                page_number=page_number,
+                cursor=cursor,
+                consistent=consistent,
+                filters=filters,
+                facets=missing_facets
+            )
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='invalid cursor'
+            )
+
+        if not page.films:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail='films not found'
+            )
+
+        body = _build_films_list_response(page, page_number, page_size).model_dump_json(exclude={'facets'}).encode()
+        if use_cache:
+            await response_cache.set(cache_key, body, config.settings.films_search_cache_ttl)
+        if page.facets is not None:
+            facets_body = _facets_json(page.facets)
+            if use_cache:
+                await response_cache.set(facets_key, facets_body, config.settings.films_facets_cache_ttl)
+    elif facet_names and not facets_body:
+        found_facets = await film_service.get_search_facets(query, facet_names, filters=filters)
+        if found_facets is not None:
+            facets_body = _facets_json(found_facets)
+            await response_cache.set(facets_key, facets_body, config.settings.films_facets_cache_ttl)
+
+    if facets_body:
+        body = _with_facets(body, facets_body)
+    return Response(content=body, media_type='application/json')
 
-    if not films:
+
+def _parse_facets(facets: str | None) -> list[str]:
+    names = list(dict.fromkeys(name.strip() for name in (facets or '').split(',') if name.strip()))
+    unknown = [name for name in names if name not in FACET_AGGREGATIONS]
+    if unknown:
         raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND,
-            detail='films not found'
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'unknown facets: {", ".join(unknown)}'
         )
+    return names
 
-    return FilmsListResponse(
-        films=[
-            FilmsResponse(
-                id=film.id,
-                title=film.title,
-                imdb_rating=film.imdb_rating
-            ) for film in films
-        ],
-        total=len(films),
-        page=page_number,
-        page_size=page_size,
-        total_pages=(len(films) + page_size - 1) // page_size
-    )
\ No newline at end of file
+
+def _facets_json(facets: dict[str, list[FacetBucketModel]]) -> bytes:
+    return FacetsAdapter.dump_json(facets)
+
+
+def _with_facets(body: bytes, facets_body: bytes) -> bytes:
+    """Добавить фасеты в JSON страницы без повторной сериализации"""
+    return body[:-1] + b',"facets":' + facets_body + b'}'
@@ -1,9 +1,10 @@
 from http import HTTPStatus
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 
-from src.services.genres import GenresService, get_film_service
+from src.cache.schema import schema_version
+from src.services.genres import GENRES_CACHE_SCHEMA_VERSION, GenresService, genres_snapshot, get_film_service
 
 router = APIRouter()
 
@@ -19,8 +20,17 @@ class GenresFullResponse(GenresResponse):
     films_count: int
 
 
+GENRES_DETAILS_FROM_CACHE_BYTES = schema_version(GenresFullResponse) == GENRES_CACHE_SCHEMA_VERSION
+
+
 @router.get('/{genres_id}', response_model=GenresFullResponse)
 async def genres_details(genres_id: str, genres_service: GenresService = Depends(get_film_service)) -> GenresFullResponse:
+    if GENRES_DETAILS_FROM_CACHE_BYTES:
+        body = await genres_service.get_json_by_id(genres_id)
+        if not body:
+            raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='genres not found')
+        return Response(content=body, media_type='application/json')
+
     genres = await genres_service.get_by_id(genres_id)
     if not genres:
 
@@ -37,33 +47,15 @@ async def genres_details(genres_id: str, genres_service: GenresService = Depends
 
 
 @router.get('/', response_model=list[GenresResponse])
-async def genres_list(
-        genres_service: GenresService = Depends(get_film_service)
-) -> list[GenresResponse]:
-    try:
-        result = await genres_service.elastic.search(
-            index='genres_test',
-            # index='genres',
-            body={
-                "query": {"match_all": {}},
-                "size": 100,
-            }
-        )
-
-        genres_list = []
-        for hit in result['hits']['hits']:
-            genres_data = hit['_source']
-            genres_list.append(
-                GenresResponse(
-                    id=hit['_id'],
-                    name=genres_data['name']
-                )
-            )
-
-        return genres_list
-    except Exception as e:
-        logger.error(f"Error getting genres list: {e}")
+async def genres_list() -> list[GenresResponse]:
+    """
+    Список жанров из снимка в памяти процесса
+    """
+    body = await genres_snapshot.get()
+    if body is None:
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail='Internal server error'
-        )
\ No newline at end of file
+        )
+
+    return Response(content=body, media_type='application/json')
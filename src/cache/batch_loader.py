@@ -0,0 +1,73 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.cache.single_flight import SharedFuture
+
+
+class BatchLoader:
+    """Объединение одиночных загрузок по ключу в пакетные (в стиле DataLoader).
+
+    Ключи, запрошенные в течение window секунд, загружаются одним вызовом
+    load_many; пакет уходит раньше, если набралось max_batch_size ключей.
+    Каждый ожидающий получает значение своего ключа или None, если его
+    нет в результате load_many. Пакет отменяется, когда его ключи больше
+    никто не ждет.
+    """
+
+    def __init__(
+            self,
+            load_many: Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+            max_batch_size: int = 100,
+            window: float = 0.001
+    ):
+        self.load_many = load_many
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._pending: dict[Hashable, SharedFuture] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._batches: set[asyncio.Future] = set()
+
+    async def load(self, key: Hashable) -> Any:
+        shared = self._pending.get(key)
+        if shared is None or shared.future.done():
+            shared = SharedFuture(asyncio.get_running_loop().create_future())
+            self._pending[key] = shared
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._dispatch)
+        return await shared.wait()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Ключи, которые перестали ждать до отправки пакета, не загружаются
+        batch = {key: shared.future for key, shared in self._pending.items() if not shared.future.done()}
+        self._pending = {}
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._load_batch(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+        for future in batch.values():
+            future.add_done_callback(lambda _: self._cancel_if_abandoned(task, batch))
+
+    async def _load_batch(self, batch: dict[Hashable, asyncio.Future]) -> None:
+        try:
+            results = await self.load_many(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    @staticmethod
+    def _cancel_if_abandoned(task: asyncio.Future, batch: dict[Hashable, asyncio.Future]) -> None:
+        if not task.done() and all(future.done() for future in batch.values()):
+            task.cancel()
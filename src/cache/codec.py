@@ -0,0 +1,166 @@
+import zlib
+from typing import Any
+
+import orjson
+
+from src.core import config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Заголовок значения: маркер, версия формата, сериализатор, сжатие.
+# Заголовок ASCII, поэтому значения по-прежнему читаются в redis-cli,
+# а JSON без заголовка (записанный до появления кодеков) начинается с '{'.
+HEADER_MAGIC = b'#'
+FORMAT_VERSION = b'1'
+# Версия формата со сроком свежести: после заголовка идет
+# '<мягкий срок>:<время пересчета>|', затем само значение
+FRESHNESS_FORMAT_VERSION = b'2'
+FRESHNESS_SEPARATOR = b'|'
+HEADER_SIZE = 4
+# JSON закэшированного отсутствия документа (encode(None))
+NULL_JSON = b'null'
+
+SERIALIZERS = {'json': b'j', 'msgpack': b'm'}
+COMPRESSIONS = {'none': b'-', 'zlib': b'z', 'zstd': b's', 'lz4': b'l'}
+
+
+class CacheCodecError(ValueError):
+    """Значение кэша не удалось закодировать или раскодировать"""
+
+
+def _serialize(serializer: bytes, obj: Any) -> bytes:
+    if serializer == SERIALIZERS['json']:
+        return orjson.dumps(obj)
+    if serializer == SERIALIZERS['msgpack'] and msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+    raise CacheCodecError(f"Serializer {serializer!r} is not available")
+
+
+def _deserialize(serializer: bytes, payload: bytes) -> Any:
+    if serializer == SERIALIZERS['json']:
+        return orjson.loads(payload)
+    if serializer == SERIALIZERS['msgpack'] and msgpack is not None:
+        return msgpack.unpackb(payload, raw=False)
+    raise CacheCodecError(f"Serializer {serializer!r} is not available")
+
+
+def _compress(compression: bytes, payload: bytes) -> bytes:
+    if compression == COMPRESSIONS['none']:
+        return payload
+    if compression == COMPRESSIONS['zlib']:
+        return zlib.compress(payload)
+    if compression == COMPRESSIONS['zstd'] and zstandard is not None:
+        return zstandard.ZstdCompressor().compress(payload)
+    if compression == COMPRESSIONS['lz4'] and lz4_frame is not None:
+        return lz4_frame.compress(payload)
+    raise CacheCodecError(f"Compression {compression!r} is not available")
+
+
+def _decompress(compression: bytes, payload: bytes) -> bytes:
+    if compression == COMPRESSIONS['none']:
+        return payload
+    if compression == COMPRESSIONS['zlib']:
+        return zlib.decompress(payload)
+    if compression == COMPRESSIONS['zstd'] and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if compression == COMPRESSIONS['lz4'] and lz4_frame is not None:
+        return lz4_frame.decompress(payload)
+    raise CacheCodecError(f"Compression {compression!r} is not available")
+
+
+class CacheCodec:
+    """Кодек значений кэша с заголовком версии.
+
+    Сериализатор и сжатие задаются только для записи. При чтении они
+    определяются по заголовку, поэтому смена кодека при поэтапной выкладке
+    не ломает значения, записанные старыми воркерами.
+    """
+
+    def __init__(self, serializer: str = 'json', compression: str = 'none', compression_threshold: int = 1024):
+        if serializer not in SERIALIZERS:
+            raise CacheCodecError(f"Unknown serializer: {serializer}")
+        if compression not in COMPRESSIONS:
+            raise CacheCodecError(f"Unknown compression: {compression}")
+
+        self.serializer = SERIALIZERS[serializer]
+        self.compression = COMPRESSIONS[compression]
+        self.compression_threshold = compression_threshold
+        # Проверяем, что выбранные библиотеки установлены, до первой записи
+        _compress(self.compression, _serialize(self.serializer, {}))
+
+    def encode(self, obj: Any, soft_expire_at: float | None = None, delta: float = 0.0) -> bytes:
+        """Значение с заголовком; soft_expire_at и delta записываются для stale-while-revalidate"""
+        payload = _serialize(self.serializer, obj)
+        compression = COMPRESSIONS['none']
+        if self.compression != compression and len(payload) >= self.compression_threshold:
+            compression = self.compression
+            payload = _compress(compression, payload)
+
+        if soft_expire_at is None:
+            return HEADER_MAGIC + FORMAT_VERSION + self.serializer + compression + payload
+
+        freshness = f'{soft_expire_at:.3f}:{delta:.4f}'.encode()
+        return (
+            HEADER_MAGIC + FRESHNESS_FORMAT_VERSION + self.serializer + compression
+            + freshness + FRESHNESS_SEPARATOR + payload
+        )
+
+    def decode(self, data: bytes) -> Any:
+        if not data.startswith(HEADER_MAGIC):
+            # Значение без заголовка: JSON, записанный до появления кодеков
+            return orjson.loads(data)
+
+        serializer, compression, payload = self._split(data)
+        return _deserialize(serializer, _decompress(compression, payload))
+
+    def to_json(self, data: bytes) -> bytes:
+        """JSON для тела ответа; несжатый JSON отдается без разбора"""
+        if not data.startswith(HEADER_MAGIC):
+            return data
+
+        serializer, compression, payload = self._split(data)
+        if serializer == SERIALIZERS['json'] and compression == COMPRESSIONS['none']:
+            return payload
+        return orjson.dumps(_deserialize(serializer, _decompress(compression, payload)))
+
+    def freshness(self, data: bytes) -> tuple[float, float] | None:
+        """Мягкий срок (unix time) и время пересчета значения; None, если их нет"""
+        if not data.startswith(HEADER_MAGIC) or data[1:2] != FRESHNESS_FORMAT_VERSION:
+            return None
+
+        meta = data[HEADER_SIZE:].partition(FRESHNESS_SEPARATOR)[0]
+        try:
+            soft_expire_at, _, delta = meta.partition(b':')
+            return float(soft_expire_at), float(delta)
+        except ValueError as e:
+            raise CacheCodecError(f"Invalid cache freshness: {meta!r}") from e
+
+    def _split(self, data: bytes) -> tuple[bytes, bytes, bytes]:
+        version = data[1:2]
+        if version == FORMAT_VERSION:
+            payload = data[HEADER_SIZE:]
+        elif version == FRESHNESS_FORMAT_VERSION:
+            payload = data[HEADER_SIZE:].partition(FRESHNESS_SEPARATOR)[2]
+        else:
+            raise CacheCodecError(f"Unsupported cache format version: {version!r}")
+        return data[2:3], data[3:4], payload
+
+
+cache_codec = CacheCodec(
+    serializer=config.settings.cache_serializer,
+    compression=config.settings.cache_compression,
+    compression_threshold=config.settings.cache_compression_threshold
+)
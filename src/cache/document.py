@@ -0,0 +1,230 @@
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from pydantic import BaseModel
+from redis.asyncio import Redis
+
+from src.cache.codec import NULL_JSON, cache_codec
+from src.cache.keys import CacheKeyspace
+from src.cache.local import LocalCache
+from src.cache.negative import MISSING, Missing
+from src.cache.single_flight import SingleFlight
+from src.cache.swr import Revalidator, should_refresh
+from src.core.metrics import CacheMetrics
+
+logger = logging.getLogger(__name__)
+
+# Документ индекса, MISSING (документа нет в индексе) или None (ошибка загрузки)
+Loaded = BaseModel | Missing | None
+
+
+class DocumentCache:
+    """Кэш документов индекса по id: L1 процесса, затем Redis, затем загрузка.
+
+    Отсутствие документа (MISSING) кэшируется коротко, negative_expire
+    секунд. Документ свеж expire секунд, после чего еще stale_ttl отдается
+    устаревшим, пока его обновляют в фоне (XFetch). Одновременные промахи
+    по одному id загружаются один раз.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            model: type[BaseModel],
+            redis: Redis,
+            local_cache: LocalCache,
+            keyspace: CacheKeyspace,
+            metrics: CacheMetrics,
+            load: Callable[[str], Awaitable[Loaded]],
+            expire: int,
+            negative_expire: int,
+            stale_ttl: int,
+            xfetch_beta: float = 1.0
+    ):
+        self.name = name
+        self.model = model
+        self.redis = redis
+        self.local_cache = local_cache
+        self.keyspace = keyspace
+        self.metrics = metrics
+        self.load = load
+        self.expire = expire
+        self.negative_expire = negative_expire
+        self.stale_ttl = stale_ttl
+        self.xfetch_beta = xfetch_beta
+        self._single_flight = SingleFlight()
+        self._revalidator = Revalidator()
+
+    async def get(self, doc_id: str) -> BaseModel | None:
+        doc = self._from_local_cache(doc_id)
+        if doc is None:
+            data = await self._raw_from_cache(doc_id)
+            if data:
+                self._revalidate_if_stale(doc_id, data)
+                doc = self._parse_cached(data)
+            if doc is None:
+                doc = await self._single_flight.do(doc_id, lambda: self._load(doc_id))
+            self._put_to_local_cache(doc_id, doc)
+        return doc or None
+
+    async def get_json(self, doc_id: str) -> bytes | None:
+        """JSON для ответа без разбора: из Redis байты отдаются как есть"""
+        doc = self._from_local_cache(doc_id)
+        if doc is not None:
+            return doc.model_dump_json().encode() if doc else None
+
+        data = await self._raw_from_cache(doc_id)
+        if data:
+            self._revalidate_if_stale(doc_id, data)
+            try:
+                body = cache_codec.to_json(data)
+                if body != NULL_JSON:
+                    return body
+                self.local_cache.set(doc_id, MISSING, self.negative_expire)
+                return None
+            except Exception as e:
+                logger.error(f"Error decoding {self.name} from cache: {e}")
+
+        doc = await self._single_flight.do(doc_id, lambda: self._load(doc_id))
+        self._put_to_local_cache(doc_id, doc)
+        return doc.model_dump_json().encode() if doc else None
+
+    async def get_many(
+            self,
+            doc_ids: list[str],
+            load_many: Callable[[list[str]], Awaitable[dict[str, BaseModel | Missing]]]
+    ) -> dict[str, BaseModel]:
+        """Пакетное получение: L1, затем один MGET в Redis и один вызов load_many"""
+        docs = {}
+        missing_ids = []
+        for doc_id in dict.fromkeys(doc_ids):
+            doc = self.local_cache.get(doc_id)
+            if doc is not None:
+                docs[doc_id] = doc
+            else:
+                missing_ids.append(doc_id)
+        self.metrics.local_hit.inc(len(docs))
+        self.metrics.local_miss.inc(len(missing_ids))
+
+        if missing_ids:
+            cached_docs = await self._many_from_cache(missing_ids)
+            docs.update(cached_docs)
+            missing_ids = [doc_id for doc_id in missing_ids if doc_id not in cached_docs]
+            self.metrics.redis_hit.inc(len(cached_docs))
+            self.metrics.redis_miss.inc(len(missing_ids))
+
+        if missing_ids:
+            started = time.monotonic()
+            loaded_docs = await load_many(missing_ids)
+            await self._put_many_to_cache(loaded_docs, time.monotonic() - started)
+            docs.update(loaded_docs)
+
+        for doc_id, doc in docs.items():
+            self._put_to_local_cache(doc_id, doc)
+        return {doc_id: doc for doc_id, doc in docs.items() if doc}
+
+    async def _load(self, doc_id: str) -> Loaded:
+        """Загрузка документа с записью в кэш"""
+        started = time.monotonic()
+        doc = await self.load(doc_id)
+        if doc is not None:
+            await self._put_to_cache(doc_id, doc, time.monotonic() - started)
+        return doc
+
+    async def _refresh(self, doc_id: str) -> None:
+        """Фоновое обновление; при ошибке загрузки в кэше остается устаревшее значение"""
+        doc = await self._single_flight.do(doc_id, lambda: self._load(doc_id))
+        self._put_to_local_cache(doc_id, doc)
+
+    def _revalidate_if_stale(self, doc_id: str, data: bytes) -> None:
+        try:
+            freshness = cache_codec.freshness(data)
+        except Exception as e:
+            logger.error(f"Error reading {self.name} cache freshness: {e}")
+            return
+
+        if freshness is not None and should_refresh(*freshness, beta=self.xfetch_beta):
+            self._revalidator.schedule(doc_id, lambda: self._refresh(doc_id))
+
+    def _parse_cached(self, data: bytes) -> BaseModel | Missing | None:
+        try:
+            doc_data = cache_codec.decode(data)
+            if doc_data is None:
+                return MISSING
+            return self.model.model_validate(doc_data)
+        except Exception as e:
+            logger.error(f"Error parsing {self.name} from cache: {e}")
+            return None
+
+    def _from_local_cache(self, doc_id: str) -> BaseModel | Missing | None:
+        doc = self.local_cache.get(doc_id)
+        if doc is None:
+            self.metrics.local_miss.inc()
+        else:
+            self.metrics.local_hit.inc()
+        return doc
+
+    async def _raw_from_cache(self, doc_id: str) -> bytes | None:
+        try:
+            data = await self.redis.get(self.keyspace.key(doc_id))
+        except Exception as e:
+            logger.error(f"Error getting {self.name} from cache: {e}")
+            return None
+
+        if data:
+            self.metrics.redis_hit.inc()
+        else:
+            self.metrics.redis_miss.inc()
+        return data
+
+    async def _many_from_cache(self, doc_ids: list[str]) -> dict[str, BaseModel | Missing]:
+        try:
+            values = await self.redis.mget(self.keyspace.keys(doc_ids))
+        except Exception as e:
+            logger.error(f"Error getting {self.name} from cache: {e}")
+            return {}
+
+        docs = {}
+        for doc_id, data in zip(doc_ids, values):
+            if data:
+                self._revalidate_if_stale(doc_id, data)
+            if data and (doc := self._parse_cached(data)) is not None:
+                docs[doc_id] = doc
+        return docs
+
+    def _cache_entry(self, doc: BaseModel | Missing, delta: float = 0.0) -> tuple[bytes, int]:
+        """Значение и время жизни записи кэша"""
+        if doc is MISSING:
+            return cache_codec.encode(None), self.negative_expire
+        value = cache_codec.encode(
+            doc.model_dump(),
+            soft_expire_at=time.time() + self.expire,
+            delta=delta
+        )
+        return value, self.expire + self.stale_ttl
+
+    def _put_to_local_cache(self, doc_id: str, doc: Loaded) -> None:
+        if doc is MISSING:
+            self.local_cache.set(doc_id, MISSING, self.negative_expire)
+        elif doc is not None:
+            self.local_cache.set(doc_id, doc)
+
+    async def _put_to_cache(self, doc_id: str, doc: BaseModel | Missing, delta: float = 0.0) -> None:
+        try:
+            await self.redis.set(self.keyspace.key(doc_id), *self._cache_entry(doc, delta))
+        except Exception as e:
+            logger.error(f"Error putting {self.name} to cache: {e}")
+
+    async def _put_many_to_cache(self, docs: dict[str, BaseModel | Missing], delta: float = 0.0) -> None:
+        """Запись пачки документов в кэш одним пайплайном"""
+        if not docs:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for doc_id, doc in docs.items():
+                    pipe.set(self.keyspace.key(doc_id), *self._cache_entry(doc, delta))
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error putting {self.name} to cache: {e}")
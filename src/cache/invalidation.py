@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from src.cache.keys import CacheKeyspace
+
+logger = logging.getLogger(__name__)
+
+InvalidationHandler = Callable[[Redis, list[str]], Awaitable[None]]
+
+
+class InvalidationListener:
+    """Подписчик на канал изменений, который публикует ETL.
+
+    Сообщение канала: {"entity": "film", "ids": [...]}. Для каждой сущности
+    вызываются зарегистрированные обработчики, которые сбрасывают ключи
+    в Redis и в кэшах процесса. Сообщение {"entity": "film", "generation": N}
+    переключает пространство ключей сущности на новое поколение.
+    """
+
+    def __init__(
+            self,
+            redis: Redis,
+            channel: str,
+            subscriber: Redis | None = None,
+            reconnect_delay: float = 1.0,
+            poll_timeout: float = 1.0
+    ):
+        self.redis = redis
+        self.channel = channel
+        # Подписке нужен клиент без таймаута чтения (create_pubsub_redis),
+        # redis остается для сброса ключей обработчиками
+        self.subscriber = subscriber or redis
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self._handlers: dict[str, list[InvalidationHandler]] = defaultdict(list)
+        self._keyspaces: dict[str, CacheKeyspace] = {}
+
+    def register(self, entity: str, handler: InvalidationHandler) -> None:
+        self._handlers[entity].append(handler)
+
+    def register_keyspace(self, keyspace: CacheKeyspace) -> None:
+        self._keyspaces[keyspace.entity] = keyspace
+
+    async def run(self) -> None:
+        """Слушать канал до отмены задачи, переподключаясь при ошибках"""
+        while True:
+            try:
+                async with self.subscriber.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    logger.info(f"Listening for cache invalidations on '{self.channel}'")
+                    while True:
+                        # Ожидание с таймаутом не зависит от таймаута сокета и дает
+                        # клиенту отправлять PING проверки соединения
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True,
+                            timeout=self.poll_timeout
+                        )
+                        if message is not None and message['type'] == 'message':
+                            await self.dispatch(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def dispatch(self, data: bytes | str) -> None:
+        try:
+            message = json.loads(data)
+            entity = message['entity']
+            if 'generation' in message:
+                keyspace = self._keyspaces.get(entity)
+                if keyspace is not None:
+                    keyspace.set_generation(int(message['generation']))
+                return
+            ids = list(message['ids'])
+        except Exception as e:
+            logger.error(f"Invalid cache invalidation message: {e}")
+            return
+
+        for handler in self._handlers.get(entity, []):
+            try:
+                await handler(self.redis, ids)
+            except Exception as e:
+                logger.error(f"Error invalidating {entity} cache: {e}")
+
+
+listener: InvalidationListener | None = None
@@ -0,0 +1,121 @@
+"""Ключи документов в Redis: сущность, версия схемы и поколение.
+
+Формат ключа: '{entity}:v{schema_version}:g{generation}:{id}'.
+Версия схемы меняется вместе с моделью, поэтому после выкладки
+несовместимые значения просто не читаются и истекают по TTL.
+Поколение хранится в Redis; его увеличение разом делает недоступными
+все ключи сущности без SCAN. Воркеры узнают о новом поколении
+из канала инвалидации и периодическим перечитыванием. Значение в Redis
+главнее значения процесса: после FLUSHDB или переключения на реплику
+счетчик может стать меньше, и воркеры переходят на него.
+
+Увеличить поколение из консоли:
+
+    python -m src.cache.keys film genres
+"""
+import asyncio
+import json
+import logging
+import sys
+from collections.abc import Callable, Iterable
+
+from redis.asyncio import Redis
+
+from src.core import config
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'cache:generation:{entity}'
+
+
+async def bump_generation(redis: Redis, entity: str, channel: str) -> int:
+    """Увеличить поколение сущности и сообщить о нем воркерам"""
+    generation = await redis.incr(GENERATION_KEY.format(entity=entity))
+    await redis.publish(channel, json.dumps({"entity": entity, "generation": generation}))
+    return generation
+
+
+class CacheKeyspace:
+    """Построитель ключей одной сущности с текущим поколением процесса"""
+
+    def __init__(
+            self,
+            entity: str,
+            schema_version: str,
+            on_change: Callable[[], None] | None = None
+    ):
+        self.entity = entity
+        self.schema_version = schema_version
+        self.on_change = on_change
+        self.generation = 0
+        # Порядковые номера обращений за поколением: ответ, полученный позже
+        # более нового значения, не должен откатывать поколение назад
+        self._reads = 0
+        self._applied_read = 0
+
+    @property
+    def prefix(self) -> str:
+        return f'{self.entity}:v{self.schema_version}:g{self.generation}:'
+
+    def key(self, item_id: str) -> str:
+        return self.prefix + item_id
+
+    def keys(self, item_ids: Iterable[str]) -> list[str]:
+        prefix = self.prefix
+        return [prefix + item_id for item_id in item_ids]
+
+    def set_generation(self, generation: int) -> bool:
+        """Переключиться на поколение, полученное из Redis только что"""
+        return self._apply_generation(generation, self._next_read())
+
+    async def load_generation(self, redis: Redis) -> None:
+        read = self._next_read()
+        try:
+            value = await redis.get(GENERATION_KEY.format(entity=self.entity))
+        except Exception as e:
+            logger.error(f"Error loading {self.entity} cache generation: {e}")
+            return
+        self._apply_generation(int(value or 0), read)
+
+    def _next_read(self) -> int:
+        self._reads += 1
+        return self._reads
+
+    def _apply_generation(self, generation: int, read: int) -> bool:
+        if read < self._applied_read:
+            # Пока шел этот запрос, процесс уже узнал более свежее значение
+            return False
+        self._applied_read = read
+        if generation == self.generation:
+            return False
+
+        logger.info(f"{self.entity} cache generation changed: {self.generation} -> {generation}")
+        self.generation = generation
+        if self.on_change is not None:
+            self.on_change()
+        return True
+
+    async def bump(self, redis: Redis, channel: str) -> int:
+        generation = await bump_generation(redis, self.entity, channel)
+        self.set_generation(generation)
+        return generation
+
+    async def run(self, redis: Redis, interval: float) -> None:
+        """Перечитывание поколения до отмены задачи, если сообщение канала потерялось"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.load_generation(redis)
+
+
+async def _bump_from_cli(entities: list[str]) -> None:
+    redis = Redis(host=config.settings.redis_host, port=config.settings.redis_port)
+    try:
+        for entity in entities:
+            generation = await bump_generation(redis, entity, config.settings.cache_invalidation_channel)
+            print(f'{entity}: generation {generation}')
+    finally:
+        await redis.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(_bump_from_cli(sys.argv[1:] or ['film', 'genres']))
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from src.core import metrics
+
+
+class LocalCache:
+    """Кэш в памяти процесса (L1) с вытеснением LRU, ограничением размера и TTL.
+
+    Хранит уже провалидированные объекты, поэтому попадание не требует
+    ни похода в Redis, ни разбора JSON. Попадания и промахи считает
+    вызывающий (CacheMetrics), сам кэш отдает в Prometheus размер
+    и число вытеснений.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._evictions = metrics.LOCAL_CACHE_EVICTIONS.labels(name)
+        metrics.LOCAL_CACHE_SIZE.labels(name).set_function(self.__len__)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        if self.max_size <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self._evictions.inc()
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
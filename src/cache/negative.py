@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import logging
+import math
+from collections.abc import Awaitable, Callable, Iterable
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_scan
+
+logger = logging.getLogger(__name__)
+
+
+class Missing:
+    """Маркер отрицательного кэширования: документа нет в индексе"""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+
+MISSING = Missing()
+
+
+class BloomFilter:
+    """Bloom-фильтр на bytearray с двойным хэшированием blake2b"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class KnownIds:
+    """Bloom-фильтр известных id индекса, пересобираемый в фоне.
+
+    Пока фильтр не построен (или выключен), пропускает любой id.
+    Новые id, пришедшие из канала инвалидации между пересборками,
+    добавляются в фильтр сразу, чтобы свежие документы не отсекались.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            loader: Callable[[], Awaitable[list[str]]],
+            refresh_interval: float,
+            error_rate: float = 0.01
+    ):
+        self.name = name
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self._bloom: BloomFilter | None = None
+        self._added_during_rebuild: list[str] | None = None
+
+    def might_exist(self, item_id: str) -> bool:
+        return self._bloom is None or item_id in self._bloom
+
+    def add(self, item_ids: Iterable[str]) -> None:
+        item_ids = list(item_ids)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.extend(item_ids)
+        if self._bloom is not None:
+            for item_id in item_ids:
+                self._bloom.add(item_id)
+
+    async def rebuild(self) -> None:
+        self._added_during_rebuild = []
+        try:
+            item_ids = await self.loader()
+            bloom = BloomFilter(capacity=int(len(item_ids) * 1.5) + 1000, error_rate=self.error_rate)
+            for item_id in (*item_ids, *self._added_during_rebuild):
+                bloom.add(item_id)
+            self._bloom = bloom
+            logger.info(f"{self.name} bloom filter rebuilt with {len(item_ids)} ids")
+        except Exception as e:
+            logger.error(f"Error rebuilding {self.name} bloom filter: {e}")
+        finally:
+            self._added_during_rebuild = None
+
+    async def run(self) -> None:
+        """Периодическая пересборка до отмены задачи"""
+        while True:
+            await self.rebuild()
+            await asyncio.sleep(self.refresh_interval)
+
+
+async def scan_index_ids(elastic: AsyncElasticsearch, index: str) -> list[str]:
+    """Все id документов индекса без загрузки _source"""
+    return [
+        hit['_id']
+        async for hit in async_scan(
+            elastic,
+            index=index,
+            query={"query": {"match_all": {}}, "_source": False},
+            size=5000
+        )
+    ]
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from src.core.metrics import CacheMetrics
+from src.core.profiling import profiling_requested
+from src.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+response_cache_metrics = CacheMetrics('response')
+
+
+def normalize_query(query: str) -> str:
+    """Нормализация поисковой строки: регистр и лишние пробелы не влияют на ключ"""
+    return ' '.join(query.lower().split())
+
+
+class ResponseCache:
+    """Кэш готовых (сериализованных) ответов ручек в Redis"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def build_key(route: str, params: dict[str, Any]) -> str:
+        """Канонический ключ: хэш маршрута и отсортированных параметров запроса"""
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        digest = hashlib.sha256(f'{route}?{canonical}'.encode()).hexdigest()
+        return f'response:{route}:{digest}'
+
+    async def get(self, key: str) -> bytes | None:
+        if profiling_requested():
+            # Профилируемый запрос должен дойти до Elasticsearch
+            return None
+
+        try:
+            body = await self.redis.get(key)
+        except Exception as e:
+            logger.error(f"Error getting response from cache: {e}")
+            return None
+
+        if body:
+            response_cache_metrics.redis_hit.inc()
+        else:
+            response_cache_metrics.redis_miss.inc()
+        return body
+
+    async def set(self, key: str, body: bytes, expire: int) -> None:
+        try:
+            await self.redis.set(key, body, expire)
+        except Exception as e:
+            logger.error(f"Error putting response to cache: {e}")
+
+
+@lru_cache()
+def get_response_cache(redis: Redis = Depends(get_redis)) -> ResponseCache:
+    return ResponseCache(redis)
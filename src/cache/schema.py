@@ -0,0 +1,18 @@
+import hashlib
+import json
+
+from pydantic import BaseModel
+
+
+def schema_version(model: type[BaseModel]) -> str:
+    """Короткий отпечаток схемы модели: набор полей, их типы и обязательность.
+
+    Имя класса в отпечаток не входит, поэтому модели с одинаковыми полями
+    (модель сервиса и модель ответа ручки) получают одну и ту же версию.
+    """
+    schema = model.model_json_schema()
+    fingerprint = json.dumps(
+        {'properties': schema.get('properties', {}), 'required': schema.get('required', [])},
+        sort_keys=True
+    )
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
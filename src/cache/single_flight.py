@@ -0,0 +1,65 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.core.deadline import request_deadline, with_deadline
+
+
+class SharedFuture:
+    """Future, который ждут несколько вызывающих.
+
+    Каждый ожидающий ограничен своим сроком запроса. Когда уходит последний
+    ожидающий (истек срок, запрос отменен), future отменяется и освобождает
+    соединение, если результат больше никому не нужен.
+    """
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+        future.add_done_callback(self._retrieve)
+
+    async def wait(self) -> Any:
+        self.waiters += 1
+        try:
+            # shield: отмена одного ожидающего не отменяет future для остальных
+            return await with_deadline(asyncio.shield(self.future))
+        finally:
+            self.waiters -= 1
+            if not self.waiters and not self.future.done():
+                self.future.cancel()
+
+    @staticmethod
+    def _retrieve(future: asyncio.Future) -> None:
+        # Помечаем исключение как полученное, даже если все ожидающие ушли
+        if not future.cancelled():
+            future.exception()
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом в один.
+
+    Пока вызов по ключу выполняется, остальные обратившиеся ждут
+    его общий результат вместо того, чтобы повторять запрос.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, SharedFuture] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = SharedFuture(asyncio.ensure_future(self._detached(func)))
+            self._calls[key] = call
+            call.future.add_done_callback(lambda done: self._forget(key, call))
+        return await call.wait()
+
+    @staticmethod
+    async def _detached(func: Callable[[], Awaitable[Any]]) -> Any:
+        # Общий вызов не наследует срок первого обратившегося: он длится,
+        # пока его ждет хотя бы один запрос, и отменяется вместе с последним
+        request_deadline.set(None)
+        return await func()
+
+    def _forget(self, key: Hashable, call: SharedFuture) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from src.cache.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """Заранее сериализованный снимок небольшого редко меняющегося справочника.
+
+    Снимок хранится в памяти процесса и обновляется фоновой задачей
+    раз в refresh_interval секунд или сразу после request_refresh().
+    Ручка отдает готовые байты, не обращаясь ни к Elasticsearch, ни к Redis.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Awaitable[bytes]], refresh_interval: float):
+        self.name = name
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.body: bytes | None = None
+        self.updated_at: float | None = None
+        self._refresh_requested = asyncio.Event()
+        self._single_flight = SingleFlight()
+
+    async def get(self) -> bytes | None:
+        """Текущий снимок; если его еще нет, загружается сразу"""
+        if self.body is None:
+            await self._single_flight.do(self.name, self.refresh)
+        return self.body
+
+    async def refresh(self) -> bytes | None:
+        try:
+            self.body = await self.loader()
+            self.updated_at = time.monotonic()
+        except Exception as e:
+            # Оставляем предыдущий снимок до следующей удачной загрузки
+            logger.error(f"Error refreshing {self.name} snapshot: {e}")
+        return self.body
+
+    def request_refresh(self) -> None:
+        self._refresh_requested.set()
+
+    async def run(self) -> None:
+        """Фоновое обновление до отмены задачи"""
+        while True:
+            await self._single_flight.do(self.name, self.refresh)
+            try:
+                await asyncio.wait_for(self._refresh_requested.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_requested.clear()
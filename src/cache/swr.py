@@ -0,0 +1,54 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from src.core.deadline import request_deadline
+
+logger = logging.getLogger(__name__)
+
+
+def should_refresh(soft_expire_at: float, delta: float, beta: float = 1.0, now: float | None = None) -> bool:
+    """Вероятностное раннее обновление (XFetch).
+
+    Чем ближе мягкий срок и чем дольше пересчет значения (delta),
+    тем выше вероятность обновить его заранее. После мягкого срока
+    обновление нужно всегда.
+    """
+    now = time.time() if now is None else now
+    return now - delta * beta * math.log(1.0 - random.random()) >= soft_expire_at
+
+
+class Revalidator:
+    """Фоновое обновление устаревших значений кэша.
+
+    По каждому ключу одновременно выполняется не больше одного обновления,
+    запрос, который его запустил, не ждет результата.
+    """
+
+    def __init__(self):
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    def schedule(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._tasks:
+            return False
+
+        task = asyncio.create_task(self._detached(func))
+        self._tasks[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return True
+
+    @staticmethod
+    async def _detached(func: Callable[[], Awaitable[Any]]) -> Any:
+        # Обновление кэша переживает запрос, который его запустил, и не ограничено его сроком
+        request_deadline.set(None)
+        return await func()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error revalidating cache for {key}: {task.exception()}")
@@ -25,11 +25,125 @@ class Settings(BaseSettings):
     redis_host: str = Field('redis')
     # redis_host: str = Field('127.0.0.1', alias='REDIS_HOST')
     redis_port: int = Field(6379, alias='REDIS_PORT')
+    # Пул соединений Redis: при исчерпании запрос ждет свободное соединение до redis_pool_timeout
+    redis_max_connections: int = Field(100, alias='REDIS_MAX_CONNECTIONS')
+    redis_min_connections: int = Field(5, alias='REDIS_MIN_CONNECTIONS')
+    redis_pool_timeout: float = Field(2.0, alias='REDIS_POOL_TIMEOUT')
+    redis_socket_timeout: float = Field(1.0, alias='REDIS_SOCKET_TIMEOUT')
+    redis_socket_connect_timeout: float = Field(1.0, alias='REDIS_SOCKET_CONNECT_TIMEOUT')
+    redis_socket_keepalive: bool = Field(True, alias='REDIS_SOCKET_KEEPALIVE')
+    redis_health_check_interval: int = Field(30, alias='REDIS_HEALTH_CHECK_INTERVAL')
+    redis_retry_on_timeout: bool = Field(True, alias='REDIS_RETRY_ON_TIMEOUT')
+    redis_retries: int = Field(1, alias='REDIS_RETRIES')
+    # Разбор ответов через hiredis (если пакет установлен)
+    redis_hiredis: bool = Field(True, alias='REDIS_HIREDIS')
 
     elastic_schema: str = Field('http://', alias='ELASTIC_SCHEMA')
     # elastic_host: str = Field('127.0.0.1', alias='ELASTIC_HOST')
     elastic_host: str = Field('elasticsearch')
     elastic_port: int = Field(9200, alias='ELASTIC_PORT')
+    # Соединения к одному узлу Elasticsearch и сколько из них открыть при старте
+    elastic_connections_per_node: int = Field(25, alias='ELASTIC_CONNECTIONS_PER_NODE')
+    elastic_min_connections: int = Field(5, alias='ELASTIC_MIN_CONNECTIONS')
+    elastic_request_timeout: float = Field(5.0, alias='ELASTIC_REQUEST_TIMEOUT')
+    elastic_max_retries: int = Field(2, alias='ELASTIC_MAX_RETRIES')
+    elastic_retry_on_timeout: bool = Field(True, alias='ELASTIC_RETRY_ON_TIMEOUT')
+    elastic_http_compress: bool = Field(False, alias='ELASTIC_HTTP_COMPRESS')
+    # Предохранитель запросов к Elasticsearch: размыкается по доле ошибок
+    # или медленных вызовов среди последних ELASTIC_BREAKER_WINDOW вызовов
+    elastic_breaker_enabled: bool = Field(True, alias='ELASTIC_BREAKER_ENABLED')
+    elastic_breaker_failure_rate: float = Field(0.5, alias='ELASTIC_BREAKER_FAILURE_RATE')
+    elastic_breaker_slow_call_duration: float = Field(2.0, alias='ELASTIC_BREAKER_SLOW_CALL_DURATION')
+    elastic_breaker_slow_call_rate: float = Field(0.8, alias='ELASTIC_BREAKER_SLOW_CALL_RATE')
+    elastic_breaker_window: int = Field(50, alias='ELASTIC_BREAKER_WINDOW')
+    elastic_breaker_min_calls: int = Field(20, alias='ELASTIC_BREAKER_MIN_CALLS')
+    elastic_breaker_open_seconds: float = Field(5.0, alias='ELASTIC_BREAKER_OPEN_SECONDS')
+    elastic_breaker_half_open_calls: int = Field(3, alias='ELASTIC_BREAKER_HALF_OPEN_CALLS')
+    # Дублирование идемпотентных чтений на другую копию шарда после задержки по перцентилю
+    elastic_hedging_enabled: bool = Field(False, alias='ELASTIC_HEDGING_ENABLED')
+    elastic_hedge_percentile: float = Field(95, alias='ELASTIC_HEDGE_PERCENTILE')
+    elastic_hedge_min_delay: float = Field(0.01, alias='ELASTIC_HEDGE_MIN_DELAY')
+    # Время жизни point-in-time между запросами страниц по курсору
+    elastic_pit_keep_alive: str = Field('1m', alias='ELASTIC_PIT_KEEP_ALIVE')
+    # Индекс списков и поиска фильмов; из него же ETL строит рейтинги в Redis
+    elastic_films_index: str = Field('movies_test', alias='ELASTIC_FILMS_INDEX')
+
+    # Время жизни закэшированных ответов ручек (в секундах)
+    films_list_cache_ttl: int = Field(60, alias='FILMS_LIST_CACHE_TTL')
+    films_search_cache_ttl: int = Field(30, alias='FILMS_SEARCH_CACHE_TTL')
+    # Фасеты зависят только от запроса и фильтров и меняются медленнее страниц
+    films_facets_cache_ttl: int = Field(600, alias='FILMS_FACETS_CACHE_TTL')
+
+    # Время жизни документов фильмов и жанров в Redis
+    film_cache_expire_in_seconds: int = Field(60 * 5, alias='FILM_CACHE_EXPIRE_IN_SECONDS')
+    genres_cache_expire_in_seconds: int = Field(60 * 5, alias='GENRES_CACHE_EXPIRE_IN_SECONDS')
+    # После этого срока документ считается устаревшим, но еще отдается,
+    # пока идет фоновое обновление или пока Elasticsearch недоступен
+    cache_stale_ttl: int = Field(60 * 60, alias='CACHE_STALE_TTL')
+    # Коэффициент XFetch: чем больше, тем раньше начинается обновление
+    cache_xfetch_beta: float = Field(1.0, alias='CACHE_XFETCH_BETA')
+    # Время жизни записи об отсутствующем документе (ответ 404)
+    negative_cache_expire_in_seconds: int = Field(30, alias='NEGATIVE_CACHE_EXPIRE_IN_SECONDS')
+    # Bloom-фильтр известных id: отсекает несуществующие id до обращения к Redis и ES
+    bloom_filter_enabled: bool = Field(False, alias='BLOOM_FILTER_ENABLED')
+    bloom_filter_refresh_interval: float = Field(600.0, alias='BLOOM_FILTER_REFRESH_INTERVAL')
+    bloom_filter_error_rate: float = Field(0.01, alias='BLOOM_FILTER_ERROR_RATE')
+    # Канал Redis, в который ETL публикует id измененных документов
+    cache_invalidation_channel: str = Field('cache_invalidation', alias='CACHE_INVALIDATION_CHANNEL')
+    # Период перечитывания поколений ключей кэша на случай потерянного сообщения канала
+    cache_generation_refresh_interval: float = Field(30.0, alias='CACHE_GENERATION_REFRESH_INTERVAL')
+
+    # Период фонового обновления снимка списка жанров (в секундах)
+    genres_snapshot_refresh_interval: float = Field(60.0, alias='GENRES_SNAPSHOT_REFRESH_INTERVAL')
+
+    # Кэш в памяти процесса (L1) перед Redis для детальных ручек
+    local_cache_max_size: int = Field(10000, alias='LOCAL_CACHE_MAX_SIZE')
+    local_cache_ttl: float = Field(10.0, alias='LOCAL_CACHE_TTL')
+
+    # Кодек значений кэша: json | msgpack, сжатие: none | zlib | zstd | lz4.
+    # msgpack, zstd и lz4 требуют пакетов msgpack, zstandard и lz4
+    cache_serializer: str = Field('json', alias='CACHE_SERIALIZER')
+    cache_compression: str = Field('none', alias='CACHE_COMPRESSION')
+    cache_compression_threshold: int = Field(1024, alias='CACHE_COMPRESSION_THRESHOLD')
+
+    # Токен профилирования запросов по заголовку X-Profile; без него профилирование выключено
+    profiling_token: str | None = Field(None, alias='PROFILING_TOKEN')
+    # Профилировщик: pyinstrument (семплирующий) или cprofile (детерминированный,
+    # заметно дороже для профилируемого запроса; когда pyinstrument недоступен)
+    profiling_profiler: str = Field('pyinstrument', alias='PROFILING_PROFILER')
+    # Интервал семплирования pyinstrument (в секундах)
+    profiling_interval: float = Field(0.001, alias='PROFILING_INTERVAL')
+
+    # Максимальное число id в пакетном запросе фильмов
+    films_batch_max_size: int = Field(300, alias='FILMS_BATCH_MAX_SIZE')
+    # Списки по рейтингу из рейтингов, которые ETL поддерживает в Redis
+    film_rankings_enabled: bool = Field(True, alias='FILM_RANKINGS_ENABLED')
+    # Промахи по карточкам фильмов, пришедшие за окно (в секундах), загружаются одним mget
+    film_mget_batching_enabled: bool = Field(True, alias='FILM_MGET_BATCHING_ENABLED')
+    film_mget_batch_window: float = Field(0.001, alias='FILM_MGET_BATCH_WINDOW')
+    film_mget_batch_max_size: int = Field(100, alias='FILM_MGET_BATCH_MAX_SIZE')
+
+    # Срок обработки запросов по классам (в секундах); клиент может задать свой
+    # заголовком X-Request-Timeout, но не больше request_timeout_max
+    request_deadline_enabled: bool = Field(True, alias='REQUEST_DEADLINE_ENABLED')
+    request_timeout_detail: float = Field(1.0, alias='REQUEST_TIMEOUT_DETAIL')
+    request_timeout_list: float = Field(3.0, alias='REQUEST_TIMEOUT_LIST')
+    request_timeout_search: float = Field(5.0, alias='REQUEST_TIMEOUT_SEARCH')
+    request_timeout_max: float = Field(30.0, alias='REQUEST_TIMEOUT_MAX')
+
+    # Адаптивный лимит одновременных запросов по классам detail, list и search.
+    # Выключен по умолчанию: целевые задержки нужно подобрать под свою нагрузку,
+    # иначе лимит режет запросы и при здоровом бэкенде
+    load_shedding_enabled: bool = Field(False, alias='LOAD_SHEDDING_ENABLED')
+    load_shedding_initial_limit: int = Field(20, alias='LOAD_SHEDDING_INITIAL_LIMIT')
+    load_shedding_min_limit: int = Field(2, alias='LOAD_SHEDDING_MIN_LIMIT')
+    load_shedding_max_limit: int = Field(200, alias='LOAD_SHEDDING_MAX_LIMIT')
+    load_shedding_backoff: float = Field(0.9, alias='LOAD_SHEDDING_BACKOFF')
+    # Целевая задержка классов (в секундах): медленнее — лимит уменьшается
+    load_shedding_detail_latency: float = Field(0.05, alias='LOAD_SHEDDING_DETAIL_LATENCY')
+    load_shedding_list_latency: float = Field(0.3, alias='LOAD_SHEDDING_LIST_LATENCY')
+    load_shedding_search_latency: float = Field(0.5, alias='LOAD_SHEDDING_SEARCH_LATENCY')
+    load_shedding_retry_after: int = Field(1, alias='LOAD_SHEDDING_RETRY_AFTER')
     BASE_DIR: ClassVar[Path] = Path(__file__).parent.parent.parent
 
     @property
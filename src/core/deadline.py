@@ -0,0 +1,140 @@
+"""Крайний срок обработки запроса.
+
+DeadlineMiddleware задает срок из заголовка X-Request-Timeout (в секундах,
+не больше максимума из настроек) или из значения по умолчанию для класса
+маршрута. Срок хранится в контекстной переменной, и каждое обращение
+к Elasticsearch и Redis ждет не дольше оставшегося времени (with_deadline).
+
+Если срок истек до начала ответа, клиент получает 504. Если клиент
+отключился, обработка запроса отменяется и освобождает соединения.
+"""
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable
+from contextvars import ContextVar
+from typing import TypeVar
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.load_shedding import route_class
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+TIMEOUT_HEADER = 'x-request-timeout'
+
+# Момент time.monotonic(), к которому запрос должен быть обработан; None — без срока
+request_deadline: ContextVar[float | None] = ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Срок обработки запроса истек"""
+
+
+def remaining() -> float | None:
+    """Оставшееся время запроса в секундах; None, если срок не задан"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+async def with_deadline(awaitable: Awaitable[T]) -> T:
+    """Ждать результат не дольше оставшегося времени запроса"""
+    timeout = remaining()
+    if timeout is None:
+        return await awaitable
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded('Request deadline exceeded')
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        # Таймаут самой операции (не срока запроса) пробрасываем как есть
+        if remaining() > 0:
+            raise
+        raise DeadlineExceeded('Request deadline exceeded') from None
+
+
+class DeadlineMiddleware:
+    """ASGI-middleware, задающая срок запроса и отменяющая брошенные запросы"""
+
+    def __init__(self, app: ASGIApp, timeouts: dict[str, float], max_timeout: float):
+        self.app = app
+        self.timeouts = timeouts
+        self.max_timeout = max_timeout
+
+    def _timeout(self, scope: Scope) -> float | None:
+        default = self.timeouts.get(route_class(scope['path']))
+        if default is None:
+            return None
+        header = Headers(scope=scope).get(TIMEOUT_HEADER)
+        if header is None:
+            return default
+        try:
+            timeout = float(header)
+        except ValueError:
+            return default
+        return min(timeout, self.max_timeout) if timeout > 0 else default
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timeout = self._timeout(scope) if scope['type'] == 'http' else None
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = time.monotonic() + timeout
+        messages: asyncio.Queue = asyncio.Queue()
+        response_started = False
+
+        async def watch_disconnect() -> None:
+            # Сообщения клиента читаются заранее, чтобы сразу заметить отключение
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message['type'] == 'http.disconnect':
+                    return
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                if time.monotonic() >= deadline:
+                    raise DeadlineExceeded('Request deadline exceeded')
+                response_started = True
+            await send(message)
+
+        token = request_deadline.set(deadline)
+        try:
+            app_task = asyncio.ensure_future(self.app(scope, messages.get, send_wrapper))
+        finally:
+            request_deadline.reset(token)
+        watcher = asyncio.ensure_future(watch_disconnect())
+
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, watcher},
+                timeout=deadline - time.monotonic(),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if app_task in done:
+                app_task.result()
+                return
+            if watcher in done:
+                logger.info(f"Client disconnected, cancelling {scope['method']} {scope['path']}")
+                return
+            raise DeadlineExceeded('Request deadline exceeded')
+        except DeadlineExceeded:
+            logger.warning(f"Deadline of {timeout:.3f}s exceeded for {scope['method']} {scope['path']}")
+            if not response_started:
+                response = JSONResponse({'detail': 'Request deadline exceeded'}, status_code=504)
+                await response(scope, receive, send)
+        finally:
+            for task in (app_task, watcher):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(app_task, watcher, return_exceptions=True)
@@ -0,0 +1,128 @@
+"""Адаптивное ограничение конкурентности и сброс нагрузки.
+
+Запросы API делятся на классы по стоимости: detail (карточки фильмов
+и жанров, в основном из кэша), list (страницы и пакеты фильмов, список
+жанров) и search (полнотекстовый поиск). У каждого класса свой лимит
+одновременно выполняемых запросов, поэтому всплеск поиска не занимает
+место дешевых запросов карточек.
+
+Лимит подстраивается по схеме AIMD: каждый ответ быстрее целевой
+задержки класса при загруженном лимите увеличивает его примерно на 1
+за «окно» из limit запросов, медленный ответ или 5xx уменьшает его
+в backoff раз (не чаще раза за окно). Запрос сверх лимита сразу
+получает 503 с Retry-After, а не ждет в очереди перед Elasticsearch.
+"""
+import time
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core import metrics
+
+API_PREFIX = '/api/v1/'
+
+# Маршруты, которые относятся к классу list, а не detail
+LIST_PATHS = {'/api/v1/films/', '/api/v1/films/batch', '/api/v1/genres/'}
+SEARCH_PATH_PREFIX = '/api/v1/films/search'
+
+
+def route_class(path: str) -> str | None:
+    """Класс запроса по пути; None для служебных путей без ограничения"""
+    if not path.startswith(API_PREFIX):
+        return None
+    if path.startswith(SEARCH_PATH_PREFIX):
+        return 'search'
+    if path in LIST_PATHS:
+        return 'list'
+    return 'detail'
+
+
+class AIMDLimiter:
+    """Лимит одновременных запросов одного класса"""
+
+    def __init__(
+            self,
+            name: str,
+            target_latency: float,
+            initial_limit: int = 20,
+            min_limit: int = 2,
+            max_limit: int = 200,
+            backoff: float = 0.9
+    ):
+        self.name = name
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._limit_gauge = metrics.CONCURRENCY_LIMIT.labels(name)
+        self._in_flight_gauge = metrics.CONCURRENCY_IN_FLIGHT.labels(name)
+        self._shed = metrics.REQUESTS_SHED.labels(name)
+        self._limit_gauge.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self._shed.inc()
+            return False
+        self.in_flight += 1
+        self._in_flight_gauge.set(self.in_flight)
+        return True
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        # Прирост засчитывается, только если лимит действительно использовался
+        saturated = self.in_flight * 2 >= self.limit
+        self.in_flight -= 1
+        self._in_flight_gauge.set(self.in_flight)
+
+        now = time.monotonic()
+        if overloaded or latency > self.target_latency:
+            # Запросы одного «окна» перегрузки уменьшают лимит только один раз
+            if now - self._last_decrease < latency:
+                return
+            self._last_decrease = now
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        else:
+            return
+        self._limit_gauge.set(self.limit)
+
+
+class LoadSheddingMiddleware:
+    """ASGI-middleware, отклоняющая запросы сверх лимита своего класса"""
+
+    def __init__(self, app: ASGIApp, limiters: dict[str, AIMDLimiter], retry_after: int = 1):
+        self.app = app
+        self.limiters = limiters
+        self.retry_after = str(retry_after)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self.limiters.get(route_class(scope['path'])) if scope['type'] == 'http' else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not limiter.try_acquire():
+            response = JSONResponse(
+                {'detail': 'Service overloaded, retry later'},
+                status_code=503,
+                headers={'Retry-After': self.retry_after}
+            )
+            await response(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(time.monotonic() - started, status >= 500)
@@ -0,0 +1,158 @@
+"""Метрики Prometheus для API.
+
+Метрики создаются один раз при импорте. На горячем пути используются
+заранее связанные с метками дочерние метрики, чтобы не искать их по меткам
+на каждый вызов.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Границы бакетов от 0.5 мс: обращения к Redis и L1 заметно быстрее запросов к ES
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки HTTP-запроса',
+    ['method', 'route', 'status'],
+    buckets=LATENCY_BUCKETS
+)
+REDIS_COMMAND_DURATION = Histogram(
+    'redis_command_duration_seconds',
+    'Время выполнения команды Redis на стороне клиента',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+ELASTICSEARCH_REQUEST_DURATION = Histogram(
+    'elasticsearch_request_duration_seconds',
+    'Время запроса к Elasticsearch на стороне клиента',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+ELASTICSEARCH_TOOK = Histogram(
+    'elasticsearch_took_seconds',
+    'Время выполнения запроса внутри Elasticsearch (поле took)',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+ELASTICSEARCH_OVERHEAD = Histogram(
+    'elasticsearch_overhead_seconds',
+    'Разница между временем на клиенте и took: сеть, очереди, сериализация',
+    ['operation'],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    'Обращения к кэшам по сервисам и уровням',
+    ['service', 'layer', 'result']
+)
+LOCAL_CACHE_EVICTIONS = Counter(
+    'local_cache_evictions_total',
+    'Записи, вытесненные из L1 процесса по размеру (LRU)',
+    ['service']
+)
+LOCAL_CACHE_SIZE = Gauge(
+    'local_cache_entries',
+    'Записи в L1 процесса, включая еще не удаленные истекшие',
+    ['service']
+)
+POOL_CONNECTIONS = Gauge(
+    'dependency_pool_connections',
+    'Соединения пулов клиентов Redis и Elasticsearch',
+    ['dependency', 'state']
+)
+POOL_WAIT_DURATION = Histogram(
+    'dependency_pool_wait_seconds',
+    'Ожидание свободного соединения в пуле клиента',
+    ['dependency'],
+    buckets=LATENCY_BUCKETS
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    'circuit_breaker_state',
+    'Состояние предохранителя: 0 - closed, 1 - half_open, 2 - open',
+    ['name']
+)
+CIRCUIT_BREAKER_REJECTED = Counter(
+    'circuit_breaker_rejected_total',
+    'Вызовы, отклоненные разомкнутым предохранителем',
+    ['name']
+)
+HEDGED_REQUESTS = Counter(
+    'elasticsearch_hedged_requests_total',
+    'Дублирующие запросы к Elasticsearch: отправленные и давшие ответ первыми',
+    ['operation', 'outcome']
+)
+CONCURRENCY_LIMIT = Gauge(
+    'http_concurrency_limit',
+    'Текущий адаптивный лимит одновременных запросов класса',
+    ['route_class']
+)
+CONCURRENCY_IN_FLIGHT = Gauge(
+    'http_requests_in_flight',
+    'Выполняющиеся запросы класса',
+    ['route_class']
+)
+REQUESTS_SHED = Counter(
+    'http_requests_shed_total',
+    'Запросы, отклоненные с 503 из-за превышения лимита',
+    ['route_class']
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    'dependency_requests_in_flight',
+    'Запросы к Redis и Elasticsearch, ожидающие ответа',
+    ['dependency']
+)
+
+
+class CacheMetrics:
+    """Счетчики попаданий и промахов кэшей одного сервиса"""
+
+    def __init__(self, service: str):
+        self.local_hit = CACHE_REQUESTS.labels(service, 'local', 'hit')
+        self.local_miss = CACHE_REQUESTS.labels(service, 'local', 'miss')
+        self.redis_hit = CACHE_REQUESTS.labels(service, 'redis', 'hit')
+        self.redis_miss = CACHE_REQUESTS.labels(service, 'redis', 'miss')
+
+
+class MetricsMiddleware:
+    """ASGI-middleware с гистограммой времени запросов по шаблону пути и статусу.
+
+    Шаблон пути FastAPI кладет в scope['route'] при маршрутизации, поэтому
+    в метки попадает '/api/v1/films/{film_id}', а не каждый id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            HTTP_REQUEST_DURATION.labels(
+                scope['method'],
+                getattr(route, 'path', 'unmatched'),
+                status
+            ).observe(time.perf_counter() - started)
+
+
+async def metrics_view(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,137 @@
+"""Профилирование отдельных запросов по заголовку.
+
+Включается только при заданном PROFILING_TOKEN: без него middleware
+не устанавливается и на обычные запросы не тратится ничего. Запрос
+с заголовком 'X-Profile: <токен>' выполняется под профилировщиком,
+а вместо тела ответа возвращается профиль:
+
+- pyinstrument (по умолчанию): семплирующий, учитывает await;
+  'X-Profile-Format: html' — интерактивное дерево вызовов,
+  'text' — текстовое дерево;
+- cProfile (PROFILING_PROFILER=cprofile): детерминированный, намного
+  дороже для профилируемого запроса и профилирует весь поток,
+  то есть и параллельные запросы; только 'text'.
+
+К профилю добавляется вывод Elasticsearch 'profile: true'
+для поисковых запросов, выполненных при обработке. Статус исходного
+ответа передается в заголовке X-Profiled-Status.
+"""
+import cProfile
+import hmac
+import html
+import io
+import json
+import pstats
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+PROFILERS = ('pyinstrument', 'cprofile')
+PROFILE_HEADER = 'x-profile'
+PROFILE_FORMAT_HEADER = 'x-profile-format'
+
+# Профили Elasticsearch текущего запроса; None, если запрос не профилируется
+elasticsearch_profiles: ContextVar[list[dict[str, Any]] | None] = ContextVar(
+    'elasticsearch_profiles',
+    default=None
+)
+
+
+def profiling_requested() -> bool:
+    return elasticsearch_profiles.get() is not None
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware, профилирующая запросы с верным токеном в заголовке"""
+
+    def __init__(self, app: ASGIApp, token: str, profiler: str = 'pyinstrument', interval: float = 0.001):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of: {', '.join(PROFILERS)}")
+        if profiler == 'pyinstrument' and Profiler is None:
+            # cProfile только по явному выбору: молча подменять им семплирующий профилировщик нельзя
+            raise RuntimeError("pyinstrument is not installed, install it or set PROFILING_PROFILER=cprofile")
+        self.app = app
+        self.token = token.encode()
+        self.profiler = profiler
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        token = headers.get(PROFILE_HEADER)
+        if token is None or not hmac.compare_digest(token.encode(), self.token):
+            await self.app(scope, receive, send)
+            return
+
+        output_format = headers.get(PROFILE_FORMAT_HEADER, 'html' if self.profiler == 'pyinstrument' else 'text')
+        status = 500
+
+        async def discard_response(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        profiles = []
+        context_token = elasticsearch_profiles.set(profiles)
+        started = time.perf_counter()
+        try:
+            if self.profiler == 'pyinstrument':
+                profiler = Profiler(interval=self.interval, async_mode='enabled')
+                profiler.start()
+                try:
+                    await self.app(scope, receive, discard_response)
+                finally:
+                    profiler.stop()
+                body, content_type = self._render_pyinstrument(profiler, output_format, profiles)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, discard_response)
+                finally:
+                    profiler.disable()
+                body, content_type = self._render_cprofile(profiler, profiles)
+        finally:
+            elasticsearch_profiles.reset(context_token)
+        elapsed = time.perf_counter() - started
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', content_type.encode()),
+                (b'content-length', str(len(body)).encode()),
+                (b'x-profiled-status', str(status).encode()),
+                (b'x-profiled-time', f'{elapsed:.6f}'.encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    def _render_pyinstrument(profiler, output_format: str, profiles: list[dict]) -> tuple[bytes, str]:
+        es_profile = json.dumps(profiles, indent=2)
+        if output_format == 'html':
+            page = profiler.output_html()
+            section = f'<h2>Elasticsearch profile</h2><pre>{html.escape(es_profile)}</pre>'
+            return page.replace('</body>', section + '</body>').encode(), 'text/html; charset=utf-8'
+
+        text = profiler.output_text(unicode=True, color=False)
+        return f'{text}\nElasticsearch profile:\n{es_profile}\n'.encode(), 'text/plain; charset=utf-8'
+
+    @staticmethod
+    def _render_cprofile(profiler: cProfile.Profile, profiles: list[dict]) -> tuple[bytes, str]:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(60)
+        es_profile = json.dumps(profiles, indent=2)
+        return f'{stream.getvalue()}\nElasticsearch profile:\n{es_profile}\n'.encode(), 'text/plain; charset=utf-8'
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class CircuitOpenError(Exception):
+    """Предохранитель разомкнут: запрос отклонен без обращения к зависимости"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        # Через сколько секунд предохранитель снова пропустит вызовы
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Предохранитель по доле ошибок и медленных вызовов в скользящем окне.
+
+    closed: вызовы проходят, исходы копятся в окне последних window вызовов.
+    Как только в окне не меньше min_calls исходов и доля ошибок или медленных
+    вызовов превышает порог, предохранитель размыкается (open) и отклоняет
+    вызовы open_seconds секунд. Затем он пропускает half_open_calls пробных
+    вызовов (half_open): все успешны — замыкается, любой неудачный — снова open.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+            self,
+            name: str,
+            failure_rate: float = 0.5,
+            slow_call_duration: float = 2.0,
+            slow_call_rate: float = 0.8,
+            window: int = 50,
+            min_calls: int = 20,
+            open_seconds: float = 5.0,
+            half_open_calls: int = 3,
+            is_failure: Callable[[BaseException], bool] = lambda exc: True,
+            on_state_change: Callable[[str], None] | None = None
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure
+        self.on_state_change = on_state_change
+        self.state = self.CLOSED
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        if self.on_state_change is not None:
+            self.on_state_change(state)
+
+    def _trip(self) -> None:
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._set_state(self.OPEN)
+
+    def _acquire(self) -> bool:
+        """Разрешить вызов; True, если это пробный вызов в half_open"""
+        if self.state == self.OPEN:
+            opened_for = time.monotonic() - self._opened_at
+            if opened_for < self.open_seconds:
+                raise CircuitOpenError(f"Circuit breaker '{self.name}' is open", self.open_seconds - opened_for)
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            self._set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_calls:
+                raise CircuitOpenError(f"Circuit breaker '{self.name}' is half-open")
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def _record(self, probe: bool, failed: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_duration
+        if probe:
+            self._probes_in_flight -= 1
+            if self.state != self.HALF_OPEN:
+                return
+            if failed or slow:
+                self._trip()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._set_state(self.CLOSED)
+            return
+
+        # Вызов, начатый до размыкания, на окно уже не влияет
+        if self.state != self.CLOSED:
+            return
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+        failures = sum(outcome[0] for outcome in self._outcomes) / len(self._outcomes)
+        slow_calls = sum(outcome[1] for outcome in self._outcomes) / len(self._outcomes)
+        if failures >= self.failure_rate or slow_calls >= self.slow_call_rate:
+            self._trip()
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        probe = self._acquire()
+        started = time.monotonic()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if probe:
+                self._probes_in_flight -= 1
+            raise
+        except Exception as e:
+            self._record(probe, self.is_failure(e), time.monotonic() - started)
+            raise
+        self._record(probe, False, time.monotonic() - started)
+        return result
+
+
+class LatencyTracker:
+    """Перцентиль времени успешных вызовов по последним window замерам"""
+
+    def __init__(self, percentile: float = 95, window: int = 200, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._value: float | None = None
+        self._since_update = 0
+
+    def observe(self, duration: float) -> None:
+        self._samples.append(duration)
+        self._since_update += 1
+        # Пересчитываем перцентиль не на каждый замер
+        if len(self._samples) >= self.min_samples and (self._value is None or self._since_update >= 20):
+            ordered = sorted(self._samples)
+            self._value = ordered[min(int(len(ordered) * self.percentile / 100), len(ordered) - 1)]
+            self._since_update = 0
+
+    @property
+    def value(self) -> float | None:
+        return self._value
+
+
+async def hedged(
+        request: Callable[..., Awaitable[T]],
+        delay: float,
+        hedge_options: dict[str, Any],
+        is_retryable: Callable[[BaseException], bool] = lambda exc: False,
+        on_hedge: Callable[[], None] | None = None
+) -> tuple[T, bool]:
+    """Отправить дублирующий запрос, если первый не ответил за delay.
+
+    Возвращает первый полученный ответ и признак того, что он пришел
+    от дублирующего запроса. Ошибка, для которой is_retryable истинно,
+    не завершает вызов, пока другой запрос еще выполняется.
+    """
+    first = asyncio.ensure_future(request())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            tasks.append(asyncio.ensure_future(request(**hedge_options)))
+
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task is not first
+            for task in done:
+                if not pending or not is_retryable(task.exception()):
+                    raise task.exception()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
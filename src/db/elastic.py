@@ -1,6 +1,193 @@
-from elasticsearch import AsyncElasticsearch
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any, Mapping, TypeVar
+
+from elastic_transport import ApiResponse, TransportError
+from elasticsearch import ApiError, AsyncElasticsearch
+
+from src.core import config, metrics
+from src.core.deadline import DeadlineExceeded, with_deadline
+from src.core.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged
 
 es: AsyncElasticsearch | None = None
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+ELASTICSEARCH_IN_FLIGHT = metrics.DEPENDENCY_IN_FLIGHT.labels('elasticsearch')
+
+
+class InstrumentedElasticsearch(AsyncElasticsearch):
+    """Клиент Elasticsearch с метриками времени запросов по операциям.
+
+    Для ответов с полем took отдельно учитываются время внутри кластера
+    и накладные расходы клиента (сеть, очередь соединений, разбор ответа).
+    Запрос вместе с повторами ждет не дольше оставшегося срока HTTP-запроса.
+    """
+
+    async def perform_request(
+            self,
+            method: str,
+            path: str,
+            *,
+            params: Mapping[str, Any] | None = None,
+            headers: Mapping[str, str] | None = None,
+            body: Any | None = None,
+            endpoint_id: str | None = None,
+            path_parts: Mapping[str, Any] | None = None
+    ) -> ApiResponse[Any]:
+        operation = endpoint_id or method.lower()
+        ELASTICSEARCH_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            response = await with_deadline(super().perform_request(
+                method,
+                path,
+                params=params,
+                headers=headers,
+                body=body,
+                endpoint_id=endpoint_id,
+                path_parts=path_parts
+            ))
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.ELASTICSEARCH_REQUEST_DURATION.labels(operation).observe(elapsed)
+            ELASTICSEARCH_IN_FLIGHT.dec()
+
+        took = response.body.get('took') if isinstance(response.body, dict) else None
+        if took is not None:
+            metrics.ELASTICSEARCH_TOOK.labels(operation).observe(took / 1000)
+            metrics.ELASTICSEARCH_OVERHEAD.labels(operation).observe(max(elapsed - took / 1000, 0))
+        return response
+
+
+def create_elastic() -> InstrumentedElasticsearch:
+    """Клиент Elasticsearch с пулом, таймаутами и повторами из настроек"""
+    settings = config.settings
+    return InstrumentedElasticsearch(
+        hosts=[settings.elastic_url],
+        connections_per_node=settings.elastic_connections_per_node,
+        request_timeout=settings.elastic_request_timeout,
+        max_retries=settings.elastic_max_retries,
+        retry_on_timeout=settings.elastic_retry_on_timeout,
+        http_compress=settings.elastic_http_compress
+    )
+
+
+async def warm_up(client: AsyncElasticsearch, count: int) -> None:
+    """Заранее открыть соединения: одновременные запросы занимают по соединению"""
+    results = await asyncio.gather(*(client.ping() for _ in range(count)), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.error(f"Error opening Elasticsearch connections: {errors[0]}")
+
+
+def is_failure(exc: BaseException) -> bool:
+    """Сбой кластера, а не ответ на запрос: сеть, таймауты, 5xx и 429"""
+    if isinstance(exc, DeadlineExceeded):
+        # Истек срок клиентского запроса; медленные ответы учитываются отдельно
+        return False
+    if isinstance(exc, TransportError):
+        return True
+    if isinstance(exc, ApiError):
+        status = getattr(exc, 'status_code', None)
+        return isinstance(status, int) and (status >= 500 or status == 429)
+    return True
+
+
+settings = config.settings
+breaker = CircuitBreaker(
+    'elasticsearch',
+    failure_rate=settings.elastic_breaker_failure_rate,
+    slow_call_duration=settings.elastic_breaker_slow_call_duration,
+    slow_call_rate=settings.elastic_breaker_slow_call_rate,
+    window=settings.elastic_breaker_window,
+    min_calls=settings.elastic_breaker_min_calls,
+    open_seconds=settings.elastic_breaker_open_seconds,
+    half_open_calls=settings.elastic_breaker_half_open_calls,
+    is_failure=is_failure,
+    on_state_change=lambda state: metrics.CIRCUIT_BREAKER_STATE.labels('elasticsearch').set(BREAKER_STATES[state])
+)
+metrics.CIRCUIT_BREAKER_STATE.labels('elasticsearch').set(0)
+BREAKER_REJECTED = metrics.CIRCUIT_BREAKER_REJECTED.labels('elasticsearch')
+
+# Время ответа по операциям для задержки перед дублирующим запросом
+latency_trackers: dict[str, LatencyTracker] = {}
+
+
+async def _hedged_request(operation: str, request: Callable[..., Awaitable[T]]) -> T:
+    tracker = latency_trackers.setdefault(operation, LatencyTracker(settings.elastic_hedge_percentile))
+    started = time.perf_counter()
+    if tracker.value is None:
+        result = await request()
+    else:
+        # Случайный preference направляет дублирующий запрос на другую копию шардов
+        result, hedge_won = await hedged(
+            request,
+            delay=max(tracker.value, settings.elastic_hedge_min_delay),
+            hedge_options={'preference': uuid.uuid4().hex},
+            is_retryable=lambda exc: isinstance(exc, TransportError),
+            on_hedge=metrics.HEDGED_REQUESTS.labels(operation, 'sent').inc
+        )
+        if hedge_won:
+            metrics.HEDGED_REQUESTS.labels(operation, 'won').inc()
+    tracker.observe(time.perf_counter() - started)
+    return result
+
+
+async def call_elastic(operation: str, request: Callable[..., Awaitable[T]], hedge: bool = False) -> T:
+    """Запрос к Elasticsearch через предохранитель.
+
+    request принимает дополнительные параметры запроса (**options), через них
+    дублирующему запросу передается preference. hedge разрешает дублирование
+    и подходит только для идемпотентных чтений.
+    """
+    if hedge and settings.elastic_hedging_enabled:
+        func = lambda: _hedged_request(operation, request)
+    else:
+        func = request
+
+    if not settings.elastic_breaker_enabled:
+        return await func()
+    try:
+        return await breaker.call(func)
+    except CircuitOpenError:
+        BREAKER_REJECTED.inc()
+        raise
+
+
+def _connector_stats(state: str) -> float:
+    """Соединения всех узлов: занятые, ожидающие свободного или предел пула"""
+    transport = getattr(es, 'transport', None)
+    if transport is None:
+        return 0
+
+    total = 0
+    for node in transport.node_pool.all():
+        if state == 'max':
+            total += getattr(node, '_connections_per_node', 0)
+            continue
+        session = getattr(node, 'session', None)
+        connector = getattr(session, 'connector', None)
+        if connector is None:
+            continue
+        if state == 'in_use':
+            total += len(getattr(connector, '_acquired', ()))
+        else:
+            total += sum(len(waiters) for waiters in getattr(connector, '_waiters', {}).values())
+    return total
+
+
+metrics.POOL_CONNECTIONS.labels('elasticsearch', 'in_use').set_function(lambda: _connector_stats('in_use'))
+metrics.POOL_CONNECTIONS.labels('elasticsearch', 'waiting').set_function(lambda: _connector_stats('waiting'))
+metrics.POOL_CONNECTIONS.labels('elasticsearch', 'max').set_function(lambda: _connector_stats('max'))
+
+
 async def get_elastic() -> AsyncElasticsearch:
-    return es
\ No newline at end of file
+    return es
@@ -1,7 +1,145 @@
+import asyncio
+import logging
+import time
+
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import HIREDIS_AVAILABLE, BlockingConnectionPool, _AsyncRESP2Parser
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+
+from src.core import config, metrics
+from src.core.deadline import with_deadline
 
 redis: Redis | None = None
 
+logger = logging.getLogger(__name__)
+
+REDIS_IN_FLIGHT = metrics.DEPENDENCY_IN_FLIGHT.labels('redis')
+REDIS_POOL_WAITING = metrics.POOL_CONNECTIONS.labels('redis', 'waiting')
+REDIS_POOL_WAIT_DURATION = metrics.POOL_WAIT_DURATION.labels('redis')
+
+
+class InstrumentedPipeline(Pipeline):
+    """Пайплайн, время выполнения которого учитывается как операция pipeline"""
+
+    async def execute(self, raise_on_error: bool = True):
+        REDIS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await with_deadline(super().execute(raise_on_error))
+        finally:
+            metrics.REDIS_COMMAND_DURATION.labels('pipeline').observe(time.perf_counter() - started)
+            REDIS_IN_FLIGHT.dec()
+
+
+class InstrumentedRedis(Redis):
+    """Клиент Redis с метриками времени команд, ограниченных сроком запроса"""
+
+    async def execute_command(self, *args, **options):
+        REDIS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            return await with_deadline(super().execute_command(*args, **options))
+        finally:
+            metrics.REDIS_COMMAND_DURATION.labels(str(args[0]).lower()).observe(time.perf_counter() - started)
+            REDIS_IN_FLIGHT.dec()
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Пул, который при исчерпании ждет соединение, с метриками ожидания"""
+
+    async def get_connection(self, command_name, *keys, **options):
+        # Ждущими считаются только те, кому не досталось ни свободного, ни нового соединения
+        blocked = not self.can_get_connection()
+        if blocked:
+            REDIS_POOL_WAITING.inc()
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            REDIS_POOL_WAIT_DURATION.observe(time.perf_counter() - started)
+            if blocked:
+                REDIS_POOL_WAITING.dec()
+
+
+def create_redis() -> InstrumentedRedis:
+    """Клиент Redis с пулом и таймаутами из настроек"""
+    settings = config.settings
+    connection_kwargs = {}
+    if not settings.redis_hiredis:
+        connection_kwargs['parser_class'] = _AsyncRESP2Parser
+    elif not HIREDIS_AVAILABLE:
+        logger.warning("hiredis is not installed, Redis replies are parsed in Python")
+
+    pool = InstrumentedConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        socket_keepalive=settings.redis_socket_keepalive,
+        health_check_interval=settings.redis_health_check_interval,
+        retry_on_timeout=settings.redis_retry_on_timeout,
+        retry=Retry(ExponentialBackoff(cap=0.1, base=0.01), settings.redis_retries),
+        **connection_kwargs
+    )
+    return InstrumentedRedis.from_pool(pool)
+
+
+def create_pubsub_redis() -> Redis:
+    """Клиент Redis для подписок на каналы.
+
+    Подписка может долго простаивать, поэтому у нее нет таймаута чтения
+    общего клиента: иначе соединение переподключалось бы каждые
+    redis_socket_timeout секунд, теряя сообщения. Живость соединения
+    проверяется PING раз в redis_health_check_interval секунд.
+    """
+    settings = config.settings
+    connection_kwargs = {}
+    if not settings.redis_hiredis:
+        connection_kwargs['parser_class'] = _AsyncRESP2Parser
+
+    return Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        socket_timeout=None,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        socket_keepalive=settings.redis_socket_keepalive,
+        health_check_interval=settings.redis_health_check_interval,
+        **connection_kwargs
+    )
+
+
+async def warm_up(client: Redis, count: int) -> None:
+    """Заранее открыть count соединений пула"""
+    pool = client.connection_pool
+    connections = await asyncio.gather(
+        *(pool.get_connection('PING') for _ in range(count)),
+        return_exceptions=True
+    )
+    for connection in connections:
+        if isinstance(connection, BaseException):
+            logger.error(f"Error opening Redis connection: {connection}")
+        else:
+            await pool.release(connection)
+
+
+def _pool_connections(attribute: str) -> float:
+    pool = getattr(redis, 'connection_pool', None)
+    return len(getattr(pool, attribute, ()))
+
+
+metrics.POOL_CONNECTIONS.labels('redis', 'in_use').set_function(lambda: _pool_connections('_in_use_connections'))
+metrics.POOL_CONNECTIONS.labels('redis', 'idle').set_function(lambda: _pool_connections('_available_connections'))
+metrics.POOL_CONNECTIONS.labels('redis', 'max').set_function(
+    lambda: getattr(getattr(redis, 'connection_pool', None), 'max_connections', 0)
+)
+
 
 async def get_redis() -> Redis:
-    return redis
\ No newline at end of file
+    return redis
@@ -1,27 +1,27 @@
+import asyncio
 import logging
+import math
 from contextlib import asynccontextmanager
+from http import HTTPStatus
 
 import uvicorn
-from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import ORJSONResponse
-from redis.asyncio import Redis
 
 from src.api.v1 import films, genres
-from src.core import config, logger
+from src.cache import invalidation
+from src.core import config, deadline, load_shedding, logger, metrics, profiling
+from src.core.resilience import CircuitOpenError
 from src.db import elastic, redis
+from src.services.film import film_keyspace, film_known_ids, invalidate_films
+from src.services.genres import genres_keyspace, genres_known_ids, genres_snapshot, invalidate_genres
 
 
 @asynccontextmanager
 async def lifespan(application: FastAPI):
 
-    redis.redis = Redis(
-        host=config.settings.redis_host,
-        port=config.settings.redis_port
-    )
-    elastic.es = AsyncElasticsearch(
-        hosts=[config.settings.elastic_url]
-    )
+    redis.redis = redis.create_redis()
+    elastic.es = elastic.create_elastic()
 
     try:
         await redis.redis.ping()
@@ -32,12 +32,44 @@ async def lifespan(application: FastAPI):
         else:
             logging.error("❌ Elasticsearch connection failed")
 
+        await redis.warm_up(redis.redis, config.settings.redis_min_connections)
+        await elastic.warm_up(elastic.es, config.settings.elastic_min_connections)
+
     except Exception as e:
         logging.error(f"❌ Connection error during startup: {e}")
 
+    pubsub_redis = redis.create_pubsub_redis()
+    invalidation.listener = invalidation.InvalidationListener(
+        redis.redis,
+        config.settings.cache_invalidation_channel,
+        subscriber=pubsub_redis
+    )
+    invalidation.listener.register('film', invalidate_films)
+    invalidation.listener.register('genres', invalidate_genres)
+    background_tasks = [
+        asyncio.create_task(invalidation.listener.run()),
+        asyncio.create_task(genres_snapshot.run()),
+    ]
+    for keyspace in (film_keyspace, genres_keyspace):
+        invalidation.listener.register_keyspace(keyspace)
+        await keyspace.load_generation(redis.redis)
+        background_tasks.append(
+            asyncio.create_task(
+                keyspace.run(redis.redis, config.settings.cache_generation_refresh_interval)
+            )
+        )
+    if config.settings.bloom_filter_enabled:
+        background_tasks += [
+            asyncio.create_task(film_known_ids.run()),
+            asyncio.create_task(genres_known_ids.run()),
+        ]
+
     yield
 
+    for task in background_tasks:
+        task.cancel()
     await redis.redis.close()
+    await pubsub_redis.close()
     await elastic.es.close()
     logging.info("✅ All connections closed")
 
@@ -50,6 +82,58 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if config.settings.request_deadline_enabled:
+    app.add_middleware(
+        deadline.DeadlineMiddleware,
+        timeouts={
+            'detail': config.settings.request_timeout_detail,
+            'list': config.settings.request_timeout_list,
+            'search': config.settings.request_timeout_search,
+        },
+        max_timeout=config.settings.request_timeout_max
+    )
+if config.settings.load_shedding_enabled:
+    app.add_middleware(
+        load_shedding.LoadSheddingMiddleware,
+        limiters={
+            name: load_shedding.AIMDLimiter(
+                name,
+                target_latency=target_latency,
+                initial_limit=config.settings.load_shedding_initial_limit,
+                min_limit=config.settings.load_shedding_min_limit,
+                max_limit=config.settings.load_shedding_max_limit,
+                backoff=config.settings.load_shedding_backoff
+            )
+            for name, target_latency in (
+                ('detail', config.settings.load_shedding_detail_latency),
+                ('list', config.settings.load_shedding_list_latency),
+                ('search', config.settings.load_shedding_search_latency),
+            )
+        },
+        retry_after=config.settings.load_shedding_retry_after
+    )
+app.add_middleware(metrics.MetricsMiddleware)
+if config.settings.profiling_token:
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        token=config.settings.profiling_token,
+        profiler=config.settings.profiling_profiler,
+        interval=config.settings.profiling_interval
+    )
+
+
+async def circuit_open_handler(request: Request, exc: CircuitOpenError) -> ORJSONResponse:
+    """Elasticsearch недоступен: сразу 503, а не пустой результат и 404"""
+    return ORJSONResponse(
+        {'detail': 'Service temporarily unavailable, retry later'},
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+
+app.add_exception_handler(CircuitOpenError, circuit_open_handler)
+app.add_route('/metrics', metrics.metrics_view, include_in_schema=False)
+
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genres'])
 
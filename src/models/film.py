@@ -13,4 +13,24 @@ class FilmsDetailsResponseModel(FilmsResponseModel):
     genres: list | None
     directors: list | None = None
     actors: list | None = None
-    writers: list | None = None
\ No newline at end of file
+    writers: list | None = None
+
+class FilmFiltersModel(BaseModel):
+    """Фильтры списка и поиска фильмов"""
+    genre: str | None = None
+    min_rating: float | None = None
+    max_rating: float | None = None
+    # id человека в любой роли: режиссер, актер или сценарист
+    person: str | None = None
+
+class FacetBucketModel(BaseModel):
+    """Значение фасета и число фильмов с ним"""
+    key: str | float
+    count: int
+
+class FilmsPageModel(BaseModel):
+    """Страница списка фильмов и курсор на следующую страницу"""
+    films: list[FilmsResponseModel]
+    next_cursor: str | None = None
+    # Фасеты по запрошенным агрегациям; None, если они не запрашивались
+    facets: dict[str, list[FacetBucketModel]] | None = None
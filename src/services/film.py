@@ -1,3 +1,6 @@
+import base64
+import hashlib
+import json
 import logging
 from functools import lru_cache
 from typing import Any
@@ -6,70 +9,185 @@ from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
 
+from src.cache.batch_loader import BatchLoader
+from src.cache.document import DocumentCache
+from src.cache.keys import CacheKeyspace
+from src.cache.local import LocalCache
+from src.cache.negative import MISSING, KnownIds, Missing, scan_index_ids
+from src.cache.schema import schema_version
+from src.cache.single_flight import SingleFlight
+from src.core import config
+from src.core.deadline import DeadlineExceeded
+from src.core.metrics import CacheMetrics
+from src.core.profiling import elasticsearch_profiles, profiling_requested
+from src.core.resilience import CircuitOpenError
+from src.db import elastic as elastic_db
 from src.db.elastic import get_elastic
 from src.db.redis import get_redis
-from src.models.film import FilmsDetailsResponseModel, FilmsResponseModel
-
-FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+from src.models.film import (
+    FacetBucketModel,
+    FilmFiltersModel,
+    FilmsDetailsResponseModel,
+    FilmsPageModel,
+    FilmsResponseModel,
+)
+from src.services.rankings import FilmRankings
+
+FILM_CACHE_EXPIRE_IN_SECONDS = config.settings.film_cache_expire_in_seconds
+NEGATIVE_CACHE_EXPIRE_IN_SECONDS = config.settings.negative_cache_expire_in_seconds
+CACHE_STALE_TTL = config.settings.cache_stale_ttl
 logger = logging.getLogger(__name__)
 
+# Поля документа, нужные для элементов списка (id берется из _id)
+LIST_SOURCE_FIELDS = [field for field in FilmsResponseModel.model_fields if field != 'id']
+# Из ответа поиска оставляем только то, что используется при разборе
+SEARCH_FILTER_PATH = ['took', 'hits.hits._id', 'hits.hits._source', 'hits.hits.sort', 'pit_id']
+AGGREGATIONS_FILTER_PATH = ['aggregations.*.buckets.key', 'aggregations.*.buckets.doc_count']
+
+# Агрегации фасетов поиска по их именам в параметре facets
+FACET_AGGREGATIONS = {
+    'genres': {"terms": {"field": "genres", "size": 50}},
+    'rating': {"histogram": {"field": "imdb_rating", "interval": 1, "min_doc_count": 1}},
+}
+
+# Вложенные поля людей, по которым работает фильтр person
+PERSON_ROLES = ['directors', 'actors', 'writers']
+
+# Значение курсора, с которого начинается постраничный обход через search_after
+CURSOR_START = '*'
+
+# Версия схемы, с которой фильмы сериализуются в кэш
+FILM_CACHE_SCHEMA_VERSION = schema_version(FilmsDetailsResponseModel)
+
+film_local_cache = LocalCache(
+    name='film',
+    max_size=config.settings.local_cache_max_size,
+    ttl=config.settings.local_cache_ttl
+)
+# Ключи фильмов в Redis; при смене поколения L1 тоже сбрасывается
+film_keyspace = CacheKeyspace('film', FILM_CACHE_SCHEMA_VERSION, on_change=film_local_cache.clear)
+film_cache_metrics = CacheMetrics('film')
+
+
+async def _load_film_ids() -> list[str]:
+    return await scan_index_ids(elastic_db.es, 'movies')
+
+
+film_known_ids = KnownIds(
+    name='films',
+    loader=_load_film_ids,
+    refresh_interval=config.settings.bloom_filter_refresh_interval,
+    error_rate=config.settings.bloom_filter_error_rate
+)
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагинации не удалось разобрать"""
+
 
 class FilmService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        # Одинаковые одновременные поиски выполняются один раз
+        self._single_flight = SingleFlight()
+        self._rankings = FilmRankings(redis)
+        self._cache = DocumentCache(
+            name='film',
+            model=FilmsDetailsResponseModel,
+            redis=redis,
+            local_cache=film_local_cache,
+            keyspace=film_keyspace,
+            metrics=film_cache_metrics,
+            load=self._get_film_from_elastic,
+            expire=FILM_CACHE_EXPIRE_IN_SECONDS,
+            negative_expire=NEGATIVE_CACHE_EXPIRE_IN_SECONDS,
+            stale_ttl=CACHE_STALE_TTL,
+            xfetch_beta=config.settings.cache_xfetch_beta
+        )
+        # Одновременные промахи по карточкам собираются в один mget
+        self._film_loader = BatchLoader(
+            self._get_films_from_elastic,
+            max_batch_size=config.settings.film_mget_batch_max_size,
+            window=config.settings.film_mget_batch_window
+        )
 
     async def get_by_id(self, film_id: str) -> FilmsDetailsResponseModel | None:
-        film = await self._film_from_cache(film_id)
-        if not film:
-            film = await self._get_film_from_elastic(film_id)
-            if not film:
-                return None
-            await self._put_film_to_cache(film)
-        return film
-
-    async def _get_film_from_elastic(self, film_id: str) -> FilmsDetailsResponseModel | None:
+        if not film_known_ids.might_exist(film_id):
+            return None
+        return await self._cache.get(film_id)
+
+    async def get_json_by_id(self, film_id: str) -> bytes | None:
+        if not film_known_ids.might_exist(film_id):
+            return None
+        return await self._cache.get_json(film_id)
+
+    async def get_by_ids(self, film_ids: list[str]) -> dict[str, FilmsDetailsResponseModel]:
+        """Пакетное получение фильмов: L1, затем один MGET в Redis и один mget в Elasticsearch"""
+        film_ids = [film_id for film_id in film_ids if film_known_ids.might_exist(film_id)]
+        return await self._cache.get_many(film_ids, self._get_films_from_elastic)
+
+    def _film_from_doc(self, doc: dict[str, Any]) -> FilmsDetailsResponseModel:
+        """Построение модели фильма из документа Elasticsearch"""
+        film_data = doc['_source'].copy()
+        film_data['id'] = doc['_id']
+
+        if film_data.get('description') is None:
+            film_data['description'] = ""
+
+        return FilmsDetailsResponseModel(**film_data)
+
+    async def _get_film_from_elastic(self, film_id: str) -> FilmsDetailsResponseModel | Missing | None:
+        """Фильм из Elasticsearch; MISSING, если его нет в индексе, None при ошибке"""
+        if config.settings.film_mget_batching_enabled:
+            return await self._film_loader.load(film_id)
+
         try:
-            doc = await self.elastic.get(index='movies', id=film_id)
+            doc = await elastic_db.call_elastic(
+                'get',
+                lambda **options: self.elastic.get(index='movies', id=film_id, **options),
+                hedge=True
+            )
             # doc = await self.elastic.get(index='movies_test', id=film_id)
             logger.info(f"Elasticsearch response: {doc}")
 
-            film_data = doc['_source'].copy()
-            film_data['id'] = doc['_id']
-
-            if film_data.get('description') is None:
-                film_data['description'] = ""
-
-            return FilmsDetailsResponseModel(**film_data)
+            return self._film_from_doc(doc)
         except NotFoundError:
             logger.warning(f"Film {film_id} not found in Elasticsearch")
-            return None
+            return MISSING
+        except (CircuitOpenError, DeadlineExceeded):
+            # Недоступность Elasticsearch — не отсутствие фильма, ответ 503 или 504
+            raise
         except Exception as e:
             logger.error(f"Error getting film from Elasticsearch: {e}")
             return None
 
-    async def _film_from_cache(self, film_id: str) -> FilmsDetailsResponseModel | None:
-        data = await self.redis.get(film_id)
-        if not data:
-            return None
-
-        try:
-            film = FilmsDetailsResponseModel.model_validate_json(data)
-            return film
-        except Exception as e:
-            logger.error(f"Error parsing film from cache: {e}")
-            return None
-
-    async def _put_film_to_cache(self, film: FilmsDetailsResponseModel):
+    async def _get_films_from_elastic(
+            self,
+            film_ids: list[str]
+    ) -> dict[str, FilmsDetailsResponseModel | Missing]:
         try:
-            await self.redis.set(
-                film.id,
-                film.model_dump_json(),
-                FILM_CACHE_EXPIRE_IN_SECONDS
+            result = await elastic_db.call_elastic(
+                'mget',
+                lambda **options: self.elastic.mget(index='movies', ids=film_ids, **options),
+                hedge=True
             )
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
-            logger.error(f"Error putting film to cache: {e}")
-
+            logger.error(f"Error getting films from Elasticsearch: {e}")
+            return {}
+
+        films = {}
+        for doc in result['docs']:
+            if not doc.get('found'):
+                films[doc['_id']] = MISSING
+                continue
+            try:
+                films[doc['_id']] = self._film_from_doc(doc)
+            except Exception as e:
+                logger.error(f"Error parsing film {doc['_id']} from Elasticsearch: {e}")
+        return films
 
     def _calculate_pagination(self, page_number: int, page_size: int) -> int:
         """Расчет индекса начала выборки"""
@@ -88,18 +206,64 @@ class FilmService:
             }
         ]
 
+    def _build_filter_clauses(self, filters: FilmFiltersModel | None) -> list[dict]:
+        """Условия фильтров; выполняются в filter context и кэшируются Elasticsearch"""
+        if filters is None:
+            return []
+
+        clauses = []
+        if filters.genre:
+            clauses.append({"term": {"genres": filters.genre}})
+        if filters.min_rating is not None or filters.max_rating is not None:
+            rating_range = {}
+            if filters.min_rating is not None:
+                rating_range["gte"] = filters.min_rating
+            if filters.max_rating is not None:
+                rating_range["lte"] = filters.max_rating
+            clauses.append({"range": {"imdb_rating": rating_range}})
+        if filters.person:
+            clauses.append({
+                "bool": {
+                    "should": [
+                        {"nested": {"path": role, "query": {"term": {f"{role}.id": filters.person}}}}
+                        for role in PERSON_ROLES
+                    ],
+                    "minimum_should_match": 1
+                }
+            })
+        return clauses
+
+    def _build_query(
+            self,
+            query: dict[str, Any] | None,
+            filters: FilmFiltersModel | None
+    ) -> dict[str, Any] | None:
+        """Запрос с фильтрами: текстовая часть влияет на релевантность, фильтры — нет"""
+        clauses = self._build_filter_clauses(filters)
+        if not clauses:
+            return query
+
+        bool_query = {"filter": clauses}
+        if query:
+            bool_query["must"] = [query]
+        return {"bool": bool_query}
+
     def _build_search_body(
         self,
         page_size: int,
         from_index: int,
         query: dict[str, Any] | None = None,
-        sort: list[dict] | None = None
+        sort: list[dict] | None = None,
+        search_after: list | None = None,
+        pit_id: str | None = None,
+        facets: list[str] | None = None
 
     ) -> dict[str, Any]:
         """Построение тела запроса для Elasticsearch"""
         search_body = {
             "size": page_size,
             "from": from_index,
+            "_source": LIST_SOURCE_FIELDS,
         }
 
         if query:
@@ -110,63 +274,266 @@ class FilmService:
         if sort:
             search_body["sort"] = sort
 
+        if search_after:
+            search_body["search_after"] = search_after
+
+        if pit_id:
+            search_body["pit"] = {
+                "id": pit_id,
+                "keep_alive": config.settings.elastic_pit_keep_alive
+            }
+
+        if facets:
+            search_body["aggs"] = {name: FACET_AGGREGATIONS[name] for name in facets}
+
         return search_body
 
-    async def _process_elasticsearch_result(self, result: dict[str, Any]) -> list[FilmsResponseModel]:
+    def _encode_cursor(self, search_after: list, pit_id: str | None) -> str:
+        """Курсор: значения сортировки последнего документа и id point-in-time"""
+        payload = json.dumps({"after": search_after, "pit": pit_id}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor: str) -> tuple[list | None, str | None]:
+        if cursor == CURSOR_START:
+            return None, None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            search_after, pit_id = payload["after"], payload["pit"]
+        except Exception as e:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+        if not isinstance(search_after, list) or not (pit_id is None or isinstance(pit_id, str)):
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+        return search_after, pit_id
+
+    async def _process_elasticsearch_result(
+            self,
+            result: dict[str, Any],
+            with_cursor: bool = False,
+            search_body: dict[str, Any] | None = None
+    ) -> FilmsPageModel:
         """Обработка результатов из Elasticsearch"""
         films = []
-        for hit in result['hits']['hits']:
-            film_data = hit['_source'].copy()
-            film_data['id'] = hit['_id']
-
-            film_response_data = {
-                'id': film_data['id'],
-                'title': film_data.get('title', ''),
-                'imdb_rating': film_data.get('imdb_rating')
+        # При filter_path и пустой выдаче Elasticsearch не возвращает ключ hits
+        hits = result.get('hits', {}).get('hits', [])
+        next_cursor = None
+        if with_cursor:
+            # Запрос по курсору берет на один документ больше страницы: лишний
+            # документ показывает, что следующая страница не пуста
+            page_size = search_body['size'] - 1
+            if len(hits) > page_size:
+                hits = hits[:page_size]
+                if hits and 'sort' in hits[-1]:
+                    next_cursor = self._encode_cursor(hits[-1]['sort'], result.get('pit_id'))
+        for hit in hits:
+            source = hit.get('_source', {})
+            films.append(
+                FilmsResponseModel(
+                    id=hit['_id'],
+                    title=source.get('title', ''),
+                    imdb_rating=source.get('imdb_rating')
+                )
+            )
+
+
+        facets = None
+        if search_body and 'aggs' in search_body:
+            # Агрегации без бакетов filter_path из ответа убирает целиком
+            aggregations = result.get('aggregations', {})
+            facets = {
+                name: [
+                    FacetBucketModel(key=bucket['key'], count=bucket['doc_count'])
+                    for bucket in aggregations.get(name, {}).get('buckets', [])
+                ]
+                for name in search_body['aggs']
             }
 
-            films.append(FilmsResponseModel(**film_response_data))
+        return FilmsPageModel(films=films, next_cursor=next_cursor, facets=facets)
 
-        return films
+    async def _execute_elasticsearch_search(
+            self,
+            search_body: dict[str, Any],
+            with_cursor: bool = False
+    ) -> FilmsPageModel:
+        """Выполнение поиска в Elasticsearch, одинаковые одновременные запросы объединяются"""
+        if profiling_requested():
+            # Профилируемый запрос выполняет поиск сам, а не ждет чужой
+            return await self._search_elasticsearch(search_body, with_cursor)
+
+        body_hash = hashlib.sha256(json.dumps(search_body, sort_keys=True).encode()).hexdigest()
+        return await self._single_flight.do(
+            ('search', body_hash, with_cursor),
+            lambda: self._search_elasticsearch(search_body, with_cursor)
+        )
+
+    async def _search_elasticsearch(self, search_body: dict[str, Any], with_cursor: bool) -> FilmsPageModel:
+        filter_path = SEARCH_FILTER_PATH
+        if "aggs" in search_body:
+            filter_path = filter_path + AGGREGATIONS_FILTER_PATH
+        es_profiles = elasticsearch_profiles.get()
+        if es_profiles is not None:
+            search_body = {**search_body, "profile": True}
+            filter_path = filter_path + ['profile']
 
-    async def _execute_elasticsearch_search(self, search_body: dict[str, Any]) -> list[FilmsResponseModel]:
-        """Выполнение поиска в Elasticsearch"""
         try:
-            result = await self.elastic.search(
-                # index="movies",
-                index="movies_test",
-                body=search_body
-            )
-            return await self._process_elasticsearch_result(result)
+            if "pit" in search_body:
+                # Запрос с point-in-time выполняется без указания индекса.
+                # PIT закреплен за копиями шардов, дублировать такой запрос незачем
+                result = await elastic_db.call_elastic(
+                    'search',
+                    lambda: self.elastic.search(body=search_body, filter_path=filter_path)
+                )
+            else:
+                # Кэш запросов шарда хранит только ответы без хитов: агрегации и подсчеты
+                request_cache = True if search_body.get("size") == 0 else None
+                result = await elastic_db.call_elastic(
+                    'search',
+                    lambda **options: self.elastic.search(
+                        index=config.settings.elastic_films_index,
+                        body=search_body,
+                        filter_path=filter_path,
+                        request_cache=request_cache,
+                        **options
+                    ),
+                    hedge=True
+                )
+            if es_profiles is not None and 'profile' in result:
+                es_profiles.append({"body": search_body, "profile": result['profile']})
+            return await self._process_elasticsearch_result(result, with_cursor, search_body)
+        except (CircuitOpenError, DeadlineExceeded):
+            # Пустая выдача превратилась бы в 404, вместо этого ответ 503 или 504
+            raise
         except Exception as e:
             logger.error(f"Error executing Elasticsearch search: {e}")
-            return []
+            return FilmsPageModel(films=[])
+
+    async def _open_point_in_time(self) -> str | None:
+        try:
+            result = await elastic_db.call_elastic(
+                'open_point_in_time',
+                lambda: self.elastic.open_point_in_time(
+                    index=config.settings.elastic_films_index,
+                    keep_alive=config.settings.elastic_pit_keep_alive
+                )
+            )
+            return result['id']
+        except Exception as e:
+            logger.error(f"Error opening point in time: {e}")
+            return None
+
+    async def _close_point_in_time(self, pit_id: str) -> None:
+        try:
+            await elastic_db.call_elastic('close_point_in_time', lambda: self.elastic.close_point_in_time(id=pit_id))
+        except Exception as e:
+            logger.warning(f"Error closing point in time: {e}")
+
+    async def _paginate(
+            self,
+            page_size: int,
+            page_number: int,
+            cursor: str | None,
+            consistent: bool,
+            query: dict[str, Any] | None = None,
+            sort: list[dict] | None = None,
+            facets: list[str] | None = None
+    ) -> FilmsPageModel:
+        """Постраничная выборка: from/size по номеру страницы или search_after по курсору"""
+        if cursor is None:
+            from_index = self._calculate_pagination(page_number, page_size)
+            search_body = self._build_search_body(page_size, from_index, query=query, sort=sort, facets=facets)
+            return await self._execute_elasticsearch_search(search_body)
+
+        search_after, pit_id = self._decode_cursor(cursor)
+        if consistent and cursor == CURSOR_START:
+            pit_id = await self._open_point_in_time()
+
+        # id как дополнительный ключ сортировки делает порядок однозначным
+        cursor_sort = (sort or [{"_score": {"order": "desc"}}]) + [{"id": {"order": "asc"}}]
+        search_body = self._build_search_body(
+            page_size + 1,
+            0,
+            query=query,
+            sort=cursor_sort,
+            search_after=search_after,
+            pit_id=pit_id,
+            facets=facets
+        )
+        page = await self._execute_elasticsearch_search(search_body, with_cursor=True)
+
+        if page.next_cursor is None and pit_id:
+            await self._close_point_in_time(pit_id)
+        return page
 
     async def get_films_list(
             self,
             sort: str = "-imdb_rating",
             page_size: int = 50,
-            page_number: int = 1
-    ) -> list[FilmsResponseModel]:
-        """Получить список фильмов с пагинацией и сортировкой"""
-        from_index = self._calculate_pagination(page_number, page_size)
+            page_number: int = 1,
+            cursor: str | None = None,
+            consistent: bool = False,
+            filters: FilmFiltersModel | None = None
+    ) -> FilmsPageModel:
+        """Получить список фильмов с пагинацией, сортировкой и фильтрами"""
+        filters = filters or FilmFiltersModel()
+        # Страницы по рейтингу берутся из рейтингов ETL в Redis, пока они доступны.
+        # Фильтр по людям в рейтингах не выразить, он идет в Elasticsearch
+        if (
+                cursor is None
+                and filters.person is None
+                and sort.lstrip('-') == 'imdb_rating'
+                and config.settings.film_rankings_enabled
+        ):
+            films = await self._rankings.page(
+                self._calculate_pagination(page_number, page_size),
+                page_size,
+                descending=sort.startswith('-'),
+                genre=filters.genre,
+                min_rating=filters.min_rating,
+                max_rating=filters.max_rating
+            )
+            if films is not None:
+                return FilmsPageModel(films=films)
+
         sort_body = self._build_sort(sort)
-        search_body = self._build_search_body(page_size, from_index, sort=sort_body)
+        query = self._build_query(None, filters)
 
-        return await self._execute_elasticsearch_search(search_body)
+        return await self._paginate(page_size, page_number, cursor, consistent, query=query, sort=sort_body)
 
     async def get_search_films(
             self,
             query: str,
             page_size: int = 50,
-            page_number: int = 1
-    ) -> list[FilmsResponseModel]:
-        """Поиск фильмов по названию"""
-        from_index = self._calculate_pagination(page_number, page_size)
-        search_query = {"match": {"title": query}}
-        search_body = self._build_search_body(page_size, from_index, query=search_query)
-
-        return await self._execute_elasticsearch_search(search_body)
+            page_number: int = 1,
+            cursor: str | None = None,
+            consistent: bool = False,
+            filters: FilmFiltersModel | None = None,
+            facets: list[str] | None = None
+    ) -> FilmsPageModel:
+        """Поиск фильмов по названию с фильтрами; фасеты считаются тем же запросом"""
+        search_query = self._build_query({"match": {"title": query}}, filters)
+
+        return await self._paginate(page_size, page_number, cursor, consistent, query=search_query, facets=facets)
+
+    async def get_search_facets(
+            self,
+            query: str,
+            facets: list[str],
+            filters: FilmFiltersModel | None = None
+    ) -> dict[str, list[FacetBucketModel]] | None:
+        """Только фасеты поиска: запрос без хитов попадает в кэш запросов шарда"""
+        search_query = self._build_query({"match": {"title": query}}, filters)
+        search_body = self._build_search_body(0, 0, query=search_query, facets=facets)
+        page = await self._execute_elasticsearch_search(search_body)
+        return page.facets
+
+
+async def invalidate_films(redis: Redis, film_ids: list[str]) -> None:
+    """Сброс фильмов из L1 и Redis по сообщению ETL"""
+    for film_id in film_ids:
+        film_local_cache.delete(film_id)
+    film_known_ids.add(film_ids)
+    await redis.delete(*film_keyspace.keys(film_ids))
 
 
 @lru_cache()
@@ -1,35 +1,117 @@
 import logging
 from functools import lru_cache
 
+import orjson
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
 
+from src.cache.document import DocumentCache
+from src.cache.keys import CacheKeyspace
+from src.cache.local import LocalCache
+from src.cache.negative import MISSING, KnownIds, Missing, scan_index_ids
+from src.cache.schema import schema_version
+from src.cache.snapshot import Snapshot
+from src.core import config
+from src.core.deadline import DeadlineExceeded
+from src.core.metrics import CacheMetrics
+from src.core.resilience import CircuitOpenError
+from src.db import elastic as elastic_db
+from src.db import redis as redis_db
 from src.db.elastic import get_elastic
 from src.db.redis import get_redis
-from src.models.genres import GenresFullResponse
+from src.models.genres import GenresFullResponse, GenresResponse
 
-FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+GENRES_CACHE_EXPIRE_IN_SECONDS = config.settings.genres_cache_expire_in_seconds
+NEGATIVE_CACHE_EXPIRE_IN_SECONDS = config.settings.negative_cache_expire_in_seconds
+CACHE_STALE_TTL = config.settings.cache_stale_ttl
 logger = logging.getLogger(__name__)
 
+# Версия схемы, с которой жанры сериализуются в кэш
+GENRES_CACHE_SCHEMA_VERSION = schema_version(GenresFullResponse)
+
+genres_local_cache = LocalCache(
+    name='genres',
+    max_size=config.settings.local_cache_max_size,
+    ttl=config.settings.local_cache_ttl
+)
+# Ключи жанров в Redis; при смене поколения L1 тоже сбрасывается
+genres_keyspace = CacheKeyspace('genres', GENRES_CACHE_SCHEMA_VERSION, on_change=genres_local_cache.clear)
+genres_cache_metrics = CacheMetrics('genres')
+
+
+
+async def _load_genres_ids() -> list[str]:
+    return await scan_index_ids(elastic_db.es, 'genres_test')
+
+
+genres_known_ids = KnownIds(
+    name='genres',
+    loader=_load_genres_ids,
+    refresh_interval=config.settings.bloom_filter_refresh_interval,
+    error_rate=config.settings.bloom_filter_error_rate
+)
+
 
 class GenresService:
     def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
         self.redis = redis
         self.elastic = elastic
+        self._cache = DocumentCache(
+            name='genres',
+            model=GenresFullResponse,
+            redis=redis,
+            local_cache=genres_local_cache,
+            keyspace=genres_keyspace,
+            metrics=genres_cache_metrics,
+            load=self._get_genres_from_elastic,
+            expire=GENRES_CACHE_EXPIRE_IN_SECONDS,
+            negative_expire=NEGATIVE_CACHE_EXPIRE_IN_SECONDS,
+            stale_ttl=CACHE_STALE_TTL,
+            xfetch_beta=config.settings.cache_xfetch_beta
+        )
+
+    async def get_genres_list(self) -> list[GenresResponse]:
+        """Список всех жанров из Elasticsearch"""
+        result = await elastic_db.call_elastic(
+            'search',
+            lambda **options: self.elastic.search(
+                index='genres_test',
+                # index='genres',
+                body={
+                    "query": {"match_all": {}},
+                    "size": 100,
+                    "_source": ["name"],
+                },
+                filter_path=['took', 'hits.hits._id', 'hits.hits._source'],
+                **options
+            ),
+            hedge=True
+        )
+
+        return [
+            GenresResponse(id=hit['_id'], name=hit['_source']['name'])
+            for hit in result.get('hits', {}).get('hits', [])
+        ]
 
     async def get_by_id(self, genres_id: str) -> GenresFullResponse | None:
-        genres = await self._genres_from_cache(genres_id)
-        if not genres:
-            genres = await self._get_genres_from_elastic(genres_id)
-            if not genres:
-                return None
-            await self._put_genres_to_cache(genres)
-        return genres
-
-    async def _get_genres_from_elastic(self, genres_id: str) ->  GenresFullResponse | None:
+        if not genres_known_ids.might_exist(genres_id):
+            return None
+        return await self._cache.get(genres_id)
+
+    async def get_json_by_id(self, genres_id: str) -> bytes | None:
+        if not genres_known_ids.might_exist(genres_id):
+            return None
+        return await self._cache.get_json(genres_id)
+
+    async def _get_genres_from_elastic(self, genres_id: str) ->  GenresFullResponse | Missing | None:
+        """Жанр из Elasticsearch; MISSING, если его нет в индексе, None при ошибке"""
         try:
-            doc = await self.elastic.get(index='genres_test', id=genres_id)
+            doc = await elastic_db.call_elastic(
+                'get',
+                lambda **options: self.elastic.get(index='genres_test', id=genres_id, **options),
+                hedge=True
+            )
             # doc = await self.elastic.get(index='genres', id=genres_id)
             logger.info(f"Elasticsearch response: {doc}")
 
@@ -40,33 +122,33 @@ class GenresService:
             return GenresFullResponse(**genres_data)
         except NotFoundError:
             logger.warning(f"genres {genres_id} not found in Elasticsearch")
-            return None
+            return MISSING
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
             logger.error(f"Error getting genres from Elasticsearch: {e}")
             return None
 
 
-    async def _genres_from_cache(self, genres_id: str) -> GenresFullResponse | None:
-        data = await self.redis.get(genres_id)
-        if not data:
-            return None
+async def _load_genres_list_json() -> bytes:
+    genres_list = await GenresService(redis_db.redis, elastic_db.es).get_genres_list()
+    return orjson.dumps([genres.model_dump() for genres in genres_list])
 
-        try:
-            genres = GenresFullResponse.model_validate_json(data)
-            return genres
-        except Exception as e:
-            logger.error(f"Error parsing film from cache: {e}")
-            return None
 
-    async def _put_genres_to_cache(self, genres: GenresFullResponse):
-        try:
-            await self.redis.set(
-                genres.id,
-                genres.model_dump_json(),
-                FILM_CACHE_EXPIRE_IN_SECONDS
-            )
-        except Exception as e:
-            logger.error(f"Error putting genres to cache: {e}")
+genres_snapshot = Snapshot(
+    name='genres',
+    loader=_load_genres_list_json,
+    refresh_interval=config.settings.genres_snapshot_refresh_interval
+)
+
+
+async def invalidate_genres(redis: Redis, genres_ids: list[str]) -> None:
+    """Сброс жанров из L1 и Redis и обновление списка жанров по сообщению ETL"""
+    for genres_id in genres_ids:
+        genres_local_cache.delete(genres_id)
+    genres_known_ids.add(genres_ids)
+    await redis.delete(*genres_keyspace.keys(genres_ids))
+    genres_snapshot.request_refresh()
 
 
 @lru_cache()
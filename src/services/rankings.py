@@ -0,0 +1,76 @@
+"""Рейтинги фильмов, которые ETL поддерживает в Redis.
+
+Формат ключей описан в postgres_to_el/etl/rankings.py. Страница списка
+по рейтингу — это один ZRANGE по рейтингу (общему или жанра) и один MGET
+кратких описаний, без обращения к Elasticsearch. Фильмов без рейтинга
+в ZSET нет, Elasticsearch ставит их в конец выдачи, поэтому неполная
+страница при таких фильмах берется из Elasticsearch.
+"""
+import logging
+
+from redis.asyncio import Redis
+
+from src.models.film import FilmsResponseModel
+
+logger = logging.getLogger(__name__)
+
+RATING_KEY = 'films:rank:rating'
+GENRE_RATING_KEY = 'films:rank:rating:genre:{genre}'
+UNRATED_KEY = 'films:rank:unrated'
+GENRE_UNRATED_KEY = 'films:rank:unrated:genre:{genre}'
+SUMMARY_KEY = 'films:summary:{film_id}'
+READY_KEY = 'films:rank:ready:v2'
+
+
+class FilmRankings:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def page(
+            self,
+            offset: int,
+            size: int,
+            descending: bool = True,
+            genre: str | None = None,
+            min_rating: float | None = None,
+            max_rating: float | None = None
+    ) -> list[FilmsResponseModel] | None:
+        """Страница фильмов по рейтингу; None, если рейтинги недоступны"""
+        key = GENRE_RATING_KEY.format(genre=genre) if genre else RATING_KEY
+        unrated_key = GENRE_UNRATED_KEY.format(genre=genre) if genre else UNRATED_KEY
+        # Фильтр по рейтингу фильмы без рейтинга и в Elasticsearch не проходят
+        rating_filter = min_rating is not None or max_rating is not None
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(READY_KEY)
+                # Рейтинг мог пропасть (вытеснение, FLUSHDB) при живом флаге готовности
+                pipe.exists(key)
+                pipe.exists(unrated_key)
+                if not rating_filter:
+                    pipe.zrange(key, offset, offset + size - 1, desc=descending)
+                else:
+                    # Диапазон рейтинга включает границы, как range в Elasticsearch
+                    low = '-inf' if min_rating is None else min_rating
+                    high = '+inf' if max_rating is None else max_rating
+                    start, end = (high, low) if descending else (low, high)
+                    pipe.zrange(key, start, end, desc=descending, byscore=True, offset=offset, num=size)
+                ready, ranked, unrated, film_ids = await pipe.execute()
+            if not ready or not ranked:
+                return None
+            if len(film_ids) < size and unrated and not rating_filter:
+                return None
+            if not film_ids:
+                return []
+
+            summaries = await self.redis.mget([
+                SUMMARY_KEY.format(film_id=film_id.decode() if isinstance(film_id, bytes) else film_id)
+                for film_id in film_ids
+            ])
+            if None in summaries:
+                # ETL обновляет рейтинг и описание в одной транзакции, расхождение — повод уйти в ES
+                logger.warning(f"Film rankings '{key}' reference missing summaries")
+                return None
+            return [FilmsResponseModel.model_validate_json(summary) for summary in summaries]
+        except Exception as e:
+            logger.error(f"Error reading film rankings from Redis: {e}")
+            return None
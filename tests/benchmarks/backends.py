@@ -0,0 +1,404 @@
+"""In-memory Elasticsearch и Redis для бенчмарков API без внешних сервисов.
+
+Реализовано только то подмножество API клиентов, которым пользуются
+сервисы. Задержка сети имитируется asyncio.sleep, чтобы конкурентность
+и кэши вели себя так же, как с настоящими бэкендами.
+"""
+import asyncio
+import fnmatch
+import itertools
+import time
+from typing import Any
+
+from elasticsearch import NotFoundError
+
+
+def _index_kind(index: str | None) -> str:
+    return 'genres' if index and index.startswith('genres') else 'movies'
+
+
+class FakeElasticsearch:
+    """Индексы movies* и genres* в памяти; поиск по title через match"""
+
+    def __init__(self, films: list[dict], genres: list[dict], latency: float = 0.0):
+        self.indices = {
+            'movies': {film['id']: film for film in films},
+            'genres': {genre['id']: genre for genre in genres},
+        }
+        self.latency = latency
+        self._pits: dict[str, str] = {}
+        self._pit_ids = itertools.count(1)
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def ping(self, **kwargs) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def get(self, index: str, id: str, **kwargs) -> dict:
+        await self._delay()
+        doc = self.indices[_index_kind(index)].get(id)
+        if doc is None:
+            raise NotFoundError(404, 'not_found', {'_id': id, 'found': False})
+        return {'_index': index, '_id': id, 'found': True, '_source': dict(doc)}
+
+    async def mget(self, index: str, ids: list[str], **kwargs) -> dict:
+        await self._delay()
+        documents = self.indices[_index_kind(index)]
+        docs = []
+        for doc_id in ids:
+            if doc_id in documents:
+                docs.append({'_index': index, '_id': doc_id, 'found': True, '_source': dict(documents[doc_id])})
+            else:
+                docs.append({'_index': index, '_id': doc_id, 'found': False})
+        return {'docs': docs}
+
+    async def open_point_in_time(self, index: str, keep_alive: str, **kwargs) -> dict:
+        pit_id = f'pit-{next(self._pit_ids)}'
+        self._pits[pit_id] = index
+        return {'id': pit_id}
+
+    async def close_point_in_time(self, id: str, **kwargs) -> dict:
+        self._pits.pop(id, None)
+        return {'succeeded': True}
+
+    async def search(self, index: str | None = None, body: dict | None = None, **kwargs) -> dict:
+        started = time.perf_counter()
+        await self._delay()
+        body = dict(body or {})
+        pit = body.get('pit')
+        if pit:
+            index = self._pits.get(pit['id'], index)
+
+        hits = []
+        for doc_id, doc in self.indices[_index_kind(index)].items():
+            score = _score(doc, body.get('query') or {'match_all': {}})
+            if score:
+                hits.append({'_id': doc_id, '_score': score, '_source': doc})
+
+        sort = body.get('sort')
+        if sort:
+            for spec in reversed(sort):
+                field, order = next(iter(spec.items()))
+                order = order['order'] if isinstance(order, dict) else order
+                hits.sort(key=lambda hit: _sort_key(hit, field), reverse=order == 'desc')
+            for hit in hits:
+                hit['sort'] = [_sort_value(hit, next(iter(spec))) for spec in sort]
+        else:
+            hits.sort(key=lambda hit: -hit['_score'])
+
+        search_after = body.get('search_after')
+        if search_after:
+            hits = [hit for hit in hits if _is_after(hit['sort'], search_after, sort)]
+
+        # Агрегации считаются по полным документам до отбора полей _source
+        aggregations = {
+            name: _aggregate([hit['_source'] for hit in hits], aggregation)
+            for name, aggregation in (body.get('aggs') or {}).items()
+        }
+        start = body.get('from', 0)
+        page = hits[start:start + body.get('size', 10)]
+        source_fields = body.get('_source')
+        for hit in page:
+            if isinstance(source_fields, list):
+                hit['_source'] = {field: hit['_source'].get(field) for field in source_fields}
+            else:
+                hit['_source'] = dict(hit['_source'])
+
+        result = {
+            'took': int((time.perf_counter() - started) * 1000),
+            'hits': {'total': {'value': len(hits)}, 'hits': page},
+        }
+        if pit:
+            result['pit_id'] = pit['id']
+        if aggregations:
+            result['aggregations'] = aggregations
+        return result
+
+
+def _aggregate(docs: list[dict], aggregation: dict) -> dict:
+    """terms и histogram по значениям поля найденных документов"""
+    counts: dict[Any, int] = {}
+    if 'terms' in aggregation:
+        for doc in docs:
+            values = doc.get(aggregation['terms']['field']) or []
+            for value in values if isinstance(values, list) else [values]:
+                counts[value] = counts.get(value, 0) + 1
+        buckets = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:aggregation['terms'].get('size', 10)]
+    elif 'histogram' in aggregation:
+        interval = aggregation['histogram']['interval']
+        for doc in docs:
+            value = doc.get(aggregation['histogram']['field'])
+            if value is not None:
+                key = float(value // interval * interval)
+                counts[key] = counts.get(key, 0) + 1
+        buckets = sorted(counts.items())
+    else:
+        raise NotImplementedError(f'Unsupported aggregation: {aggregation}')
+    return {'buckets': [{'key': key, 'doc_count': count} for key, count in buckets]}
+
+
+def _score(doc: dict, query: dict) -> float:
+    if 'match_all' in query:
+        return 1.0
+    if 'match' in query:
+        field, value = next(iter(query['match'].items()))
+        value = value['query'] if isinstance(value, dict) else value
+        text = str(doc.get(field) or '').lower().split()
+        return float(sum(token in text for token in str(value).lower().split()))
+    if 'term' in query:
+        field, value = next(iter(query['term'].items()))
+        actual = doc.get(field)
+        return float(value in actual if isinstance(actual, list) else value == actual)
+    if 'range' in query:
+        field, bounds = next(iter(query['range'].items()))
+        value = doc.get(field)
+        if value is None:
+            return 0.0
+        return float(value >= bounds.get('gte', value) and value <= bounds.get('lte', value))
+    if 'nested' in query:
+        path = query['nested']['path']
+        inner = query['nested']['query']
+        for item in doc.get(path) or []:
+            # Поля вложенных документов в запросе указываются с префиксом пути
+            if _score({f'{path}.{key}': value for key, value in item.items()}, inner):
+                return 1.0
+        return 0.0
+    if 'bool' in query:
+        clauses = query['bool']
+        score = 0.0
+        for clause in clauses.get('must', []) + clauses.get('filter', []):
+            clause_score = _score(doc, clause)
+            if not clause_score:
+                return 0.0
+            if clause in clauses.get('must', []):
+                score += clause_score
+        should = [_score(doc, clause) for clause in clauses.get('should', [])]
+        if sum(bool(clause_score) for clause_score in should) < clauses.get('minimum_should_match', 0):
+            return 0.0
+        return score + sum(should) or 1.0
+    raise NotImplementedError(f'Unsupported query: {query}')
+
+
+def _sort_value(hit: dict, field: str) -> Any:
+    if field == '_score':
+        return hit['_score']
+    if field == 'id':
+        return hit['_id']
+    return hit['_source'].get(field)
+
+
+def _sort_key(hit: dict, field: str) -> tuple:
+    value = _sort_value(hit, field)
+    return value is None, value if value is not None else 0
+
+
+def _is_after(values: list, search_after: list, sort: list[dict]) -> bool:
+    for spec, value, after in zip(sort, values, search_after):
+        order = next(iter(spec.values()))
+        order = order['order'] if isinstance(order, dict) else order
+        if value == after:
+            continue
+        if value is None or after is None:
+            return value is None
+        return value > after if order == 'asc' else value < after
+    return False
+
+
+class FakePipeline:
+    def __init__(self, redis: 'FakeRedis'):
+        self.redis = redis
+        self._commands = []
+
+    async def __aenter__(self) -> 'FakePipeline':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        self._commands.clear()
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        await self.redis._delay()
+        results = []
+        for name, args, kwargs in self._commands:
+            results.append(getattr(self.redis, f'_{name}')(*args, **kwargs))
+        self._commands.clear()
+        return results
+
+
+class FakePubSub:
+    """Подписка с чтением через get_message(timeout), как в redis.asyncio.client.PubSub"""
+
+    def __init__(self, redis: 'FakeRedis'):
+        self.redis = redis
+        self.channels: set[str] = set()
+        self._messages: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> 'FakePubSub':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def subscribe(self, *channels: str) -> None:
+        self.channels.update(channels)
+        self.redis._subscribers.add(self)
+        for channel in channels:
+            self._messages.put_nowait({'type': 'subscribe', 'channel': channel.encode(), 'data': 1})
+
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> dict | None:
+        if self not in self.redis._subscribers:
+            raise ConnectionError('Connection closed by server.')
+        try:
+            message = await asyncio.wait_for(self._messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if isinstance(message, Exception):
+            raise message
+        if ignore_subscribe_messages and message['type'] != 'message':
+            return None
+        return message
+
+    async def aclose(self) -> None:
+        self.redis._subscribers.discard(self)
+
+
+class FakeRedis:
+    """Строки с TTL, счетчики, set, sorted set, pipeline и pubsub"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._zsets: dict[str, dict[str, float]] = {}
+        self._sets: dict[str, set[str]] = {}
+        self._subscribers: set[FakePubSub] = set()
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _get(self, key: str) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expire_at = item
+        if expire_at is not None and expire_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _set(self, key: str, value: bytes | str, ex: int | None = None, **kwargs) -> bool:
+        if isinstance(value, str):
+            value = value.encode()
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def _exists(self, *keys: str) -> int:
+        return sum(
+            self._get(key) is not None or bool(self._zsets.get(key)) or bool(self._sets.get(key))
+            for key in keys
+        )
+
+    def _sadd(self, key: str, *members: str) -> int:
+        members_set = self._sets.setdefault(key, set())
+        added = sum(member not in members_set for member in members)
+        members_set.update(members)
+        return added
+
+    def _zadd(self, key: str, mapping: dict[str, float]) -> int:
+        zset = self._zsets.setdefault(key, {})
+        added = sum(member not in zset for member in mapping)
+        zset.update(mapping)
+        return added
+
+    def _zrange(
+            self,
+            key: str,
+            start: Any,
+            end: Any,
+            desc: bool = False,
+            byscore: bool = False,
+            offset: int | None = None,
+            num: int | None = None
+    ) -> list[bytes]:
+        zset = self._zsets.get(key, {})
+        members = sorted(zset, key=lambda member: (zset[member], member), reverse=desc)
+        if byscore:
+            high, low = (float(start), float(end)) if desc else (float(end), float(start))
+            members = [member for member in members if low <= zset[member] <= high]
+            start, end = offset or 0, (offset or 0) + num - 1 if num is not None else -1
+        return [member.encode() for member in members[start:end + 1 if end != -1 else None]]
+
+    def _delete(self, *keys: str) -> int:
+        return sum(
+            (self._data.pop(key, None) is not None)
+            | (self._zsets.pop(key, None) is not None)
+            | (self._sets.pop(key, None) is not None)
+            for key in keys
+        )
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def flushdb(self) -> bool:
+        self._data.clear()
+        self._zsets.clear()
+        self._sets.clear()
+        return True
+
+    async def get(self, key: str) -> bytes | None:
+        await self._delay()
+        return self._get(key)
+
+    async def mget(self, keys: list[str], *args: str) -> list[bytes | None]:
+        await self._delay()
+        return [self._get(key) for key in [*keys, *args]]
+
+    async def set(self, key: str, value: bytes | str, ex: int | None = None, **kwargs) -> bool:
+        await self._delay()
+        return self._set(key, value, ex)
+
+    async def delete(self, *keys: str) -> int:
+        await self._delay()
+        return self._delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        await self._delay()
+        value = int(self._get(key) or 0) + 1
+        self._set(key, str(value))
+        return value
+
+    async def publish(self, channel: str, message: str) -> int:
+        receivers = [pubsub for pubsub in self._subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub._messages.put_nowait({'type': 'message', 'channel': channel.encode(), 'data': message.encode()})
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self)
+
+    def drop_subscribers(self) -> None:
+        """Разорвать соединения подписчиков; опубликованное до переподписки теряется"""
+        for pubsub in list(self._subscribers):
+            pubsub._messages.put_nowait(ConnectionError('Connection closed by server.'))
+        self._subscribers.clear()
+
+    async def scan_iter(self, match: str = '*', **kwargs):
+        for key in list(self._data):
+            if fnmatch.fnmatchcase(key, match) and self._get(key) is not None:
+                yield key
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
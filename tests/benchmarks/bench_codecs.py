@@ -0,0 +1,80 @@
+"""Сравнение кодеков кэша по памяти и CPU на документах из backup.sql.
+
+Запуск из корня репозитория:
+
+    python -m tests.benchmarks.bench_codecs [--repeat 5] [--threshold 1024]
+
+Комбинации, для которых не установлены msgpack, zstandard или lz4, пропускаются.
+"""
+import argparse
+import time
+
+from src.cache.codec import COMPRESSIONS, SERIALIZERS, CacheCodec, CacheCodecError
+from src.models.film import FilmsDetailsResponseModel
+from src.models.genres import GenresFullResponse
+from tests.benchmarks.dataset import load_documents
+
+
+def cached_values() -> dict[str, list[dict]]:
+    """Значения в том виде, в каком их кэшируют FilmService и GenresService"""
+    films, genres = load_documents()
+    return {
+        'films': [
+            FilmsDetailsResponseModel(**film).model_dump()
+            for film in films if film['imdb_rating'] is not None
+        ],
+        'genres': [GenresFullResponse(**genre).model_dump() for genre in genres],
+    }
+
+
+def measure(codec: CacheCodec, values: list[dict], repeat: int) -> dict[str, float]:
+    encoded = [codec.encode(value) for value in values]
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            codec.encode(value)
+    encode_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in encoded:
+            codec.decode(data)
+    decode_time = time.perf_counter() - started
+
+    operations = repeat * len(values)
+    total_bytes = sum(map(len, encoded))
+    return {
+        'total_kb': total_bytes / 1024,
+        'avg_bytes': total_bytes / len(values),
+        'max_bytes': max(map(len, encoded)),
+        'encode_us': encode_time / operations * 1e6,
+        'decode_us': decode_time / operations * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=int, default=1024, help='Порог сжатия в байтах')
+    args = parser.parse_args()
+
+    for name, values in cached_values().items():
+        print(f'\n{name}: {len(values)} documents')
+        print(f"{'codec':<16}{'total KB':>10}{'avg B':>9}{'max B':>9}{'enc us':>9}{'dec us':>9}")
+        for serializer in SERIALIZERS:
+            for compression in COMPRESSIONS:
+                try:
+                    codec = CacheCodec(serializer, compression, args.threshold)
+                except CacheCodecError:
+                    continue
+                result = measure(codec, values, args.repeat)
+                print(
+                    f"{serializer + '+' + compression:<16}"
+                    f"{result['total_kb']:>10.1f}{result['avg_bytes']:>9.0f}{result['max_bytes']:>9}"
+                    f"{result['encode_us']:>9.1f}{result['decode_us']:>9.1f}"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Микробенчмарки горячих путей сервисного слоя: время и память.
+
+Документы собираются из backup.sql и размножаются до нужного числа хитов.
+Для каждого случая и размера выводится время на операцию (медиана повторов),
+время на документ и пик памяти по tracemalloc (замеряется отдельным прогоном,
+чтобы трассировка не искажала время). Запуск из корня репозитория:
+
+    python -m tests.benchmarks.bench_service [--sizes 100,1000,10000,100000] [--repeat 5] [--filter film.]
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from itertools import cycle, islice
+
+from src.api.v1.films import FilmsDetailsResponse, _build_films_list_response
+from src.cache.codec import cache_codec
+from src.models.film import FilmsDetailsResponseModel, FilmsPageModel
+from src.services.film import LIST_SOURCE_FIELDS, FilmService
+from src.services.genres import GenresService
+from tests.benchmarks.dataset import load_documents
+
+LOOP = asyncio.new_event_loop()
+
+
+class StubElasticsearch:
+    """Мгновенно отдает заранее подготовленные ответы"""
+
+    def __init__(self, search_result: dict | None = None, docs: dict[str, dict] | None = None):
+        self.search_result = search_result
+        self.docs = docs or {}
+
+    async def search(self, **kwargs) -> dict:
+        return self.search_result
+
+    async def get(self, index: str, id: str, **kwargs) -> dict:
+        return self.docs[id]
+
+
+class StubRedis:
+    def __init__(self, values: dict[str, bytes]):
+        self.values = values
+
+    async def get(self, key: str) -> bytes | None:
+        return self.values.get(key.rsplit(':', 1)[-1])
+
+
+def scaled(documents: list[dict], size: int) -> list[dict]:
+    """size документов: исходные повторяются с уникальными id"""
+    return [
+        {**document, 'id': f"{document['id']}-{number}"}
+        for number, document in enumerate(islice(cycle(documents), size))
+    ]
+
+
+def build_cases(films: list[dict], genres: list[dict], size: int) -> dict[str, Callable[[], object]]:
+    film_docs = scaled(films, size)
+    genre_docs = scaled(genres, size)
+    film_service = FilmService(redis=None, elastic=None)
+
+    es_film_docs = [{'_id': doc['id'], '_source': doc} for doc in film_docs]
+    search_result = {
+        'took': 1,
+        'hits': {'hits': [
+            {
+                '_id': doc['id'],
+                '_source': {field: doc[field] for field in LIST_SOURCE_FIELDS},
+                'sort': [doc['imdb_rating'], doc['id']],
+            }
+            for doc in film_docs
+        ]},
+    }
+    details = [FilmsDetailsResponseModel(**{**doc, 'description': doc['description'] or ''}) for doc in film_docs]
+    dumps = [film.model_dump() for film in details]
+    encoded = [cache_codec.encode(dump) for dump in dumps]
+    page = LOOP.run_until_complete(film_service._process_elasticsearch_result(search_result))
+
+    genres_search = {'hits': {'hits': [{'_id': doc['id'], '_source': {'name': doc['name']}} for doc in genre_docs]}}
+    genres_by_id = {doc['id']: {'_id': doc['id'], '_source': doc} for doc in genre_docs}
+    genres_cached = {doc['id']: cache_codec.encode(doc) for doc in genre_docs}
+    genres_list_service = GenresService(redis=None, elastic=StubElasticsearch(search_result=genres_search))
+    genres_elastic_service = GenresService(redis=None, elastic=StubElasticsearch(docs=genres_by_id))
+    genres_cache_service = GenresService(redis=StubRedis(genres_cached), elastic=None)
+
+    async def genres_from_elastic():
+        for genre_id in genres_by_id:
+            await genres_elastic_service._get_genres_from_elastic(genre_id)
+
+    async def genres_from_cache():
+        # Redis и разбор значения, минуя L1
+        genres_cache = genres_cache_service._cache
+        for genre_id in genres_cached:
+            genres_cache._parse_cached(await genres_cache._raw_from_cache(genre_id))
+
+    return {
+        'film.build_search_body': lambda: [
+            film_service._build_search_body(50, 0, sort=film_service._build_sort('-imdb_rating')),
+            film_service._build_search_body(50, 0, query={'match': {'title': 'star'}}),
+            film_service._build_search_body(
+                50, 0, sort=[{'imdb_rating': {'order': 'desc'}}, {'id': {'order': 'asc'}}],
+                search_after=[9.5, 'id'], pit_id='pit'
+            ),
+        ],
+        'film.process_result': lambda: LOOP.run_until_complete(
+            film_service._process_elasticsearch_result(search_result, with_cursor=True, search_body={'size': size})
+        ),
+        'film.film_from_doc': lambda: [film_service._film_from_doc(doc) for doc in es_film_docs],
+        'film.parse_cached': lambda: [film_service._cache._parse_cached(data) for data in encoded],
+        'film.cache_entry': lambda: [film_service._cache._cache_entry(film) for film in details],
+        'router.films_list': lambda: _build_films_list_response(
+            FilmsPageModel(films=page.films), 1, size
+        ).model_dump_json(),
+        'router.film_details': lambda: [
+            FilmsDetailsResponse(**film.model_dump()).model_dump_json() for film in details
+        ],
+        'codec.encode': lambda: [cache_codec.encode(dump) for dump in dumps],
+        'codec.decode': lambda: [cache_codec.decode(data) for data in encoded],
+        'codec.to_json': lambda: [cache_codec.to_json(data) for data in encoded],
+        'genres.list': lambda: LOOP.run_until_complete(genres_list_service.get_genres_list()),
+        'genres.from_elastic': lambda: LOOP.run_until_complete(genres_from_elastic()),
+        'genres.from_cache': lambda: LOOP.run_until_complete(genres_from_cache()),
+    }
+
+
+def measure(func: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """Медианное время вызова и пик памяти одного вызова"""
+    func()
+    timings = []
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help='Число хитов через запятую')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='Запускать только случаи с этой подстрокой')
+    args = parser.parse_args()
+    # Сервисы логируют каждый документ, это исказило бы замеры
+    logging.disable(logging.WARNING)
+
+    films, genres = load_documents()
+    films = [film for film in films if film['imdb_rating'] is not None]
+
+    print(f"{'case':<24}{'hits':>8}{'ms/op':>11}{'us/hit':>9}{'peak KB':>11}{'B/hit':>8}")
+    for size in map(int, args.sizes.split(',')):
+        for name, func in build_cases(films, genres, size).items():
+            if args.filter not in name:
+                continue
+            elapsed, peak = measure(func, args.repeat)
+            print(
+                f"{name:<24}{size:>8}{elapsed * 1000:>11.3f}{elapsed / size * 1e6:>9.2f}"
+                f"{peak / 1024:>11.1f}{peak / size:>8.0f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
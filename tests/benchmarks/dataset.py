@@ -0,0 +1,91 @@
+"""Документы фильмов и жанров из дампа backup.sql для бенчмарков.
+
+Дамп разбирается без PostgreSQL: читаются блоки COPY ... FROM stdin,
+а документы собираются в той же форме, в какой их пишет в Elasticsearch ETL.
+"""
+from collections import defaultdict
+from pathlib import Path
+
+BACKUP_SQL = Path(__file__).resolve().parent.parent.parent / 'backup.sql'
+
+ROLE_FIELDS = {'director': 'directors', 'actor': 'actors', 'writer': 'writers'}
+
+
+def _unescape(value: str) -> str | None:
+    if value == r'\N':
+        return None
+    return value.replace('\\t', '\t').replace('\\n', '\n').replace('\\\\', '\\')
+
+
+def read_copy_tables(path: Path = BACKUP_SQL) -> dict[str, list[dict]]:
+    """Строки всех блоков COPY дампа: {имя таблицы: [{колонка: значение}]}"""
+    tables = {}
+    columns = None
+    rows = None
+    with open(path, encoding='utf-8') as dump:
+        for line in dump:
+            line = line.rstrip('\n')
+            if columns is None:
+                if line.startswith('COPY '):
+                    table, _, rest = line[len('COPY '):].partition(' (')
+                    columns = rest.split(')')[0].split(', ')
+                    rows = tables.setdefault(table.split('.')[-1], [])
+                continue
+            if line == '\\.':
+                columns = None
+                continue
+            rows.append(dict(zip(columns, map(_unescape, line.split('\t')))))
+    return tables
+
+
+def load_documents(path: Path = BACKUP_SQL) -> tuple[list[dict], list[dict]]:
+    """Документы индексов movies и genres, собранные из дампа"""
+    tables = read_copy_tables(path)
+
+    genres = {row['id']: row['pname'] for row in tables['genre']}
+    persons = {row['id']: row['full_name'] for row in tables['person']}
+
+    film_genres = defaultdict(list)
+    genre_films = defaultdict(list)
+    for row in tables['genre_film_work']:
+        film_genres[row['film_work_id']].append(genres[row['genre_id']])
+        genre_films[row['genre_id']].append(row['film_work_id'])
+
+    film_persons = defaultdict(lambda: defaultdict(list))
+    for row in tables['person_film_work']:
+        field = ROLE_FIELDS.get(row['role'])
+        if field and row['person_id'] in persons:
+            film_persons[row['film_work_id']][field].append(
+                {'id': row['person_id'], 'name': persons[row['person_id']]}
+            )
+
+    films = []
+    titles = {}
+    for row in tables['film_work']:
+        film_id = row['id']
+        titles[film_id] = row['title']
+        document = {
+            'id': film_id,
+            'imdb_rating': float(row['rating']) if row['rating'] else None,
+            'genres': film_genres[film_id],
+            'title': row['title'],
+            'description': row['description'],
+        }
+        for field in ROLE_FIELDS.values():
+            people = film_persons[film_id][field]
+            document[field] = people
+            document[f'{field}_names'] = [person['name'] for person in people]
+        films.append(document)
+
+    genre_documents = []
+    for genre_id, name in genres.items():
+        film_ids = [film_id for film_id in genre_films[genre_id] if film_id in titles]
+        genre_documents.append({
+            'id': genre_id,
+            'name': name,
+            'film_ids': film_ids,
+            'film_titles': [titles[film_id] for film_id in film_ids],
+            'films_count': len(film_ids),
+        })
+
+    return films, genre_documents
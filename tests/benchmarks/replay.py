@@ -0,0 +1,280 @@
+"""Нагрузочный прогон API по трассе запросов с отчетом по маршрутам.
+
+Приложение запускается в процессе (httpx.ASGITransport) поверх in-memory
+Elasticsearch и Redis из backends.py, заполненных документами из backup.sql,
+поэтому прогон не требует сети и внешних сервисов.
+
+Трасса — JSONL, одна строка на запрос:
+
+    {"method": "GET", "path": "/api/v1/films/?page_size=50"}
+    {"method": "POST", "path": "/api/v1/films/batch", "json": {"ids": ["..."]}}
+
+Без --trace генерируется синтетическая трасса с фиксированным seed,
+так что прогоны на разных коммитах сравнимы. Запуск из корня репозитория:
+
+    python -m tests.benchmarks.replay --concurrency 32 --output result.json
+    python -m tests.benchmarks.replay --compare result.json --max-regression 0.2
+
+Требуется httpx.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from starlette.routing import Match
+
+from tests.benchmarks.backends import FakeElasticsearch, FakeRedis
+from tests.benchmarks.dataset import load_documents
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(len(ordered) * percent / 100 + 0.999999) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def generate_trace(films: list[dict], genres: list[dict], size: int, seed: int) -> list[dict]:
+    """Смесь запросов, близкая к реальной: популярные фильмы запрашиваются чаще"""
+    rng = random.Random(seed)
+    film_ids = [film['id'] for film in films]
+    genre_ids = [genre['id'] for genre in genres]
+    words = sorted({word.lower() for film in films for word in (film['title'] or '').split() if len(word) > 3})
+    # Распределение популярности, близкое к закону Ципфа
+    weights = [1 / rank for rank in range(1, len(film_ids) + 1)]
+
+    trace = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < 0.40:
+            path = f'/api/v1/films/{rng.choices(film_ids, weights)[0]}'
+        elif roll < 0.42:
+            path = f'/api/v1/films/{rng.getrandbits(128):032x}'
+        elif roll < 0.60:
+            sort = rng.choice(['-imdb_rating', 'imdb_rating'])
+            path = f'/api/v1/films/?sort={sort}&page_size=50&page_number={rng.randint(1, 5)}'
+        elif roll < 0.82:
+            path = f'/api/v1/films/search/?query={rng.choice(words)}&page_size=50'
+        elif roll < 0.90:
+            path = f'/api/v1/genres/{rng.choice(genre_ids)}'
+        elif roll < 0.95:
+            path = '/api/v1/genres/'
+        else:
+            trace.append({
+                'method': 'POST',
+                'path': '/api/v1/films/batch',
+                'json': {'ids': rng.choices(film_ids, weights, k=20)},
+            })
+            continue
+        trace.append({'method': 'GET', 'path': path})
+    return trace
+
+
+def load_trace(path: Path) -> list[dict]:
+    with open(path, encoding='utf-8') as trace_file:
+        return [json.loads(line) for line in trace_file if line.strip()]
+
+
+def build_app(es_latency: float, redis_latency: float, load_shedding: bool = False):
+    """Приложение с подмененными клиентами; lifespan не запускается"""
+    from src.core import config
+
+    # Middleware подключаются при импорте приложения, поэтому настройку меняем до него.
+    # По умолчанию сброс нагрузки выключен: прогон меряет пропускную способность, а не лимиты
+    config.settings.load_shedding_enabled = load_shedding
+    from src.db import elastic, redis
+    from src.db.elastic import get_elastic
+    from src.db.redis import get_redis
+    from src.main import app
+
+    films, genres = load_documents()
+    # Модель элемента списка требует рейтинг, как и в bench_codecs берем только фильмы с ним
+    films = [film for film in films if film['imdb_rating'] is not None]
+    elastic.es = FakeElasticsearch(films, genres, latency=es_latency)
+    redis.redis = FakeRedis(latency=redis_latency)
+
+    async def fake_elastic():
+        return elastic.es
+
+    async def fake_redis():
+        return redis.redis
+
+    app.dependency_overrides[get_elastic] = fake_elastic
+    app.dependency_overrides[get_redis] = fake_redis
+    return app, films, genres
+
+
+def route_of(app, method: str, path: str) -> str:
+    """Шаблон маршрута FastAPI, которому соответствует путь"""
+    scope = {'type': 'http', 'method': method, 'path': path.split('?')[0]}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f'{method} {route.path}'
+    return f'{method} unmatched'
+
+
+async def replay(app, trace: list[dict], concurrency: int) -> tuple[dict[str, list[tuple[float, int]]], float]:
+    samples: dict[str, list[tuple[float, int]]] = defaultdict(list)
+    queue: asyncio.Queue = asyncio.Queue()
+    for request in trace:
+        queue.put_nowait(request)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        async def worker():
+            while not queue.empty():
+                request = queue.get_nowait()
+                route = route_of(app, request['method'], request['path'])
+                started = time.perf_counter()
+                try:
+                    response = await client.request(request['method'], request['path'], json=request.get('json'))
+                    status = response.status_code
+                except Exception:
+                    status = 0
+                samples[route].append((time.perf_counter() - started, status))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return samples, elapsed
+
+
+def summarize(samples: dict[str, list[tuple[float, int]]], elapsed: float) -> dict[str, dict]:
+    routes = {}
+    all_samples = [sample for route_samples in samples.values() for sample in route_samples]
+    for route, route_samples in sorted(samples.items()) + [('TOTAL', all_samples)]:
+        latencies = [latency for latency, _ in route_samples]
+        routes[route] = {
+            'requests': len(route_samples),
+            'rps': len(route_samples) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'client_errors': sum(400 <= status < 500 for _, status in route_samples) / len(route_samples),
+            'errors': sum(status == 0 or status >= 500 for _, status in route_samples) / len(route_samples),
+        }
+    return routes
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_report(routes: dict[str, dict], baseline: dict[str, dict] | None = None) -> None:
+    print(f"{'route':<42}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'4xx':>7}{'err':>7}")
+    for route, stats in routes.items():
+        print(
+            f"{route:<42}{stats['requests']:>9}{stats['rps']:>9.0f}"
+            f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+            f"{stats['client_errors']:>7.1%}{stats['errors']:>7.1%}"
+        )
+        if baseline and route in baseline:
+            before = baseline[route]
+            print(
+                f"{'  vs baseline':<42}{'':>9}{_delta(stats['rps'], before['rps']):>9}"
+                f"{_delta(stats['p50_ms'], before['p50_ms']):>9}{_delta(stats['p95_ms'], before['p95_ms']):>9}"
+                f"{_delta(stats['p99_ms'], before['p99_ms']):>9}"
+            )
+
+
+def _delta(value: float, before: float) -> str:
+    if not before:
+        return '-'
+    return f'{(value - before) / before:+.0%}'
+
+
+def regressions(routes: dict[str, dict], baseline: dict[str, dict], max_regression: float) -> list[str]:
+    """Маршруты, у которых p99 или доля ошибок выросли сильнее допустимого"""
+    failed = []
+    for route, stats in routes.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        if before['p99_ms'] and stats['p99_ms'] > before['p99_ms'] * (1 + max_regression):
+            failed.append(f"{route}: p99 {before['p99_ms']:.2f} -> {stats['p99_ms']:.2f} ms")
+        if stats['errors'] > before['errors']:
+            failed.append(f"{route}: errors {before['errors']:.1%} -> {stats['errors']:.1%}")
+    return failed
+
+
+async def run(args: argparse.Namespace) -> int:
+    # Логи на каждый запрос заметно искажают замеры
+    logging.disable(getattr(logging, args.log_level))
+    app, films, genres = build_app(args.es_latency / 1000, args.redis_latency / 1000, args.load_shedding)
+    trace = load_trace(args.trace) if args.trace else generate_trace(films, genres, args.requests, args.seed)
+    if args.save_trace:
+        with open(args.save_trace, 'w', encoding='utf-8') as trace_file:
+            trace_file.writelines(json.dumps(request) + '\n' for request in trace)
+
+    if args.warmup:
+        await replay(app, trace[:args.warmup], args.concurrency)
+    samples, elapsed = await replay(app, trace, args.concurrency)
+    routes = summarize(samples, elapsed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['routes']
+    print_report(routes, baseline)
+
+    if args.output:
+        result = {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'trace': str(args.trace) if args.trace else f'synthetic:{args.requests}:{args.seed}',
+            'concurrency': args.concurrency,
+            'es_latency_ms': args.es_latency,
+            'redis_latency_ms': args.redis_latency,
+            'elapsed_s': elapsed,
+            'routes': routes,
+        }
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(result, output_file, indent=2)
+
+    if baseline:
+        failed = regressions(routes, baseline, args.max_regression)
+        for line in failed:
+            print(f'REGRESSION {line}')
+        return 1 if failed else 0
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trace', type=Path, help='JSONL-трасса запросов')
+    parser.add_argument('--requests', type=int, default=5000, help='Размер синтетической трассы')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save-trace', type=Path, help='Сохранить используемую трассу')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--warmup', type=int, default=500, help='Запросов трассы для прогрева кэшей')
+    parser.add_argument('--es-latency', type=float, default=2.0, help='Задержка Elasticsearch, мс')
+    parser.add_argument('--redis-latency', type=float, default=0.2, help='Задержка Redis, мс')
+    parser.add_argument('--output', type=Path, help='Сохранить результат в JSON')
+    parser.add_argument('--compare', type=Path, help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='Допустимый рост p99')
+    parser.add_argument('--load-shedding', action='store_true', help='Включить адаптивный лимит запросов')
+    parser.add_argument('--log-level', default='WARNING', help='Отключить логи этого уровня и ниже')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
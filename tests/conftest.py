@@ -1,4 +1,5 @@
 from functional.settings import test_settings
+from functional.testdata.es_mapping import MOVIES_INDEX_MAPPING
 # from settings import test_settings
 from functional.utils.helpers import AbstractAsyncElasticsearch
 from elasticsearch.helpers import async_bulk
@@ -32,14 +33,14 @@ async def es_client():
 @pytest_asyncio.fixture
 async def setup_es_index(es_client):
     """Фикстура для очистки и создания индекса с параметром"""
-    async def inner(index_name: str):
+    async def inner(index_name: str, mapping: dict = None):
         if await es_client.indices.exists(index=index_name):
             await es_client.indices.delete(index=index_name)
             await asyncio.sleep(0.1)
 
         await es_client.indices.create(
             index=index_name,
-            **test_settings.es_index_mapping
+            **(mapping or test_settings.es_index_mapping)
         )
         logger.info(f"✅ Index '{index_name}' recreated")
 
@@ -49,13 +50,13 @@ async def setup_es_index(es_client):
 @pytest_asyncio.fixture
 async def load_es_data(es_client, setup_es_index):
     """Фикстура для загрузки данных в Elasticsearch"""
-    async def inner(bulk_query: list[dict], index_name: str = None):
+    async def inner(bulk_query: list[dict], index_name: str = None, mapping: dict = None):
         if index_name is None and bulk_query:
             index_name = bulk_query[0]['_index']
         elif index_name is None:
             index_name = test_settings.es_index
 
-        await setup_es_index(index_name)
+        await setup_es_index(index_name, mapping)
 
         updated, errors = await async_bulk(
             client=es_client,
@@ -142,6 +143,60 @@ async def es_write_full_data(load_es_data):
     return inner
 
 
+# Люди для фильтра person
+FILTER_PERSON_ANN = '5b4d6f0a-1c8e-4e4c-9d6b-2f0b8a7c3e11'
+FILTER_PERSON_BOB = '9e1f2a3b-4c5d-4e6f-8a7b-9c0d1e2f3a44'
+
+
+@pytest_asyncio.fixture
+async def es_write_filter_data(load_es_data):
+    """Фильмы с жанрами, рейтингами и людьми в индексе с маппингом API.
+
+    25 фильмов 'The Star' с повторяющимися рейтингами (курсор обязан
+    различать их по id) и 6 фильмов 'The Moon' для фильтров и фасетов.
+    """
+    async def inner():
+        es_data = [{
+            'id': f'00000000-0000-4000-8000-{number:012d}',
+            'imdb_rating': float(number % 5),
+            'genres': [],
+            'title': 'The Star',
+            'directors': [],
+            'actors': [],
+            'writers': []
+        } for number in range(25)]
+
+        moon_films = [
+            ('10000000-0000-4000-8000-000000000001', 9.0, ['Comedy'], 'actors', FILTER_PERSON_ANN),
+            ('10000000-0000-4000-8000-000000000002', 7.5, ['Comedy'], 'directors', FILTER_PERSON_BOB),
+            ('10000000-0000-4000-8000-000000000003', 5.0, ['Drama'], 'writers', FILTER_PERSON_ANN),
+            ('10000000-0000-4000-8000-000000000004', 3.0, ['Drama'], None, None),
+            ('10000000-0000-4000-8000-000000000005', 8.0, ['Horror'], 'actors', FILTER_PERSON_BOB),
+            ('10000000-0000-4000-8000-000000000006', 1.5, ['Horror'], None, None),
+        ]
+        for film_id, rating, genres, role, person_id in moon_films:
+            film = {
+                'id': film_id,
+                'imdb_rating': rating,
+                'genres': genres,
+                'title': 'The Moon',
+                'directors': [],
+                'actors': [],
+                'writers': []
+            }
+            if role:
+                film[role] = [{'id': person_id, 'name': 'Person'}]
+            es_data.append(film)
+
+        bulk_query = []
+        for row in es_data:
+            bulk_query.append({'_index': 'movies_test', '_id': row['id'], '_source': row})
+
+        await load_es_data(bulk_query, index_name='movies_test', mapping=MOVIES_INDEX_MAPPING)
+
+    return inner
+
+
 @pytest_asyncio.fixture
 async def make_get_request():
     async def inner(path: str, query_data: dict = None):
@@ -155,6 +210,19 @@ async def make_get_request():
                 }
     return inner
 
+@pytest_asyncio.fixture
+async def make_post_request():
+    async def inner(path: str, json_data: dict = None):
+        async with aiohttp.ClientSession() as session:
+            url = f'{test_settings.service_url}/api/v1/films{path}'
+            async with session.post(url, json=json_data) as response:
+                return {
+                    'body': await response.json(),
+                    'headers': dict(response.headers),
+                    'status': response.status
+                }
+    return inner
+
 @pytest_asyncio.fixture
 async def make_get_genres_request():
     async def inner(path: str, query_data: dict = None):
@@ -2,9 +2,12 @@ import json
 from http import HTTPStatus
 import pytest
 
-from conftest import es_write_data, make_get_request, es_write_full_data, load_es_data, es_client, setup_es_index, redis_client
+from conftest import es_write_data, make_get_request, make_post_request, es_write_full_data, load_es_data, es_client, setup_es_index, redis_client, es_write_filter_data, FILTER_PERSON_ANN, FILTER_PERSON_BOB
 from functional.utils.helpers import Fixture
 
+# Фильмы 'The Moon' из es_write_filter_data
+MOON = [f'10000000-0000-4000-8000-00000000000{number}' for number in range(1, 7)]
+
 
 class TestFilms:
 
@@ -190,11 +193,388 @@ class TestFilms:
         response = await make_get_request(path=f'/{path}')
 
         assert response['status'] == expected_answer['status']
-        cached_data = await redis_client.get(path)
+        # Ключ документа: 'film:v<версия схемы>:g<поколение>:<id>'
+        cache_keys = [key async for key in redis_client.scan_iter(match=f'film:v*:g*:{path}')]
+        assert len(cache_keys) == 1
+        cached_data = await redis_client.get(cache_keys[0])
         assert cached_data is not None
 
         if cached_data:
-            movie_data = json.loads(cached_data)
+            # Значение кэша: заголовок кодека ('#2j-'), срок свежести до '|' и JSON
+            assert cached_data.startswith('#2j')
+            movie_data = json.loads(cached_data.split('|', 1)[1])
             assert movie_data['id'] == path
             assert 'title' in movie_data
             assert 'imdb_rating' in movie_data
+
+    @pytest.mark.parametrize(
+        'ids, expected_answer',
+        [
+            (
+                ['ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95', 'fb111f22-121e-44a7-b78f-b19191810fbf'],
+                {'status': HTTPStatus.OK, 'length': 2, 'not_found': 0}
+            ),
+            (
+                ['ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95', 'fb111f22-121e-44a7-b78f-b19191810fbd'],
+                {'status': HTTPStatus.OK, 'length': 1, 'not_found': 1}
+            ),
+            (
+                [],
+                {'status': HTTPStatus.UNPROCESSABLE_ENTITY}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_films_batch(
+        self,
+        es_write_full_data: Fixture,
+        make_post_request: Fixture,
+        load_es_data: Fixture,
+        es_client: Fixture,
+        setup_es_index: Fixture,
+        expected_answer: dict,
+        ids: list
+    ):
+
+        await es_write_full_data()
+
+        response = await make_post_request(path='/batch', json_data={'ids': ids})
+
+        assert response['status'] == expected_answer['status']
+
+        if expected_answer['status'] == HTTPStatus.OK:
+            assert len(response['body']['films']) == expected_answer['length']
+            assert len(response['body']['not_found']) == expected_answer['not_found']
+
+    @pytest.mark.parametrize(
+        'path, query_params, expected_answer',
+        [
+            (
+                '/',
+                {'page_size': 7},
+                {'status': HTTPStatus.OK, 'length': 31}
+            ),
+            (
+                '/',
+                {'page_size': 10, 'sort': 'imdb_rating'},
+                {'status': HTTPStatus.OK, 'length': 31}
+            ),
+            (
+                '/',
+                {'page_size': 7, 'consistent': 'true'},
+                {'status': HTTPStatus.OK, 'length': 31}
+            ),
+            (
+                '/search/',
+                {'query': 'star', 'page_size': 4},
+                {'status': HTTPStatus.OK, 'length': 25}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_films_cursor_walk(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        path: str,
+        query_params: dict,
+        expected_answer: dict
+    ):
+
+        await es_write_filter_data()
+
+        film_ids = []
+        cursor = '*'
+        # Рейтинги повторяются, поэтому без дополнительного ключа сортировки страницы бы пересекались
+        for _ in range(expected_answer['length']):
+            response = await make_get_request(path=path, query_data={**query_params, 'cursor': cursor})
+
+            assert response['status'] == expected_answer['status']
+            assert len(response['body']['films']) <= query_params['page_size']
+            film_ids += [film['id'] for film in response['body']['films']]
+            cursor = response['body']['next_cursor']
+            if cursor is None:
+                break
+
+        assert cursor is None
+        assert len(film_ids) == expected_answer['length']
+        assert len(set(film_ids)) == expected_answer['length']
+
+    @pytest.mark.parametrize(
+        'path, query_params, expected_answer',
+        [
+            (
+                '/search/',
+                {'query': 'moon', 'page_size': 3},
+                {'status': HTTPStatus.OK, 'pages': [3, 3]}
+            ),
+            (
+                '/',
+                {'genre': 'Horror', 'page_size': 2},
+                {'status': HTTPStatus.OK, 'pages': [2]}
+            ),
+            (
+                '/',
+                {'page_size': 31},
+                {'status': HTTPStatus.OK, 'pages': [31]}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_films_cursor_walk_exact_multiple(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        path: str,
+        query_params: dict,
+        expected_answer: dict
+    ):
+
+        await es_write_filter_data()
+
+        # Число фильмов кратно размеру страницы: последняя полная страница
+        # не должна отдавать курсор на пустую страницу (404)
+        pages = []
+        cursor = '*'
+        while cursor is not None and len(pages) <= len(expected_answer['pages']):
+            response = await make_get_request(path=path, query_data={**query_params, 'cursor': cursor})
+
+            assert response['status'] == expected_answer['status']
+            pages.append(len(response['body']['films']))
+            cursor = response['body']['next_cursor']
+
+        assert pages == expected_answer['pages']
+
+    @pytest.mark.parametrize(
+        'path, query_params, expected_answer',
+        [
+            (
+                '/',
+                {'cursor': 'not-a-cursor'},
+                {'status': HTTPStatus.BAD_REQUEST}
+            ),
+            (
+                '/search/',
+                {'query': 'star', 'cursor': 'not-a-cursor'},
+                {'status': HTTPStatus.BAD_REQUEST}
+            ),
+            (
+                '/',
+                {'cursor': 'eyJhZnRlciI6IDF9'},
+                {'status': HTTPStatus.BAD_REQUEST}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_films_invalid_cursor(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        path: str,
+        query_params: dict,
+        expected_answer: dict
+    ):
+
+        await es_write_filter_data()
+
+        response = await make_get_request(path=path, query_data=query_params)
+
+        assert response['status'] == expected_answer['status']
+        assert response['body']['detail'] == 'invalid cursor'
+
+    @pytest.mark.parametrize(
+        'path, query_params, expected_answer',
+        [
+            (
+                '/search/',
+                {'query': 'moon', 'genre': 'Comedy'},
+                {'status': HTTPStatus.OK, 'ids': {MOON[0], MOON[1]}}
+            ),
+            (
+                '/search/',
+                {'query': 'moon', 'min_rating': 7.5},
+                {'status': HTTPStatus.OK, 'ids': {MOON[0], MOON[1], MOON[4]}}
+            ),
+            (
+                '/search/',
+                {'query': 'moon', 'max_rating': 3},
+                {'status': HTTPStatus.OK, 'ids': {MOON[3], MOON[5]}}
+            ),
+            (
+                '/search/',
+                {'query': 'moon', 'person': FILTER_PERSON_ANN},
+                {'status': HTTPStatus.OK, 'ids': {MOON[0], MOON[2]}}
+            ),
+            (
+                '/search/',
+                {'query': 'moon', 'person': FILTER_PERSON_BOB, 'min_rating': 8},
+                {'status': HTTPStatus.OK, 'ids': {MOON[4]}}
+            ),
+            (
+                '/search/',
+                {'query': 'moon', 'genre': 'Western'},
+                {'status': HTTPStatus.NOT_FOUND}
+            ),
+            (
+                '/',
+                {'genre': 'Drama'},
+                {'status': HTTPStatus.OK, 'ids': {MOON[2], MOON[3]}}
+            ),
+            (
+                '/',
+                {'genre': 'Comedy', 'min_rating': 8},
+                {'status': HTTPStatus.OK, 'ids': {MOON[0]}}
+            ),
+            (
+                '/',
+                {'genre': 'Horror', 'max_rating': 5},
+                {'status': HTTPStatus.OK, 'ids': {MOON[5]}}
+            ),
+            (
+                '/',
+                {'person': FILTER_PERSON_BOB},
+                {'status': HTTPStatus.OK, 'ids': {MOON[1], MOON[4]}}
+            ),
+            (
+                '/',
+                {'min_rating': 11},
+                {'status': HTTPStatus.UNPROCESSABLE_ENTITY}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_films_filters(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        path: str,
+        query_params: dict,
+        expected_answer: dict
+    ):
+
+        await es_write_filter_data()
+
+        response = await make_get_request(path=path, query_data=query_params)
+
+        assert response['status'] == expected_answer['status']
+
+        if expected_answer['status'] == HTTPStatus.OK:
+            assert {film['id'] for film in response['body']['films']} == expected_answer['ids']
+
+    @pytest.mark.parametrize(
+        'query_params, expected_answer',
+        [
+            (
+                {'query': 'moon', 'facets': 'genres'},
+                {'genres': [{'key': 'Comedy', 'count': 2}, {'key': 'Drama', 'count': 2}, {'key': 'Horror', 'count': 2}]}
+            ),
+            (
+                {'query': 'moon', 'facets': 'rating'},
+                {'rating': [{'key': key, 'count': 1} for key in (1.0, 3.0, 5.0, 7.0, 8.0, 9.0)]}
+            ),
+            (
+                {'query': 'moon', 'facets': 'genres,rating', 'genre': 'Comedy'},
+                {
+                    'genres': [{'key': 'Comedy', 'count': 2}],
+                    'rating': [{'key': 7.0, 'count': 1}, {'key': 9.0, 'count': 1}]
+                }
+            ),
+            (
+                {'query': 'moon'},
+                None
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_search_facets(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        query_params: dict,
+        expected_answer: dict | None
+    ):
+
+        await es_write_filter_data()
+
+        response = await make_get_request(path='/search/', query_data=query_params)
+
+        assert response['status'] == HTTPStatus.OK
+        if expected_answer is None:
+            assert 'facets' not in response['body']
+            return
+
+        facets = response['body']['facets']
+        assert set(facets) == set(expected_answer)
+        for name, buckets in expected_answer.items():
+            assert all(set(bucket) == {'key', 'count'} for bucket in facets[name])
+            assert sorted(facets[name], key=lambda bucket: bucket['key']) == buckets
+
+    @pytest.mark.parametrize(
+        'facets',
+        [
+            'year',
+            'genres,year',
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_search_unknown_facet(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        facets: str
+    ):
+
+        await es_write_filter_data()
+
+        response = await make_get_request(path='/search/', query_data={'query': 'moon', 'facets': facets})
+
+        assert response['status'] == HTTPStatus.BAD_REQUEST
+        assert 'year' in response['body']['detail']
+
+    @pytest.mark.parametrize(
+        'query_params, facets, expected_answer',
+        [
+            (
+                {'query': 'moon'},
+                'genres',
+                {'genres': [{'key': 'Comedy', 'count': 2}, {'key': 'Drama', 'count': 2}, {'key': 'Horror', 'count': 2}]}
+            ),
+            (
+                {'query': 'moon', 'min_rating': 7.5},
+                'genres',
+                {'genres': [{'key': 'Comedy', 'count': 2}, {'key': 'Horror', 'count': 1}]}
+            ),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_search_facets_for_cached_page(
+        self,
+        es_write_filter_data: Fixture,
+        make_get_request: Fixture,
+        redis_client: Fixture,
+        query_params: dict,
+        facets: str,
+        expected_answer: dict
+    ):
+
+        await es_write_filter_data()
+
+        page = await make_get_request(path='/search/', query_data=query_params)
+        assert page['status'] == HTTPStatus.OK
+        # Страница закэширована, фасетов для нее в кэше еще нет
+        assert [key async for key in redis_client.scan_iter(match='response:films_search:*')]
+        assert not [key async for key in redis_client.scan_iter(match='response:films_facets:*')]
+
+        response = await make_get_request(path='/search/', query_data={**query_params, 'facets': facets})
+
+        assert response['status'] == HTTPStatus.OK
+        assert response['body']['films'] == page['body']['films']
+        for name, buckets in expected_answer.items():
+            assert sorted(response['body']['facets'][name], key=lambda bucket: bucket['key']) == buckets
+        assert len([key async for key in redis_client.scan_iter(match='response:films_facets:*')]) == 1
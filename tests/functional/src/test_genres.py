@@ -1,4 +1,6 @@
+import asyncio
 import json
+import time
 from http import HTTPStatus
 
 import pytest
@@ -7,6 +9,10 @@ from conftest import es_write_data, make_get_genres_request, es_write_genres_dat
 
 from functional.utils.helpers import Fixture
 
+# Список жанров отдается из снимка, который API обновляет раз в
+# GENRES_SNAPSHOT_REFRESH_INTERVAL секунд; ждем с запасом
+SNAPSHOT_WAIT_SECONDS = 10
+
 
 class TestGenres:
 
@@ -32,7 +38,12 @@ class TestGenres:
 
         await es_write_genres_data()
 
+        # Снимок мог быть снят до загрузки данных, ждем, пока он обновится
+        deadline = time.monotonic() + SNAPSHOT_WAIT_SECONDS
         response = await make_get_genres_request(path='/')
+        while len(response['body']) != expected_answer['length'] and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+            response = await make_get_genres_request(path='/')
 
         assert response['status'] == expected_answer['status']
         assert len(response['body']) == expected_answer['length']
@@ -104,11 +115,16 @@ class TestGenres:
         response = await make_get_genres_request(path=f'/{path}')
 
         assert response['status'] == expected_answer['status']
-        cached_data = await redis_client.get(path)
+        # Ключ документа: 'genres:v<версия схемы>:g<поколение>:<id>'
+        cache_keys = [key async for key in redis_client.scan_iter(match=f'genres:v*:g*:{path}')]
+        assert len(cache_keys) == 1
+        cached_data = await redis_client.get(cache_keys[0])
         assert cached_data is not None
 
         if cached_data:
-            genres_data = json.loads(cached_data)
+            # Значение кэша: заголовок кодека ('#2j-'), срок свежести до '|' и JSON
+            assert cached_data.startswith('#2j')
+            genres_data = json.loads(cached_data.split('|', 1)[1])
             assert genres_data['id'] == path
             assert 'film_titles' in genres_data
             assert 'films_count' in genres_data
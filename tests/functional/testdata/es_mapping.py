@@ -0,0 +1,24 @@
+# Маппинг индекса фильмов в части, которой пользуются фильтры и курсоры API
+# (postgres_to_el/etl/lib/index_schema.py): жанры и id — keyword, люди — nested
+PERSON_MAPPING = {
+    'type': 'nested',
+    'properties': {
+        'id': {'type': 'keyword'},
+        'name': {'type': 'text'}
+    }
+}
+
+MOVIES_INDEX_MAPPING = {
+    'mappings': {
+        'properties': {
+            'id': {'type': 'keyword'},
+            'imdb_rating': {'type': 'float'},
+            'genres': {'type': 'keyword'},
+            'title': {'type': 'text', 'fields': {'raw': {'type': 'keyword'}}},
+            'description': {'type': 'text'},
+            'directors': PERSON_MAPPING,
+            'actors': PERSON_MAPPING,
+            'writers': PERSON_MAPPING
+        }
+    }
+}
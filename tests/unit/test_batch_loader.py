@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import pytest
+
+from src.cache.batch_loader import BatchLoader
+from src.cache.single_flight import SingleFlight
+from src.core.deadline import DeadlineExceeded, request_deadline
+
+
+class RecordingLoader:
+    """load_many, запоминающий пакеты, с которыми его вызвали"""
+
+    def __init__(self, delay: float = 0.0, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.batches: list[list[str]] = []
+        self.cancelled = 0
+
+    async def __call__(self, keys: list[str]) -> dict[str, str]:
+        self.batches.append(keys)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return {key: f'film {key}' for key in keys if key != 'unknown'}
+
+
+class TestBatchLoader:
+
+    @pytest.mark.parametrize(
+        'keys, max_batch_size, expected_batches',
+        [
+            (['1', '2', '3'], 100, [3]),
+            ([str(i) for i in range(7)], 3, [3, 3, 1]),
+            (['1', '1', '2'], 100, [2]),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_concurrent_loads_are_batched(self, keys: list[str], max_batch_size: int, expected_batches: list[int]):
+        load_many = RecordingLoader()
+        loader = BatchLoader(load_many, max_batch_size=max_batch_size, window=0.01)
+
+        results = await asyncio.gather(*(loader.load(key) for key in keys))
+
+        assert results == [f'film {key}' for key in keys]
+        assert [len(batch) for batch in load_many.batches] == expected_batches
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_dispatched_without_waiting_for_window(self):
+        load_many = RecordingLoader()
+        loader = BatchLoader(load_many, max_batch_size=2, window=10)
+
+        started = time.monotonic()
+        results = await asyncio.gather(loader.load('1'), loader.load('2'))
+
+        assert results == ['film 1', 'film 2']
+        assert time.monotonic() - started < 1
+
+    @pytest.mark.asyncio
+    async def test_missing_key_is_none(self):
+        loader = BatchLoader(RecordingLoader(), window=0.001)
+
+        assert await asyncio.gather(loader.load('1'), loader.load('unknown')) == ['film 1', None]
+
+    @pytest.mark.asyncio
+    async def test_error_is_raised_to_every_waiter(self):
+        loader = BatchLoader(RecordingLoader(error=ConnectionError('elasticsearch is down')), window=0.001)
+
+        results = await asyncio.gather(loader.load('1'), loader.load('2'), return_exceptions=True)
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_batch(self):
+        load_many = RecordingLoader(delay=0.02)
+        loader = BatchLoader(load_many, window=0.001)
+
+        cancelled = asyncio.ensure_future(loader.load('1'))
+        waiting = asyncio.ensure_future(loader.load('1'))
+        other = asyncio.ensure_future(loader.load('2'))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+
+        assert await waiting == 'film 1'
+        assert await other == 'film 2'
+        assert cancelled.cancelled()
+        assert load_many.batches == [['1', '2']]
+
+    @pytest.mark.asyncio
+    async def test_abandoned_batch_is_cancelled(self):
+        load_many = RecordingLoader(delay=1)
+        loader = BatchLoader(load_many, window=0.001)
+
+        waiters = [asyncio.ensure_future(loader.load(key)) for key in ('1', '2')]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.sleep(0.01)
+
+        assert load_many.batches == [['1', '2']]
+        assert load_many.cancelled == 1
+
+    @pytest.mark.asyncio
+    async def test_key_abandoned_before_dispatch_is_not_loaded(self):
+        load_many = RecordingLoader()
+        loader = BatchLoader(load_many, window=0.01)
+
+        abandoned = asyncio.ensure_future(loader.load('1'))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+
+        assert await loader.load('2') == 'film 2'
+        assert load_many.batches == [['2']]
+
+    @pytest.mark.asyncio
+    async def test_request_deadline_cancels_batch_behind_single_flight(self):
+        # Путь загрузки фильма: single-flight по id, внутри него пакетный mget
+        load_many = RecordingLoader(delay=1)
+        loader = BatchLoader(load_many, window=0.001)
+        single_flight = SingleFlight()
+
+        async def get_film(key: str):
+            request_deadline.set(time.monotonic() + 0.05)
+            return await single_flight.do(key, lambda: loader.load(key))
+
+        started = time.monotonic()
+        results = await asyncio.gather(get_film('1'), get_film('2'), return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+        assert all(isinstance(result, DeadlineExceeded) for result in results)
+        assert load_many.cancelled == 1
+        assert time.monotonic() - started < 0.5
@@ -0,0 +1,108 @@
+import time
+
+import orjson
+import pytest
+
+from src.cache.codec import CacheCodec, CacheCodecError
+
+# Библиотеки необязательных сериализаторов и сжатий
+OPTIONAL_MODULES = {'msgpack': 'msgpack', 'zstd': 'zstandard', 'lz4': 'lz4.frame'}
+
+FILM = {
+    'id': 'ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95',
+    'title': 'Want',
+    'imdb_rating': 1.0,
+    'description': 'New World ' * 200,
+    'genres': ['Horror'],
+    'actors': [{'id': 'fb111f22-121e-44a7-b78f-b19191810fbf', 'name': 'Bob'}],
+}
+
+
+def make_codec(serializer: str, compression: str) -> CacheCodec:
+    for name in (serializer, compression):
+        if name in OPTIONAL_MODULES:
+            pytest.importorskip(OPTIONAL_MODULES[name])
+    return CacheCodec(serializer=serializer, compression=compression, compression_threshold=64)
+
+
+class TestCacheCodec:
+
+    @pytest.mark.parametrize('serializer', ['json', 'msgpack'])
+    @pytest.mark.parametrize('compression', ['none', 'zlib', 'zstd', 'lz4'])
+    @pytest.mark.parametrize('value', [FILM, None, {'id': 'short'}])
+    def test_round_trip(self, serializer: str, compression: str, value: dict | None):
+        codec = make_codec(serializer, compression)
+
+        data = codec.encode(value)
+
+        assert data[:2] == b'#1'
+        assert codec.decode(data) == value
+        assert orjson.loads(codec.to_json(data)) == value
+        assert codec.freshness(data) is None
+
+    @pytest.mark.parametrize('serializer', ['json', 'msgpack'])
+    @pytest.mark.parametrize('compression', ['none', 'zlib', 'zstd', 'lz4'])
+    def test_round_trip_with_freshness(self, serializer: str, compression: str):
+        codec = make_codec(serializer, compression)
+        soft_expire_at = time.time() + 60
+
+        data = codec.encode(FILM, soft_expire_at=soft_expire_at, delta=0.25)
+
+        assert data[:2] == b'#2'
+        assert codec.decode(data) == FILM
+        assert orjson.loads(codec.to_json(data)) == FILM
+        assert codec.freshness(data) == (pytest.approx(soft_expire_at, abs=0.001), 0.25)
+
+    @pytest.mark.parametrize('serializer', ['json', 'msgpack'])
+    @pytest.mark.parametrize('compression', ['none', 'zlib', 'zstd', 'lz4'])
+    def test_values_written_by_another_codec_are_readable(self, serializer: str, compression: str):
+        writer = make_codec(serializer, compression)
+        reader = CacheCodec()
+
+        assert reader.decode(writer.encode(FILM)) == FILM
+        assert reader.decode(writer.encode(FILM, soft_expire_at=time.time())) == FILM
+
+    def test_uncompressed_json_is_served_as_is(self):
+        codec = CacheCodec(serializer='json', compression='zlib', compression_threshold=10 ** 6)
+
+        data = codec.encode(FILM, soft_expire_at=time.time())
+
+        assert data.startswith(b'#2j-')
+        assert codec.to_json(data) == orjson.dumps(FILM)
+
+    @pytest.mark.parametrize(
+        'data, expected_answer',
+        [
+            (orjson.dumps(FILM), FILM),
+            (b'null', None),
+        ]
+    )
+    def test_legacy_json_without_header(self, data: bytes, expected_answer: dict | None):
+        codec = CacheCodec()
+
+        assert codec.decode(data) == expected_answer
+        assert codec.to_json(data) == data
+        assert codec.freshness(data) is None
+
+    @pytest.mark.parametrize(
+        'data',
+        [
+            b'#9j-{}',
+            b'#1x-{}',
+            b'#1jq{}',
+        ]
+    )
+    def test_unknown_header_is_rejected(self, data: bytes):
+        with pytest.raises(CacheCodecError):
+            CacheCodec().decode(data)
+
+    @pytest.mark.parametrize(
+        'serializer, compression',
+        [
+            ('pickle', 'none'),
+            ('json', 'brotli'),
+        ]
+    )
+    def test_unknown_codec_settings_are_rejected(self, serializer: str, compression: str):
+        with pytest.raises(CacheCodecError):
+            CacheCodec(serializer=serializer, compression=compression)
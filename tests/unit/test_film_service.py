@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+from src.cache.invalidation import InvalidationListener
+from src.cache.negative import MISSING, KnownIds
+from src.core.resilience import CircuitBreaker, CircuitOpenError
+from src.db import elastic as elastic_db
+from src.services import film as film_module
+from src.services.film import FilmService
+from tests.benchmarks.backends import FakeElasticsearch, FakeRedis
+
+FILMS = [
+    {'id': f'film-{i}', 'title': f'The Star {i}', 'imdb_rating': float(i % 10), 'description': '',
+     'genres': ['Action'], 'directors': [], 'actors': [], 'writers': []}
+    for i in range(10)
+]
+
+
+class CountingElasticsearch(FakeElasticsearch):
+    """Считает id, запрошенные через get и mget"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_ids: list[str] = []
+
+    async def get(self, index: str, id: str, **kwargs) -> dict:
+        self.requested_ids.append(id)
+        return await super().get(index, id, **kwargs)
+
+    async def mget(self, index: str, ids: list[str], **kwargs) -> dict:
+        self.requested_ids += ids
+        return await super().mget(index, ids, **kwargs)
+
+
+@pytest.fixture
+def elastic():
+    return CountingElasticsearch(FILMS, [])
+
+
+@pytest.fixture
+def film_service(elastic, monkeypatch):
+    """Сервис поверх in-memory бэкендов с чистыми L1 и предохранителем"""
+    film_module.film_local_cache.clear()
+    monkeypatch.setattr(elastic_db, 'breaker', CircuitBreaker('elasticsearch-test', open_seconds=30))
+    return FilmService(FakeRedis(), elastic)
+
+
+@pytest.fixture
+def known_ids(monkeypatch):
+    """Bloom-фильтр id фильмов индекса вместо выключенного по умолчанию"""
+    async def load_ids():
+        return [film['id'] for film in FILMS]
+
+    known_ids = KnownIds('films-test', loader=load_ids, refresh_interval=60)
+    monkeypatch.setattr(film_module, 'film_known_ids', known_ids)
+    return known_ids
+
+
+class TestFilmServiceUnavailable:
+
+    @pytest.mark.parametrize(
+        'film_id',
+        [
+            'film-1',
+            'unknown',
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_open_breaker_is_not_reported_as_missing(self, film_service: FilmService, film_id: str):
+        elastic_db.breaker._trip()
+
+        with pytest.raises(CircuitOpenError) as error:
+            await film_service.get_by_id(film_id)
+
+        assert error.value.retry_after > 0
+        assert film_module.film_local_cache.get(film_id) is not MISSING
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_search_is_not_empty_page(self, film_service: FilmService):
+        elastic_db.breaker._trip()
+
+        with pytest.raises(CircuitOpenError):
+            await film_service.get_search_films('star')
+
+    @pytest.mark.asyncio
+    async def test_cached_film_is_served_with_open_breaker(self, film_service: FilmService):
+        await film_service.get_by_id('film-1')
+        film_module.film_local_cache.clear()
+        elastic_db.breaker._trip()
+
+        film = await film_service.get_by_id('film-1')
+
+        assert film.id == 'film-1'
+
+
+class TestFilmServiceUnknownIds:
+
+    @pytest.mark.parametrize('method', ['get_by_id', 'get_json_by_id'])
+    @pytest.mark.asyncio
+    async def test_unknown_id_is_requested_once(
+            self,
+            film_service: FilmService,
+            elastic: CountingElasticsearch,
+            method: str
+    ):
+        assert not await getattr(film_service, method)('unknown')
+        assert not await getattr(film_service, method)('unknown')
+        # Без L1 отсутствие фильма берется из отрицательного кэша в Redis
+        film_module.film_local_cache.clear()
+        assert not await getattr(film_service, method)('unknown')
+
+        assert elastic.requested_ids == ['unknown']
+
+    @pytest.mark.asyncio
+    async def test_unknown_ids_in_batch_are_requested_once(self, film_service: FilmService, elastic: CountingElasticsearch):
+        assert list(await film_service.get_by_ids(['film-1', 'unknown'])) == ['film-1']
+        film_module.film_local_cache.clear()
+        assert list(await film_service.get_by_ids(['film-1', 'unknown'])) == ['film-1']
+
+        assert elastic.requested_ids == ['film-1', 'unknown']
+
+    @pytest.mark.asyncio
+    async def test_bloom_filter_skips_elasticsearch(
+            self,
+            film_service: FilmService,
+            elastic: CountingElasticsearch,
+            known_ids: KnownIds
+    ):
+        await known_ids.rebuild()
+
+        assert await film_service.get_by_id('unknown') is None
+        assert await film_service.get_by_ids(['unknown']) == {}
+        assert (await film_service.get_by_id('film-1')).id == 'film-1'
+
+        assert elastic.requested_ids == ['film-1']
+
+    @pytest.mark.asyncio
+    async def test_invalidated_id_passes_bloom_filter(
+            self,
+            film_service: FilmService,
+            elastic: CountingElasticsearch,
+            known_ids: KnownIds
+    ):
+        await known_ids.rebuild()
+        listener = InvalidationListener(film_service.redis, 'cache-invalidation')
+        listener.register('film', film_module.invalidate_films)
+
+        assert await film_service.get_by_id('film-new') is None
+        # ETL загрузил новый фильм и сообщил о нем в канал инвалидации
+        elastic.indices['movies']['film-new'] = {**FILMS[0], 'id': 'film-new', 'title': 'New'}
+        await listener.dispatch(json.dumps({'entity': 'film', 'ids': ['film-new']}))
+
+        film = await film_service.get_by_id('film-new')
+
+        assert film.title == 'New'
+        assert elastic.requested_ids == ['film-new']
@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+from src.cache.invalidation import InvalidationListener
+from src.cache.keys import CacheKeyspace
+from src.services.film import film_keyspace, film_local_cache, invalidate_films
+from tests.benchmarks.backends import FakePubSub, FakeRedis
+
+CHANNEL = 'cache-invalidation'
+
+
+class SubscriberRedis(FakeRedis):
+    """FakeRedis, считающий подписки и таймауты чтения"""
+
+    def __init__(self):
+        super().__init__()
+        self.subscriptions = 0
+        self.timeouts: list[float] = []
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        self.subscriptions += 1
+        pubsub = super().pubsub(ignore_subscribe_messages)
+        get_message = pubsub.get_message
+
+        async def recording_get_message(ignore_subscribe_messages: bool = False, timeout: float = 0.0):
+            self.timeouts.append(timeout)
+            return await get_message(ignore_subscribe_messages, timeout)
+
+        pubsub.get_message = recording_get_message
+        return pubsub
+
+
+async def wait_for(condition, timeout: float = 1.0) -> None:
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def redis() -> SubscriberRedis:
+    return SubscriberRedis()
+
+
+@pytest_asyncio.fixture
+async def listener(redis: SubscriberRedis):
+    listener = InvalidationListener(redis, CHANNEL, subscriber=redis, reconnect_delay=0.01, poll_timeout=0.02)
+    listener.register('film', invalidate_films)
+    task = asyncio.create_task(listener.run())
+    await wait_for(lambda: redis._subscribers)
+    yield listener
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def put_film(redis: FakeRedis, film_id: str) -> None:
+    film_local_cache.set(film_id, {'id': film_id})
+    await redis.set(film_keyspace.key(film_id), b'{}')
+
+
+async def publish_films(redis: FakeRedis, film_ids: list[str]) -> None:
+    await redis.publish(CHANNEL, json.dumps({'entity': 'film', 'ids': film_ids}))
+
+
+class TestInvalidationListener:
+
+    @pytest.mark.asyncio
+    async def test_message_evicts_local_cache_and_redis(self, redis: SubscriberRedis, listener: InvalidationListener):
+        for film_id in ('film-1', 'film-2'):
+            await put_film(redis, film_id)
+
+        await publish_films(redis, ['film-1'])
+        await wait_for(lambda: film_local_cache.get('film-1') is None)
+
+        assert await redis.get(film_keyspace.key('film-1')) is None
+        assert film_local_cache.get('film-2') is not None
+        assert await redis.get(film_keyspace.key('film-2')) is not None
+
+    @pytest.mark.asyncio
+    async def test_idle_listener_keeps_subscription(self, redis: SubscriberRedis, listener: InvalidationListener):
+        # Тишина в канале дольше таймаута чтения не должна приводить к переподключению
+        await asyncio.sleep(0.1)
+        await put_film(redis, 'film-1')
+        await publish_films(redis, ['film-1'])
+        await wait_for(lambda: film_local_cache.get('film-1') is None)
+
+        assert redis.subscriptions == 1
+        assert set(redis.timeouts) == {0.02}
+
+    @pytest.mark.asyncio
+    async def test_listener_survives_reconnect(self, redis: SubscriberRedis, listener: InvalidationListener):
+        redis.drop_subscribers()
+        await wait_for(lambda: redis.subscriptions == 2 and redis._subscribers)
+
+        await put_film(redis, 'film-1')
+        await publish_films(redis, ['film-1'])
+        await wait_for(lambda: film_local_cache.get('film-1') is None)
+
+        assert await redis.get(film_keyspace.key('film-1')) is None
+
+    @pytest.mark.parametrize(
+        'message',
+        [
+            'not json',
+            json.dumps({'ids': ['film-1']}),
+            json.dumps({'entity': 'film'}),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_invalid_message_is_skipped(
+            self,
+            redis: SubscriberRedis,
+            listener: InvalidationListener,
+            message: str
+    ):
+        await redis.publish(CHANNEL, message)
+        await put_film(redis, 'film-1')
+        await publish_films(redis, ['film-1'])
+        await wait_for(lambda: film_local_cache.get('film-1') is None)
+
+        assert redis.subscriptions == 1
+
+    @pytest.mark.asyncio
+    async def test_generation_message_switches_keyspace(self, redis: SubscriberRedis, listener: InvalidationListener):
+        keyspace = CacheKeyspace('person', '1')
+        listener.register_keyspace(keyspace)
+
+        await redis.publish(CHANNEL, json.dumps({'entity': 'person', 'generation': 3}))
+        await wait_for(lambda: keyspace.generation == 3)
+
+        assert keyspace.key('1') == 'person:v1:g3:1'
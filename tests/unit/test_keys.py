@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from src.cache.keys import GENERATION_KEY, CacheKeyspace, bump_generation
+from tests.benchmarks.backends import FakeRedis
+
+
+class PublishingRedis(FakeRedis):
+    """FakeRedis, запоминающий опубликованные сообщения"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.published: list[tuple[str, dict]] = []
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.published.append((channel, json.loads(message)))
+        return 1
+
+
+@pytest.fixture
+def redis() -> PublishingRedis:
+    return PublishingRedis()
+
+
+@pytest.fixture
+def changes() -> list[int]:
+    return []
+
+
+@pytest.fixture
+def keyspace(changes: list[int]) -> CacheKeyspace:
+    return CacheKeyspace('film', '1a2b', on_change=lambda: changes.append(1))
+
+
+class TestCacheKeyspace:
+
+    @pytest.mark.parametrize(
+        'generation, item_ids, expected_answer',
+        [
+            (0, ['1'], ['film:v1a2b:g0:1']),
+            (7, ['1', '2'], ['film:v1a2b:g7:1', 'film:v1a2b:g7:2']),
+            (7, [], []),
+        ]
+    )
+    def test_keys(self, keyspace: CacheKeyspace, generation: int, item_ids: list[str], expected_answer: list[str]):
+        keyspace.set_generation(generation)
+
+        assert keyspace.keys(item_ids) == expected_answer
+        assert [keyspace.key(item_id) for item_id in item_ids] == expected_answer
+
+    @pytest.mark.parametrize(
+        'generations, expected_generation, expected_changes',
+        [
+            ([1, 2], 2, 2),
+            ([2, 2], 2, 1),
+            # После FLUSHDB или переключения на реплику счетчик начинается заново
+            ([5, 1], 1, 2),
+            ([5, 0], 0, 2),
+        ]
+    )
+    def test_any_change_switches_generation(
+            self,
+            keyspace: CacheKeyspace,
+            changes: list[int],
+            generations: list[int],
+            expected_generation: int,
+            expected_changes: int
+    ):
+        for generation in generations:
+            keyspace.set_generation(generation)
+
+        assert keyspace.generation == expected_generation
+        assert len(changes) == expected_changes
+
+    @pytest.mark.asyncio
+    async def test_load_generation(self, keyspace: CacheKeyspace, redis: PublishingRedis):
+        await redis.set(GENERATION_KEY.format(entity='film'), '5')
+        await keyspace.load_generation(redis)
+        assert keyspace.generation == 5
+
+        await redis.flushdb()
+        await keyspace.load_generation(redis)
+        assert keyspace.generation == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_load_does_not_roll_back_newer_generation(self, keyspace: CacheKeyspace):
+        redis = PublishingRedis(latency=0.02)
+        await redis.set(GENERATION_KEY.format(entity='film'), '4')
+
+        # Перечитывание начато до увеличения поколения, а сообщение о нем пришло раньше ответа
+        load = asyncio.ensure_future(keyspace.load_generation(redis))
+        await asyncio.sleep(0)
+        keyspace.set_generation(5)
+        await load
+
+        assert keyspace.generation == 5
+
+    @pytest.mark.asyncio
+    async def test_bump_after_flush_is_not_ignored(self, keyspace: CacheKeyspace, redis: PublishingRedis):
+        for _ in range(3):
+            await keyspace.bump(redis, 'cache-invalidation')
+        await redis.flushdb()
+
+        generation = await bump_generation(redis, 'film', 'cache-invalidation')
+        keyspace.set_generation(redis.published[-1][1]['generation'])
+
+        assert generation == 1
+        assert keyspace.generation == 1
+
+    @pytest.mark.asyncio
+    async def test_bump_publishes_generation(self, keyspace: CacheKeyspace, redis: PublishingRedis):
+        generation = await keyspace.bump(redis, 'cache-invalidation')
+
+        assert generation == 1
+        assert keyspace.generation == 1
+        assert redis.published == [('cache-invalidation', {'entity': 'film', 'generation': 1})]
@@ -0,0 +1,149 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.core.load_shedding import AIMDLimiter, LoadSheddingMiddleware, route_class
+
+
+def make_limiter(**kwargs) -> AIMDLimiter:
+    options = {'target_latency': 0.1, 'initial_limit': 4, 'min_limit': 2, 'max_limit': 6, 'backoff': 0.5}
+    return AIMDLimiter('test', **{**options, **kwargs})
+
+
+class TestAIMDLimiter:
+
+    def test_sheds_over_limit(self):
+        limiter = make_limiter()
+
+        assert [limiter.try_acquire() for _ in range(5)] == [True, True, True, True, False]
+        limiter.release(0.01, False)
+        assert limiter.try_acquire()
+
+    def test_fast_responses_increase_saturated_limit(self):
+        limiter = make_limiter()
+        limiter.try_acquire()
+        limiter.try_acquire()
+
+        limiter.release(0.01, False)
+
+        assert limiter.limit == pytest.approx(4.25)
+
+    def test_idle_limit_does_not_grow(self):
+        limiter = make_limiter()
+
+        for _ in range(20):
+            limiter.try_acquire()
+            limiter.release(0.01, False)
+
+        assert limiter.limit == 4
+
+    def test_limit_is_capped(self):
+        limiter = make_limiter()
+
+        for _ in range(200):
+            for _ in range(int(limiter.limit)):
+                limiter.try_acquire()
+            while limiter.in_flight:
+                limiter.release(0.01, False)
+
+        assert limiter.limit == 6
+
+    @pytest.mark.parametrize(
+        'latency, overloaded',
+        [
+            (0.5, False),
+            (0.01, True),
+        ]
+    )
+    def test_slow_or_failed_response_backs_off(self, latency: float, overloaded: bool):
+        limiter = make_limiter()
+        limiter.try_acquire()
+
+        limiter.release(latency, overloaded)
+
+        assert limiter.limit == 2
+
+    def test_backoff_once_per_window(self):
+        limiter = make_limiter(initial_limit=6)
+        for _ in range(3):
+            limiter.try_acquire()
+
+        # Ответы одного медленного окна уменьшают лимит один раз
+        for _ in range(3):
+            limiter.release(1.0, False)
+
+        assert limiter.limit == 3
+        assert limiter.in_flight == 0
+
+    def test_limit_does_not_drop_below_min(self):
+        limiter = make_limiter()
+
+        for _ in range(5):
+            limiter.try_acquire()
+            limiter.release(0.0, True)
+
+        assert limiter.limit == 2
+
+
+class TestRouteClass:
+
+    @pytest.mark.parametrize(
+        'path, expected_answer',
+        [
+            ('/api/v1/films/ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95', 'detail'),
+            ('/api/v1/genres/3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff', 'detail'),
+            ('/api/v1/films/', 'list'),
+            ('/api/v1/films/batch', 'list'),
+            ('/api/v1/genres/', 'list'),
+            ('/api/v1/films/search/', 'search'),
+            ('/metrics', None),
+        ]
+    )
+    def test_route_class(self, path: str, expected_answer: str | None):
+        assert route_class(path) == expected_answer
+
+
+async def slow_app(scope, receive, send):
+    """Приложение, отвечающее через 20 мс; статус берется из пути"""
+    await asyncio.sleep(0.02)
+    status = 500 if scope['path'].endswith('/error') else 200
+    await send({'type': 'http.response.start', 'status': status, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'{}'})
+
+
+@pytest.fixture
+def limiter() -> AIMDLimiter:
+    return make_limiter(initial_limit=2, min_limit=1)
+
+
+@pytest.fixture
+def client(limiter: AIMDLimiter) -> httpx.AsyncClient:
+    app = LoadSheddingMiddleware(slow_app, limiters={'detail': limiter}, retry_after=3)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+class TestLoadSheddingMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_requests_over_limit_get_503(self, client: httpx.AsyncClient):
+        responses = await asyncio.gather(*(client.get(f'/api/v1/films/{i}') for i in range(3)))
+
+        assert sorted(response.status_code for response in responses) == [200, 200, 503]
+        shed = next(response for response in responses if response.status_code == 503)
+        assert shed.headers['Retry-After'] == '3'
+        assert shed.json() == {'detail': 'Service overloaded, retry later'}
+
+    @pytest.mark.asyncio
+    async def test_server_error_decreases_limit(self, client: httpx.AsyncClient, limiter: AIMDLimiter):
+        response = await client.get('/api/v1/films/error')
+
+        assert response.status_code == 500
+        assert limiter.limit == 1
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_paths_without_class_are_not_limited(self, client: httpx.AsyncClient):
+        responses = await asyncio.gather(*(client.get('/metrics') for _ in range(5)))
+
+        assert [response.status_code for response in responses] == [200] * 5
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.cache.local import LocalCache
+
+
+def sample(name: str, service: str) -> float | None:
+    return REGISTRY.get_sample_value(name, {'service': service})
+
+
+class TestLocalCache:
+
+    def test_lru_eviction_is_exported(self):
+        cache = LocalCache('test-eviction', max_size=2, ttl=60)
+
+        cache.set('1', 'film 1')
+        cache.set('2', 'film 2')
+        cache.get('1')
+        cache.set('3', 'film 3')
+
+        assert cache.get('2') is None
+        assert cache.get('1') == 'film 1'
+        assert sample('local_cache_evictions_total', 'test-eviction') == 1
+        assert sample('local_cache_entries', 'test-eviction') == 2
+
+    @pytest.mark.parametrize(
+        'ttl, expected_answer',
+        [
+            (60, 'film'),
+            (0.01, None),
+        ]
+    )
+    def test_ttl(self, ttl: float, expected_answer: str | None):
+        cache = LocalCache('test-ttl', max_size=10, ttl=60)
+
+        cache.set('1', 'film', ttl)
+        time.sleep(0.02)
+
+        assert cache.get('1') == expected_answer
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = LocalCache('test-disabled', max_size=0, ttl=60)
+
+        cache.set('1', 'film')
+
+        assert cache.get('1') is None
+        assert sample('local_cache_entries', 'test-disabled') == 0
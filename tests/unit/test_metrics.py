@@ -0,0 +1,85 @@
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY
+
+from src.core.metrics import MetricsMiddleware, metrics_view
+
+PREFIX = '/api/v1/metrics-test'
+
+router = APIRouter()
+
+
+@router.get('/{film_id}')
+async def film_details(film_id: str) -> dict:
+    return {'id': film_id}
+
+
+@router.get('/')
+async def films_list() -> list:
+    return []
+
+
+def requests_count(route: str, status: str = '200') -> float:
+    labels = {'method': 'GET', 'route': route, 'status': status}
+    return REGISTRY.get_sample_value('http_request_duration_seconds_count', labels) or 0.0
+
+
+@pytest.fixture
+def client() -> httpx.AsyncClient:
+    """Приложение с тем же подключением middleware, роутера и /metrics, что и в src.main"""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.add_route('/metrics', metrics_view, include_in_schema=False)
+    app.include_router(router, prefix=PREFIX)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+class TestMetricsMiddleware:
+
+    @pytest.mark.asyncio
+    async def test_route_label_is_template(self, client: httpx.AsyncClient):
+        before = requests_count(f'{PREFIX}/{{film_id}}')
+
+        for film_id in ('film-1', 'film-2', 'film-3'):
+            response = await client.get(f'{PREFIX}/{film_id}')
+            assert response.status_code == 200
+
+        assert requests_count(f'{PREFIX}/{{film_id}}') - before == 3
+        assert requests_count(f'{PREFIX}/film-1') == 0
+
+    @pytest.mark.parametrize(
+        'path, expected_route, expected_status',
+        [
+            (f'{PREFIX}/', f'{PREFIX}/', '200'),
+            (f'{PREFIX}/film-1/unknown', 'unmatched', '404'),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_route_and_status_labels(
+            self,
+            client: httpx.AsyncClient,
+            path: str,
+            expected_route: str,
+            expected_status: str
+    ):
+        before = requests_count(expected_route, expected_status)
+
+        response = await client.get(path)
+
+        assert response.status_code == int(expected_status)
+        assert requests_count(expected_route, expected_status) - before == 1
+
+    @pytest.mark.asyncio
+    async def test_metrics_exposition(self, client: httpx.AsyncClient):
+        await client.get(f'{PREFIX}/film-1')
+
+        response = await client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == CONTENT_TYPE_LATEST
+        assert '# TYPE http_request_duration_seconds histogram' in response.text
+        assert (
+            f'http_request_duration_seconds_count{{method="GET",route="{PREFIX}/{{film_id}}",status="200"}}'
+            in response.text
+        )
@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.core.profiling import ProfilingMiddleware, elasticsearch_profiles, profiling_requested
+
+TOKEN = 'secret'
+
+
+async def app(scope, receive, send):
+    """Приложение, которое, как сервис фильмов, пишет профиль Elasticsearch"""
+    await asyncio.sleep(0.01)
+    profiles = elasticsearch_profiles.get()
+    if profiles is not None:
+        profiles.append({'body': {'query': 'star'}, 'profile': {'shards': []}})
+    body = b'{"profiled": %s}' % (b'true' if profiling_requested() else b'false')
+    await send({'type': 'http.response.start', 'status': 404, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def make_client(profiler: str = 'pyinstrument') -> httpx.AsyncClient:
+    middleware = ProfilingMiddleware(app, token=TOKEN, profiler=profiler)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url='http://test')
+
+
+class TestProfilingMiddleware:
+
+    @pytest.mark.parametrize(
+        'headers',
+        [
+            {},
+            {'X-Profile': 'wrong'},
+            {'X-Profile': ''},
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_request_without_valid_token_is_not_profiled(self, headers: dict):
+        response = await make_client().get('/api/v1/films/search/', headers=headers)
+
+        assert response.status_code == 404
+        assert response.json() == {'profiled': False}
+        assert 'X-Profiled-Status' not in response.headers
+
+    @pytest.mark.parametrize(
+        'profiler, output_format, expected_content_type, expected_marker',
+        [
+            ('pyinstrument', None, 'text/html', '<h2>Elasticsearch profile</h2>'),
+            ('pyinstrument', 'text', 'text/plain', 'Elasticsearch profile:'),
+            ('cprofile', None, 'text/plain', 'function calls'),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_profiled_request_returns_profile(
+            self,
+            profiler: str,
+            output_format: str | None,
+            expected_content_type: str,
+            expected_marker: str
+    ):
+        headers = {'X-Profile': TOKEN}
+        if output_format:
+            headers['X-Profile-Format'] = output_format
+
+        response = await make_client(profiler).get('/api/v1/films/search/', headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith(expected_content_type)
+        assert response.headers['X-Profiled-Status'] == '404'
+        assert float(response.headers['X-Profiled-Time']) >= 0.01
+        assert expected_marker in response.text
+        assert 'shards' in response.text
+
+    @pytest.mark.asyncio
+    async def test_profiling_context_is_reset(self):
+        await make_client().get('/', headers={'X-Profile': TOKEN})
+
+        assert not profiling_requested()
+
+    def test_unknown_profiler_is_rejected(self):
+        with pytest.raises(ValueError):
+            ProfilingMiddleware(app, token=TOKEN, profiler='perf')
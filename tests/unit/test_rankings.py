@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from src.services.rankings import (
+    GENRE_RATING_KEY,
+    GENRE_UNRATED_KEY,
+    RATING_KEY,
+    READY_KEY,
+    SUMMARY_KEY,
+    UNRATED_KEY,
+    FilmRankings,
+)
+from tests.benchmarks.backends import FakeRedis
+
+FILMS = [
+    {'id': 'film-1', 'title': 'Want', 'imdb_rating': 1.0, 'genres': ['Horror']},
+    {'id': 'film-2', 'title': 'Lot', 'imdb_rating': 10.0, 'genres': ['Comedy']},
+    {'id': 'film-3', 'title': 'Star', 'imdb_rating': 5.5, 'genres': ['Comedy']},
+]
+
+
+def fill_rankings(redis: FakeRedis, ready: bool = True) -> None:
+    """Рейтинги в том виде, в каком их пишет ETL"""
+    for film in FILMS:
+        redis._set(SUMMARY_KEY.format(film_id=film['id']), json.dumps(film))
+        redis._zadd(RATING_KEY, {film['id']: film['imdb_rating']})
+        for genre in film['genres']:
+            redis._zadd(GENRE_RATING_KEY.format(genre=genre), {film['id']: film['imdb_rating']})
+    if ready:
+        redis._set(READY_KEY, '1')
+
+
+class TestFilmRankings:
+
+    @pytest.mark.parametrize(
+        'options, expected_answer',
+        [
+            ({}, ['film-2', 'film-3', 'film-1']),
+            ({'descending': False}, ['film-1', 'film-3', 'film-2']),
+            ({'genre': 'Comedy'}, ['film-2', 'film-3']),
+            ({'min_rating': 2, 'max_rating': 6}, ['film-3']),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_page(self, options: dict, expected_answer: list[str]):
+        redis = FakeRedis()
+        fill_rankings(redis)
+
+        films = await FilmRankings(redis).page(0, 10, **options)
+
+        assert [film.id for film in films] == expected_answer
+
+    @pytest.mark.asyncio
+    async def test_not_ready_falls_back(self):
+        redis = FakeRedis()
+        fill_rankings(redis, ready=False)
+
+        assert await FilmRankings(redis).page(0, 10) is None
+
+    @pytest.mark.parametrize(
+        'options, deleted_key',
+        [
+            ({}, RATING_KEY),
+            ({'genre': 'Western'}, None),
+            ({'genre': 'Comedy', 'min_rating': 1}, GENRE_RATING_KEY.format(genre='Comedy')),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_missing_ranking_falls_back(self, options: dict, deleted_key: str | None):
+        redis = FakeRedis()
+        fill_rankings(redis)
+        if deleted_key:
+            redis._delete(deleted_key)
+
+        assert await FilmRankings(redis).page(0, 10, **options) is None
+
+    @pytest.mark.asyncio
+    async def test_missing_summary_falls_back(self):
+        redis = FakeRedis()
+        fill_rankings(redis)
+        redis._delete(SUMMARY_KEY.format(film_id='film-3'))
+
+        assert await FilmRankings(redis).page(0, 10) is None
+
+    @pytest.mark.parametrize(
+        'offset, size, options, expected_answer',
+        [
+            # Неполная страница дошла бы до фильма без рейтинга в конце выдачи Elasticsearch
+            (0, 10, {}, None),
+            (2, 2, {'descending': False}, None),
+            (0, 10, {'genre': 'Comedy'}, None),
+            # Полная страница и страницы жанров без таких фильмов берутся из рейтингов
+            (0, 2, {}, ['film-2', 'film-3']),
+            (0, 10, {'genre': 'Horror'}, ['film-1']),
+            # Фильтр по рейтингу фильм без рейтинга не проходит и в Elasticsearch
+            (0, 10, {'min_rating': 2}, ['film-2', 'film-3']),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_unrated_films(self, offset: int, size: int, options: dict, expected_answer: list[str] | None):
+        redis = FakeRedis()
+        fill_rankings(redis)
+        redis._sadd(UNRATED_KEY, 'film-4')
+        redis._sadd(GENRE_UNRATED_KEY.format(genre='Comedy'), 'film-4')
+
+        films = await FilmRankings(redis).page(offset, size, **options)
+
+        assert (None if films is None else [film.id for film in films]) == expected_answer
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from redis.asyncio.connection import Connection
+
+from src.db.redis import REDIS_POOL_WAITING, InstrumentedConnectionPool
+
+
+class IdleConnection(Connection):
+    """Соединение без сокета; запоминает число ждущих в момент выдачи из пула"""
+    waiting_on_connect: list[float] = []
+
+    async def connect(self):
+        self.waiting_on_connect.append(waiting())
+
+    async def can_read_destructive(self):
+        return False
+
+
+def waiting() -> float:
+    return REDIS_POOL_WAITING._value.get()
+
+
+@pytest.fixture
+def pool() -> InstrumentedConnectionPool:
+    IdleConnection.waiting_on_connect = []
+    return InstrumentedConnectionPool(connection_class=IdleConnection, max_connections=1, timeout=1)
+
+
+class TestInstrumentedConnectionPool:
+
+    @pytest.mark.asyncio
+    async def test_free_connection_is_not_waiting(self, pool: InstrumentedConnectionPool):
+        connection = await pool.get_connection('GET')
+        await pool.release(connection)
+        connection = await pool.get_connection('GET')
+        await pool.release(connection)
+
+        assert IdleConnection.waiting_on_connect == [0, 0]
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_counts_blocked_callers(self, pool: InstrumentedConnectionPool):
+        connection = await pool.get_connection('GET')
+        blocked = asyncio.ensure_future(pool.get_connection('GET'))
+        await asyncio.sleep(0)
+
+        assert waiting() == 1
+
+        await pool.release(connection)
+        assert await blocked is connection
+        assert IdleConnection.waiting_on_connect == [0, 1]
+        assert waiting() == 0
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from src.core.resilience import CircuitBreaker, CircuitOpenError
+
+
+async def succeed():
+    return 'ok'
+
+
+async def fail():
+    raise ConnectionError('elasticsearch is down')
+
+
+async def call(breaker: CircuitBreaker, func) -> str:
+    try:
+        return await breaker.call(func)
+    except CircuitOpenError:
+        return 'rejected'
+    except ConnectionError:
+        return 'failed'
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {'failure_rate': 0.5, 'window': 10, 'min_calls': 4, 'open_seconds': 0.05, 'half_open_calls': 2}
+    return CircuitBreaker('test', **{**options, **kwargs})
+
+
+class TestCircuitBreaker:
+
+    @pytest.mark.asyncio
+    async def test_full_cycle(self):
+        states = []
+        breaker = make_breaker(on_state_change=states.append)
+
+        # closed: ошибки копятся, пока их доля не превысит порог
+        assert [await call(breaker, func) for func in (succeed, fail, succeed)] == ['ok', 'failed', 'ok']
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert await call(breaker, fail) == 'failed'
+        assert breaker.state == CircuitBreaker.OPEN
+
+        # open: вызовы отклоняются без обращения к зависимости
+        with pytest.raises(CircuitOpenError) as error:
+            await breaker.call(succeed)
+        assert 0 < error.value.retry_after <= 0.05
+
+        # half_open: после паузы проходят пробные вызовы, успешные замыкают предохранитель
+        await asyncio.sleep(0.06)
+        assert await call(breaker, succeed) == 'ok'
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert await call(breaker, succeed) == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+        assert states == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED]
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens(self):
+        breaker = make_breaker()
+        for _ in range(4):
+            await call(breaker, fail)
+        await asyncio.sleep(0.06)
+
+        assert await call(breaker, fail) == 'failed'
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert await call(breaker, succeed) == 'rejected'
+
+    @pytest.mark.asyncio
+    async def test_half_open_limits_probes(self):
+        breaker = make_breaker(half_open_calls=1)
+        for _ in range(4):
+            await call(breaker, fail)
+        await asyncio.sleep(0.06)
+        probe_started = asyncio.Event()
+
+        async def slow_probe():
+            probe_started.set()
+            await asyncio.sleep(0.01)
+            return 'ok'
+
+        probe = asyncio.ensure_future(breaker.call(slow_probe))
+        await probe_started.wait()
+
+        assert await call(breaker, succeed) == 'rejected'
+        assert await probe == 'ok'
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.parametrize(
+        'options, expected_state',
+        [
+            ({'slow_call_duration': 0.01, 'slow_call_rate': 0.5}, CircuitBreaker.OPEN),
+            ({'slow_call_duration': 1.0, 'slow_call_rate': 0.5}, CircuitBreaker.CLOSED),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_slow_calls_open(self, options: dict, expected_state: str):
+        breaker = make_breaker(**options)
+
+        async def slow():
+            await asyncio.sleep(0.02)
+            return 'ok'
+
+        for _ in range(4):
+            await call(breaker, slow)
+
+        assert breaker.state == expected_state
+
+    @pytest.mark.asyncio
+    async def test_errors_that_are_not_failures_are_ignored(self):
+        breaker = make_breaker(is_failure=lambda exc: not isinstance(exc, ConnectionError))
+
+        for _ in range(10):
+            assert await call(breaker, fail) == 'failed'
+
+        assert breaker.state == CircuitBreaker.CLOSED
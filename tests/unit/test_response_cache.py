@@ -0,0 +1,208 @@
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api.v1 import films
+from src.cache.response import ResponseCache, get_response_cache, normalize_query
+from src.core import config
+from src.core.profiling import elasticsearch_profiles
+from src.core.resilience import CircuitBreaker
+from src.db import elastic as elastic_db
+from src.services import film as film_module
+from src.services.film import FilmService, get_film_service
+from tests.benchmarks.backends import FakeElasticsearch, FakeRedis
+
+FILMS = [
+    {'id': f'film-{i}', 'title': f'The Star {i}', 'imdb_rating': float(i), 'description': '',
+     'genres': ['Action'], 'directors': [], 'actors': [], 'writers': []}
+    for i in range(5)
+]
+
+
+class CountingElasticsearch(FakeElasticsearch):
+    """Считает поисковые запросы"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.searches = 0
+
+    async def search(self, *args, **kwargs) -> dict:
+        self.searches += 1
+        return await super().search(*args, **kwargs)
+
+
+class BrokenRedis(FakeRedis):
+    async def get(self, key: str) -> bytes | None:
+        raise ConnectionError('redis is down')
+
+    async def set(self, *args, **kwargs) -> bool:
+        raise ConnectionError('redis is down')
+
+
+def ttl(redis: FakeRedis, key: str) -> float:
+    return redis._data[key][1] - time.monotonic()
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+def elastic() -> CountingElasticsearch:
+    return CountingElasticsearch(FILMS, [])
+
+
+@pytest.fixture
+def client(redis: FakeRedis, elastic: CountingElasticsearch, monkeypatch) -> httpx.AsyncClient:
+    """Ручки фильмов поверх in-memory бэкендов; списки идут в Elasticsearch, а не в рейтинги"""
+    monkeypatch.setattr(elastic_db, 'breaker', CircuitBreaker('elasticsearch-test', open_seconds=30))
+    monkeypatch.setattr(config.settings, 'film_rankings_enabled', False)
+    app = FastAPI()
+    app.include_router(films.router, prefix='/api/v1/films')
+    app.dependency_overrides[get_film_service] = lambda: FilmService(redis, elastic)
+    app.dependency_overrides[get_response_cache] = lambda: ResponseCache(redis)
+    film_module.film_local_cache.clear()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+class TestResponseCacheKey:
+
+    def test_key_does_not_depend_on_parameter_order(self):
+        first = ResponseCache.build_key('films_list', {'sort': '-imdb_rating', 'page_size': 50})
+        second = ResponseCache.build_key('films_list', {'page_size': 50, 'sort': '-imdb_rating'})
+
+        assert first == second
+        assert first.startswith('response:films_list:')
+
+    @pytest.mark.parametrize(
+        'route, params',
+        [
+            ('films_search', {'sort': '-imdb_rating', 'page_size': 50}),
+            ('films_list', {'sort': 'imdb_rating', 'page_size': 50}),
+            ('films_list', {'sort': '-imdb_rating', 'page_size': 50, 'cursor': None}),
+        ]
+    )
+    def test_key_depends_on_route_and_params(self, route: str, params: dict):
+        key = ResponseCache.build_key('films_list', {'sort': '-imdb_rating', 'page_size': 50})
+
+        assert ResponseCache.build_key(route, params) != key
+
+    @pytest.mark.parametrize(
+        'query, expected_answer',
+        [
+            ('The Star', 'the star'),
+            ('  the   STAR ', 'the star'),
+            ('star', 'star'),
+        ]
+    )
+    def test_normalize_query(self, query: str, expected_answer: str):
+        assert normalize_query(query) == expected_answer
+
+
+class TestResponseCache:
+
+    @pytest.mark.asyncio
+    async def test_set_and_get(self, redis: FakeRedis):
+        cache = ResponseCache(redis)
+
+        await cache.set('response:films_list:1', b'{}', 60)
+
+        assert await cache.get('response:films_list:1') == b'{}'
+        assert await cache.get('response:films_list:2') is None
+        assert ttl(redis, 'response:films_list:1') == pytest.approx(60, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_profiled_request_bypasses_cache(self, redis: FakeRedis):
+        cache = ResponseCache(redis)
+        await cache.set('response:films_list:1', b'{}', 60)
+
+        token = elasticsearch_profiles.set([])
+        try:
+            assert await cache.get('response:films_list:1') is None
+        finally:
+            elasticsearch_profiles.reset(token)
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_are_misses(self):
+        cache = ResponseCache(BrokenRedis())
+
+        await cache.set('response:films_list:1', b'{}', 60)
+
+        assert await cache.get('response:films_list:1') is None
+
+
+class TestFilmsResponseCache:
+
+    @pytest.mark.parametrize(
+        'path, params, expected_ttl',
+        [
+            ('/', {'sort': '-imdb_rating', 'page_size': 2}, config.settings.films_list_cache_ttl),
+            ('/search/', {'query': 'star', 'page_size': 2}, config.settings.films_search_cache_ttl),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_page_is_served_from_cache(
+            self,
+            client: httpx.AsyncClient,
+            redis: FakeRedis,
+            elastic: CountingElasticsearch,
+            path: str,
+            params: dict,
+            expected_ttl: int
+    ):
+        first = await client.get(f'/api/v1/films{path}', params=params)
+        second = await client.get(f'/api/v1/films{path}', params=params)
+
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert elastic.searches == 1
+        [key] = [key for key in redis._data if key.startswith('response:')]
+        assert ttl(redis, key) == pytest.approx(expected_ttl, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_equivalent_queries_share_cache(self, client: httpx.AsyncClient, elastic: CountingElasticsearch):
+        for query in ('The Star', '  the   STAR '):
+            response = await client.get('/api/v1/films/search/', params={'query': query})
+            assert response.status_code == 200
+
+        assert elastic.searches == 1
+
+    @pytest.mark.parametrize(
+        'path, params, expected_status',
+        [
+            ('/search/', {'query': 'moon'}, 404),
+            ('/', {'cursor': 'not-a-cursor'}, 400),
+            ('/search/', {'query': 'star', 'cursor': 'not-a-cursor'}, 400),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_error_responses_are_not_cached(
+            self,
+            client: httpx.AsyncClient,
+            redis: FakeRedis,
+            path: str,
+            params: dict,
+            expected_status: int
+    ):
+        response = await client.get(f'/api/v1/films{path}', params=params)
+
+        assert response.status_code == expected_status
+        assert not [key for key in redis._data if key.startswith('response:')]
+
+    @pytest.mark.asyncio
+    async def test_consistent_walk_bypasses_cache(
+            self,
+            client: httpx.AsyncClient,
+            redis: FakeRedis,
+            elastic: CountingElasticsearch
+    ):
+        params = {'cursor': '*', 'consistent': 'true', 'page_size': 2}
+        for _ in range(2):
+            response = await client.get('/api/v1/films/', params=params)
+            assert response.status_code == 200
+
+        assert elastic.searches == 2
+        assert not [key for key in redis._data if key.startswith('response:')]
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import pytest
+
+from src.cache.single_flight import SingleFlight
+from src.core.deadline import DeadlineExceeded, request_deadline, with_deadline
+
+
+class TestSingleFlight:
+
+    @pytest.mark.parametrize(
+        'callers, expected_calls',
+        [
+            (1, 1),
+            (10, 1),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self, callers: int, expected_calls: int):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'film'
+
+        results = await asyncio.gather(*(single_flight.do('key', load) for _ in range(callers)))
+
+        assert results == ['film'] * callers
+        assert len(calls) == expected_calls
+
+    @pytest.mark.parametrize(
+        'short_timeout, long_timeout',
+        [
+            (0.01, 1.0),
+            (0.01, None),
+        ]
+    )
+    @pytest.mark.asyncio
+    async def test_short_deadline_caller_does_not_fail_others(self, short_timeout: float, long_timeout: float | None):
+        single_flight = SingleFlight()
+
+        async def load():
+            # Обращение к хранилищу внутри общего вызова, как в сервисах
+            return await with_deadline(asyncio.sleep(0.05, result='film'))
+
+        async def call(timeout: float | None):
+            request_deadline.set(None if timeout is None else time.monotonic() + timeout)
+            return await single_flight.do('key', load)
+
+        short, long = await asyncio.gather(
+            asyncio.ensure_future(call(short_timeout)),
+            asyncio.ensure_future(call(long_timeout)),
+            return_exceptions=True
+        )
+
+        assert isinstance(short, DeadlineExceeded)
+        assert long == 'film'
+
+    @pytest.mark.asyncio
+    async def test_abandoned_call_is_cancelled(self):
+        single_flight = SingleFlight()
+        events = []
+
+        async def load():
+            try:
+                await asyncio.sleep(1)
+                events.append('finished')
+            except asyncio.CancelledError:
+                events.append('cancelled')
+                raise
+
+        async def call():
+            request_deadline.set(time.monotonic() + 0.02)
+            return await single_flight.do('key', load)
+
+        results = await asyncio.gather(call(), call(), return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert all(isinstance(result, DeadlineExceeded) for result in results)
+        assert events == ['cancelled']
+        assert not single_flight._calls
+
+    @pytest.mark.asyncio
+    async def test_call_is_not_cancelled_while_someone_waits(self):
+        single_flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return 'film'
+
+        first = asyncio.ensure_future(single_flight.do('key', load))
+        second = asyncio.ensure_future(single_flight.do('key', load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == 'film'
+        assert first.cancelled()
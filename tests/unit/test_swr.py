@@ -0,0 +1,190 @@
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from src.cache import document, swr
+from src.cache.codec import cache_codec
+from src.cache.document import DocumentCache
+from src.cache.keys import CacheKeyspace
+from src.cache.local import LocalCache
+from src.cache.swr import Revalidator, should_refresh
+from src.core.metrics import CacheMetrics
+from tests.benchmarks.backends import FakeRedis
+
+NOW = 1_000_000.0
+EXPIRE = 60
+
+
+class Film(BaseModel):
+    id: str
+    title: str
+
+
+class Loader:
+    """Загрузка из «Elasticsearch» с заданным результатом и подсчетом вызовов"""
+
+    def __init__(self, title: str | None = 'New', delay: float = 0.01):
+        self.title = title
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, film_id: str) -> Film | None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return None if self.title is None else Film(id=film_id, title=self.title)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> SimpleNamespace:
+    """Подменные часы для мягкого срока; monotonic остается настоящим для asyncio"""
+    clock = SimpleNamespace(now=NOW)
+    fake_time = SimpleNamespace(time=lambda: clock.now, monotonic=lambda: 0.0)
+    monkeypatch.setattr(swr, 'time', fake_time)
+    monkeypatch.setattr(document, 'time', fake_time)
+    return clock
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture
+def keyspace() -> CacheKeyspace:
+    return CacheKeyspace('film-swr-test', '1')
+
+
+def make_cache(redis: FakeRedis, keyspace: CacheKeyspace, load: Loader) -> DocumentCache:
+    # L1 выключен, чтобы каждое чтение доходило до Redis
+    return DocumentCache(
+        name='film',
+        model=Film,
+        redis=redis,
+        local_cache=LocalCache('film-swr-test', max_size=0, ttl=60),
+        keyspace=keyspace,
+        metrics=CacheMetrics('film-swr-test'),
+        load=load,
+        expire=EXPIRE,
+        negative_expire=5,
+        stale_ttl=300
+    )
+
+
+async def put_cached(redis: FakeRedis, keyspace: CacheKeyspace, soft_expire_at: float, delta: float = 0.1) -> None:
+    value = cache_codec.encode({'id': 'film-1', 'title': 'Old'}, soft_expire_at=soft_expire_at, delta=delta)
+    await redis.set(keyspace.key('film-1'), value, 360)
+
+
+async def cached_title(redis: FakeRedis, keyspace: CacheKeyspace) -> str:
+    return cache_codec.decode(await redis.get(keyspace.key('film-1')))['title']
+
+
+class TestShouldRefresh:
+
+    @pytest.mark.parametrize(
+        'gap, delta, beta',
+        [
+            (0.5, 1.0, 1.0),
+            (1.0, 1.0, 1.0),
+            (3.0, 1.0, 1.0),
+            (1.0, 0.5, 2.0),
+            (1.0, 1.0, 0.5),
+        ]
+    )
+    def test_early_refresh_probability(self, gap: float, delta: float, beta: float):
+        # XFetch обновляет заранее с вероятностью exp(-gap / (delta * beta))
+        random.seed(20240501)
+
+        refreshed = sum(should_refresh(NOW, delta, beta=beta, now=NOW - gap) for _ in range(5000))
+
+        assert refreshed / 5000 == pytest.approx(math.exp(-gap / (delta * beta)), abs=0.02)
+
+    @pytest.mark.parametrize('now', [NOW, NOW + 1, NOW + 1000])
+    def test_refresh_after_soft_expiry(self, now: float):
+        random.seed(1)
+
+        assert all(should_refresh(NOW, 0.0, now=now) for _ in range(100))
+
+    def test_no_refresh_long_before_expiry(self):
+        random.seed(1)
+
+        assert not any(should_refresh(NOW, 0.01, now=NOW - EXPIRE) for _ in range(1000))
+
+
+class TestRevalidator:
+
+    @pytest.mark.asyncio
+    async def test_one_refresh_per_key(self):
+        revalidator = Revalidator()
+        load = Loader()
+
+        scheduled = [revalidator.schedule('film-1', lambda: load('film-1')) for _ in range(5)]
+        scheduled.append(revalidator.schedule('film-2', lambda: load('film-2')))
+        await asyncio.sleep(0.05)
+
+        assert scheduled == [True, False, False, False, False, True]
+        assert load.calls == 2
+        # После завершения ключ снова можно обновить
+        assert revalidator.schedule('film-1', lambda: load('film-1'))
+        await asyncio.sleep(0.05)
+
+
+class TestStaleWhileRevalidate:
+
+    @pytest.mark.asyncio
+    async def test_fresh_value_is_not_refreshed(self, clock, redis: FakeRedis, keyspace: CacheKeyspace):
+        random.seed(1)
+        load = Loader()
+        cache = make_cache(redis, keyspace, load)
+        await put_cached(redis, keyspace, soft_expire_at=clock.now + EXPIRE)
+
+        film = await cache.get('film-1')
+        await asyncio.sleep(0.05)
+
+        assert film.title == 'Old'
+        assert load.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_stale_value_is_served_and_refreshed_once(self, clock, redis: FakeRedis, keyspace: CacheKeyspace):
+        load = Loader(delay=0.02)
+        cache = make_cache(redis, keyspace, load)
+        await put_cached(redis, keyspace, soft_expire_at=clock.now - 1)
+
+        # Все одновременные чтения получают устаревшее значение, не дожидаясь загрузки
+        films = await asyncio.wait_for(asyncio.gather(*(cache.get('film-1') for _ in range(10))), 0.01)
+        await asyncio.sleep(0.05)
+
+        assert [film.title for film in films] == ['Old'] * 10
+        assert load.calls == 1
+        assert await cached_title(redis, keyspace) == 'New'
+        assert cache_codec.freshness(await redis.get(keyspace.key('film-1')))[0] == clock.now + EXPIRE
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_stale_value(self, clock, redis: FakeRedis, keyspace: CacheKeyspace):
+        load = Loader(title=None)
+        cache = make_cache(redis, keyspace, load)
+        await put_cached(redis, keyspace, soft_expire_at=clock.now - 1)
+
+        film = await cache.get('film-1')
+        await asyncio.sleep(0.05)
+
+        assert film.title == 'Old'
+        assert load.calls == 1
+        assert await cached_title(redis, keyspace) == 'Old'
+
+    @pytest.mark.asyncio
+    async def test_json_read_also_revalidates(self, clock, redis: FakeRedis, keyspace: CacheKeyspace):
+        load = Loader()
+        cache = make_cache(redis, keyspace, load)
+        await put_cached(redis, keyspace, soft_expire_at=clock.now - 1)
+
+        body = await cache.get_json('film-1')
+        await asyncio.sleep(0.05)
+
+        assert b'"Old"' in body
+        assert load.calls == 1
+        assert await cached_title(redis, keyspace) == 'New'